@@ -1,14 +1,30 @@
+import asyncio
 import os
 from typing import Dict, List, Optional
 
-import pandas as pd
+import numpy as np
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
+from audit import DEFAULT_AUDIT_DIR, AuditLog
+from comps import DEFAULT_K, MAX_K
+from ingestion import load_processed
+from instrumentation import TrainingInstrumentation, configure_logging
 from model import HousePriceModel
+from prediction_cache import DEFAULT_MAX_ENTRIES, PredictionCache
+from prediction_grid import GRID_FEATURES, build_prediction_grid
+from pricing import (
+    PRICING_VERSION,
+    apply_location,
+    apply_location_batch,
+    postprocess_price,
+    to_vnd,
+)
+from progressive import mark_full_failed
+from resources import ResourcePolicy
+from sensitivity import SensitivityCache, sensitivity_curves, sweep_values
 from train_model import generate_sample_data
-from train_with_real_data import preprocess_generic_data
 
 app = FastAPI(
     title="House Price Prediction API",
@@ -25,8 +41,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Log JSON từng bước train ra stdout (cả process train riêng, vì nó import app)
+configure_logging()
+
 # Khởi tạo model
 model = HousePriceModel()
+# Cache kết quả /predict/sensitivity theo căn nhà gốc + version model
+sensitivity_cache = SensitivityCache()
+# Audit log mọi dự đoán, ghi bằng thread nền (AUDIT_LOG=0 để tắt)
+audit_log = (
+    AuditLog(
+        directory=os.environ.get("AUDIT_LOG_DIR", DEFAULT_AUDIT_DIR),
+        # "drop": handler async không bao giờ chờ hàng đợi audit
+        policy=os.environ.get("AUDIT_LOG_POLICY", "drop"),
+    )
+    if os.environ.get("AUDIT_LOG", "1") != "0"
+    else None
+)
+
+# Cache kết quả /predict dùng chung giữa các worker trên máy, lưu trong file
+# mmap nên còn sau khi worker khởi động lại (PREDICTION_CACHE=0 để tắt)
+prediction_cache = (
+    PredictionCache(
+        directory=os.environ.get("PREDICTION_CACHE_DIR", "data/cache"),
+        max_entries=int(
+            os.environ.get("PREDICTION_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES)
+        ),
+    )
+    if os.environ.get("PREDICTION_CACHE", "1") != "0"
+    else None
+)
+
+# Ngân sách CPU cho inference/training, train trong process riêng (resources.py)
+resource_policy = ResourcePolicy.from_env()
+# Mỗi lúc chỉ một lần train
+training_lock = asyncio.Lock()
+# Giai đoạn full đang chạy nền của lần train progressive gần nhất
+progressive_task = None
 
 
 class HouseFeatures(BaseModel):
@@ -39,6 +90,8 @@ class HouseFeatures(BaseModel):
     year_built: Optional[int] = Field(None, description="Năm xây dựng")
     location_score: Optional[float] = Field(None, description="Điểm vị trí (0-10)")
     location: Optional[str] = Field(None, description="Địa chỉ nhà")
+    lat: Optional[float] = Field(None, description="Vĩ độ (chọn trên bản đồ)")
+    lng: Optional[float] = Field(None, description="Kinh độ (chọn trên bản đồ)")
 
     class Config:
         json_schema_extra = {
@@ -72,6 +125,78 @@ class BatchPredictionResponse(BaseModel):
     predictions: List[Dict] = Field(..., description="Danh sách dự đoán")
 
 
+class CompsRequest(BaseModel):
+    """Schema cho request tìm comps"""
+
+    house: HouseFeatures
+    k: int = Field(DEFAULT_K, ge=1, le=MAX_K, description="Số căn tương tự")
+
+
+class BatchCompsRequest(BaseModel):
+    """Schema cho request tìm comps của nhiều nhà"""
+
+    houses: List[HouseFeatures]
+    k: int = Field(DEFAULT_K, ge=1, le=MAX_K, description="Số căn tương tự mỗi nhà")
+
+
+class CompsResponse(BaseModel):
+    """Schema cho response comps"""
+
+    comps: List[Dict] = Field(
+        ..., description="Các căn train gần nhất: features, price, distance"
+    )
+    model_version: Optional[str] = Field(None, description="Version model")
+
+
+class BatchCompsResponse(BaseModel):
+    """Schema cho response comps của nhiều nhà"""
+
+    results: List[List[Dict]] = Field(..., description="Comps theo thứ tự các nhà")
+    model_version: Optional[str] = Field(None, description="Version model")
+
+
+class SensitivityRange(BaseModel):
+    """Dãy giá trị quét cho một feature"""
+
+    start: Optional[float] = Field(None, description="Giá trị đầu")
+    stop: Optional[float] = Field(None, description="Giá trị cuối")
+    num: Optional[int] = Field(20, description="Số điểm từ start đến stop")
+    values: Optional[List[float]] = Field(
+        None, description="Danh sách giá trị cụ thể (thay cho start/stop)"
+    )
+
+
+class SensitivityRequest(BaseModel):
+    """Schema cho request what-if / sensitivity"""
+
+    house: HouseFeatures
+    features: Dict[str, SensitivityRange] = Field(
+        ..., description="Feature cần quét -> dãy giá trị"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "house": HouseFeatures.Config.json_schema_extra["example"],
+                "features": {
+                    "area": {"start": 50, "stop": 300, "num": 26},
+                    "year_built": {"values": [1990, 2000, 2010, 2020]},
+                },
+            }
+        }
+
+
+class SensitivityResponse(BaseModel):
+    """Schema cho response sensitivity"""
+
+    base_price: float = Field(..., description="Giá dự đoán của căn nhà gốc")
+    curves: Dict[str, Dict] = Field(
+        ..., description="Feature -> values và predicted_prices tương ứng"
+    )
+    model_version: Optional[str] = Field(None, description="Version model")
+    cached: bool = Field(False, description="Kết quả lấy từ cache")
+
+
 class TrainRequest(BaseModel):
     """Schema cho request train model"""
 
@@ -82,6 +207,60 @@ class TrainRequest(BaseModel):
     generate_sample: Optional[bool] = Field(
         False, description="Có tạo dữ liệu mẫu không"
     )
+    quantile_dmatrix: Optional[bool] = Field(
+        False, description="Train bằng QuantileDMatrix (hist, float32) cho dataset lớn"
+    )
+    max_bin: Optional[int] = Field(
+        256, description="Số bin tối đa mỗi feature khi dùng quantile_dmatrix"
+    )
+    external_memory: Optional[bool] = Field(
+        False, description="Train out-of-core theo từng chunk (dataset lớn hơn RAM)"
+    )
+    chunk_size: Optional[int] = Field(
+        100000, description="Số dòng mỗi chunk khi dùng external_memory"
+    )
+    tune: Optional[str] = Field(
+        None,
+        description="Tìm hyperparameters song song trước khi train: random hoặc halving",
+    )
+    n_trials: Optional[int] = Field(
+        20, description="Số bộ hyperparameters thử khi tune"
+    )
+    tune_workers: Optional[int] = Field(
+        None, description="Số process song song khi tune (mặc định = số CPU)"
+    )
+    incremental: Optional[str] = Field(
+        None,
+        description="Train tiếp từ model hiện tại trên dữ liệu mới: append hoặc refresh",
+    )
+    incremental_rounds: Optional[int] = Field(
+        50, description="Số cây thêm vào khi incremental=append"
+    )
+    distributed_workers: Optional[int] = Field(
+        None,
+        description="Train data-parallel trên local cluster gồm số worker process này",
+    )
+    full_features: Optional[bool] = Field(
+        False,
+        description="Train trên toàn bộ cột của dataset, cột chuỗi dùng native categorical",
+    )
+    prediction_grid: Optional[bool] = Field(
+        False,
+        description=(
+            "Tính sẵn lưới dự đoán sau khi train (chỉ model 6 features của form, "
+            "bỏ qua nếu sai số nội suy vượt ngưỡng)"
+        ),
+    )
+    progressive: Optional[bool] = Field(
+        False,
+        description="Phục vụ ngay model preview (mẫu phân tầng), train full chạy nền",
+    )
+    preview_fraction: Optional[float] = Field(
+        0.1, description="Tỉ lệ tập train dùng cho model preview"
+    )
+    comps_index: Optional[bool] = Field(
+        True, description="Tạo index các căn nhà train cho /predict/comps"
+    )
 
 
 class TrainResponse(BaseModel):
@@ -96,14 +275,25 @@ class TrainResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Load model khi khởi động server"""
+    if audit_log is not None:
+        audit_log.start()
+    resource_policy.apply_serving()
     try:
         model.load()
+        resource_policy.apply_inference(model)
     except FileNotFoundError:
         print(
             "Warning: Model chưa được train. Vui lòng train model trước khi sử dụng API."
         )
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Ghi nốt audit log trước khi tắt server"""
+    if audit_log is not None:
+        audit_log.close()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -138,6 +328,60 @@ async def get_model_info():
         )
 
 
+@app.get("/monitoring/drift")
+async def get_drift():
+    """
+    Độ lệch phân phối của input /predict và giá dự đoán so với dữ liệu train
+    (PSI, Jensen-Shannon, KS trên histogram, không lưu request nào)
+    """
+    if model.drift_monitor is None:
+        return {
+            "status": "no_reference",
+            "message": "Model chưa có histogram tham chiếu, cần train lại model",
+        }
+    return {"status": "success", "drift": model.drift_monitor.report()}
+
+
+@app.get("/monitoring/audit")
+async def get_audit_stats():
+    """Bộ đếm của audit log (đã ghi, bị bỏ, hàng đợi, lỗi ghi)"""
+    if audit_log is None:
+        return {"status": "disabled"}
+    return {"status": "success", "audit": audit_log.stats()}
+
+
+@app.get("/monitoring/cache")
+async def get_prediction_cache_stats():
+    """Bộ đếm cache /predict của worker này và số entry của cache dùng chung"""
+    if prediction_cache is None:
+        return {"status": "disabled"}
+    return {"status": "success", "cache": prediction_cache.stats()}
+
+
+@app.get("/resources")
+async def get_resources():
+    """Phân bổ core/thread hiện tại giữa inference và training"""
+    return {"status": "success", "allocation": resource_policy.allocation()}
+
+
+async def _audit(endpoint, model_version, records):
+    """
+    Ghi các record (features, giá raw, giá VND) vào audit log
+
+    Policy "block" có thể chờ hàng đợi nên chạy trong thread pool, không
+    chặn event loop
+    """
+    if audit_log is None:
+        return
+    if audit_log.policy == "block":
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, audit_log.log_many, endpoint, model_version, records
+        )
+    else:
+        audit_log.log_many(endpoint, model_version, records)
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_price(house: HouseFeatures):
     """
@@ -155,101 +399,41 @@ async def predict_price(house: HouseFeatures):
         )
 
     try:
-        # Chuyển đổi features thành dict
-        features_dict = house.dict()
-
-        # Tính location_score và location premium từ địa chỉ
-        location_premium = 0  # Phần trăm tăng/giảm giá dựa trên địa chỉ
-        original_location_score = features_dict.get("location_score")
-
-        if house.location:
-            location_lower = house.location.lower().strip()
-
-            # Tính điểm dựa trên địa chỉ với độ phân biệt cao hơn
-            location_hash = hash(location_lower)
+        # Chuyển đổi features thành dict, giữ input gốc (có địa chỉ, tọa độ)
+        # cho audit log vì apply_location bỏ các key đó
+        raw_features = house.dict()
+        features_dict = dict(raw_features)
+
+        # Key theo version model và input gốc (trước apply_location)
+        cache_key = None
+        cached = None
+        if prediction_cache is not None:
+            cache_key = PredictionCache.key(
+                f"{model.version}/pricing_v{PRICING_VERSION}", raw_features
+            )
+            cached = prediction_cache.get(cache_key)
 
-            # Tạo location_score từ 3-9 (không quá cực đoan)
-            location_score = 3 + (abs(location_hash % 60) / 10.0)  # 3.0 - 9.0
+        if cached is not None:
+            predicted_price_raw, predicted_price, features_dict = cached
+            model.record_prediction(features_dict, predicted_price_raw)
+        else:
+            # Tính location_score và location premium từ tọa độ hoặc địa chỉ
+            location_premium = apply_location(features_dict)
 
-            # Tính location premium dựa trên địa chỉ (ảnh hưởng trực tiếp đến giá)
-            # Hash địa chỉ để tạo premium từ -30% đến +50%
-            premium_hash = hash(location_lower + "premium")
-            location_premium = (abs(premium_hash % 80) - 40) / 100.0  # -0.4 đến +0.4
+            # Dự đoán
+            predicted_price_raw = model.predict(features_dict)
 
-            # Nếu có location_score từ user, kết hợp với địa chỉ
-            if original_location_score:
-                # Kết hợp: 60% từ user input, 40% từ địa chỉ
-                location_score = (original_location_score * 0.6) + (
-                    location_score * 0.4
+            # Áp dụng location premium và convert từ USD sang VND
+            predicted_price = postprocess_price(predicted_price_raw, location_premium)
+            if cache_key is not None:
+                prediction_cache.put(
+                    cache_key, [predicted_price_raw, predicted_price, features_dict]
                 )
-            else:
-                # Chỉ dùng điểm từ địa chỉ
-                features_dict["location_score"] = location_score
-
-            # Điều chỉnh premium dựa trên keywords trong địa chỉ
-            premium_keywords = {
-                "quận 1": 0.3,
-                "quận 2": 0.25,
-                "quận 3": 0.2,
-                "quận 7": 0.2,
-                "quận bình thạnh": 0.15,
-                "quận phú nhuận": 0.15,
-                "quận tân bình": 0.1,
-                "quận gò vấp": 0.1,
-                "quận 12": -0.1,
-                "quận bình tân": -0.1,
-                "huyện": -0.15,
-            }
-
-            for keyword, bonus in premium_keywords.items():
-                if keyword in location_lower:
-                    location_premium += bonus
-                    break
-
-            # Giới hạn premium trong khoảng hợp lý
-            location_premium = max(-0.3, min(0.5, location_premium))
-
-        # Loại bỏ location khỏi features_dict (model không cần)
-        features_dict.pop("location", None)
-
-        # Dự đoán
-        predicted_price_raw = model.predict(features_dict)
-
-        # Áp dụng location premium vào giá
-        if location_premium != 0:
-            predicted_price_raw = predicted_price_raw * (1 + location_premium)
-
-        # Convert từ USD sang VND
-        # Ames Housing dataset có giá từ $34,900 - $755,000 USD
-        # Nếu giá < 1,000,000 VND thì có thể là USD và cần convert
-        USD_TO_VND = 24500  # Tỷ giá hiện tại
-
-        # Kiểm tra xem giá có phải USD không
-        # Nếu giá trong khoảng $10,000 - $1,000,000 thì là USD
-        if 10000 <= predicted_price_raw <= 1000000:
-            # Chắc chắn là USD (Ames Housing range)
-            predicted_price = predicted_price_raw * USD_TO_VND
-        elif predicted_price_raw < 10000:
-            # Giá quá thấp, có thể model predict sai hoặc đã là VND
-            # Thử convert xem (có thể là $11 USD = 269,500 VND)
-            if predicted_price_raw < 1000:
-                # Có thể là USD nhỏ, convert
-                predicted_price = predicted_price_raw * USD_TO_VND
-            else:
-                # Có thể đã là VND hoặc model predict sai
-                predicted_price = predicted_price_raw
-        else:
-            # Giá > 1,000,000 - có thể đã là VND hoặc USD lớn
-            # Kiểm tra: nếu giá > 24,500,000,000 VND thì có thể là USD lớn
-            if predicted_price_raw > 24500000000:
-                # Quá lớn, có thể là USD * 1,000,000, không convert
-                predicted_price = predicted_price_raw
-            elif predicted_price_raw > 1000000:
-                # Có thể đã là VND
-                predicted_price = predicted_price_raw
-            else:
-                # Trong khoảng 1M - 24.5B, có thể là USD, convert
-                predicted_price = predicted_price_raw * USD_TO_VND
+        await _audit(
+            "/predict",
+            model.version,
+            [(raw_features, predicted_price_raw, predicted_price)],
+        )
 
         return PredictionResponse(
             predicted_price=predicted_price, features_used=features_dict
@@ -275,19 +459,145 @@ async def predict_batch(request: BatchPredictionRequest):
         )
 
     try:
-        predictions = []
-        for house in request.houses:
-            features_dict = house.dict()
-            predicted_price = model.predict(features_dict)
-            predictions.append(
-                {"features": features_dict, "predicted_price": predicted_price}
-            )
+        raw_features = [house.dict() for house in request.houses]
+        features_list = [dict(features) for features in raw_features]
+        location_premiums = apply_location_batch(features_list)
+
+        # Dự đoán cả batch trong một lần gọi model, cùng hậu xử lý như /predict
+        predicted_prices_raw = np.atleast_1d(model.predict(features_list))
+        predicted_prices = np.atleast_1d(
+            postprocess_price(predicted_prices_raw, location_premiums)
+        )
+
+        predictions = [
+            {"features": features_dict, "predicted_price": float(predicted_price)}
+            for features_dict, predicted_price in zip(features_list, predicted_prices)
+        ]
+        await _audit(
+            "/predict/batch",
+            model.version,
+            list(zip(raw_features, predicted_prices_raw, predicted_prices)),
+        )
 
         return BatchPredictionResponse(predictions=predictions)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi khi dự đoán batch: {str(e)}")
 
 
+def _find_comps(features_list, k):
+    """Comps của các căn nhà (features đã qua apply_location)"""
+    X = model.encode_features(features_list)
+    results = []
+    for x in X:
+        comps = model.comps_index.comps(x, k=k)
+        for comp in comps:
+            comp["price"] = to_vnd(comp["price_raw"])
+        results.append(comps)
+    return results
+
+
+def _require_comps_index():
+    if model.model is None:
+        raise HTTPException(
+            status_code=503, detail="Model chưa được load. Vui lòng train model trước."
+        )
+    if model.comps_index is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model chưa có index comps, cần train lại model (comps_index=true)",
+        )
+
+
+@app.post("/predict/comps", response_model=CompsResponse)
+async def predict_comps(request: CompsRequest):
+    """
+    k căn nhà trong dữ liệu train giống căn nhà này nhất
+
+    Args:
+        request: Căn nhà và số comps cần lấy
+
+    Returns:
+        Các comps (features, giá, khoảng cách trên features đã chuẩn hoá)
+    """
+    _require_comps_index()
+    try:
+        features_dict = request.house.dict()
+        apply_location(features_dict)
+        comps = _find_comps([features_dict], request.k)[0]
+        return CompsResponse(comps=comps, model_version=model.version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi tìm comps: {str(e)}")
+
+
+@app.post("/predict/comps/batch", response_model=BatchCompsResponse)
+async def predict_comps_batch(request: BatchCompsRequest):
+    """
+    Comps cho nhiều căn nhà cùng lúc
+
+    Args:
+        request: Danh sách các nhà và số comps mỗi nhà
+
+    Returns:
+        Comps của từng nhà theo thứ tự request
+    """
+    _require_comps_index()
+    try:
+        features_list = [house.dict() for house in request.houses]
+        apply_location_batch(features_list)
+        results = _find_comps(features_list, request.k) if features_list else []
+        return BatchCompsResponse(results=results, model_version=model.version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi tìm comps: {str(e)}")
+
+
+@app.post("/predict/sensitivity", response_model=SensitivityResponse)
+async def predict_sensitivity(request: SensitivityRequest):
+    """
+    Đường cong giá khi thay đổi từng feature của một căn nhà
+
+    Args:
+        request: Căn nhà gốc và dãy giá trị cần quét cho mỗi feature
+
+    Returns:
+        Giá căn gốc và giá dự đoán tại từng giá trị của mỗi feature
+    """
+    if model.model is None:
+        raise HTTPException(
+            status_code=503, detail="Model chưa được load. Vui lòng train model trước."
+        )
+
+    sweepable = set(HouseFeatures.model_fields) - {"location", "lat", "lng"}
+    unknown = set(request.features) - sweepable
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Không quét được {sorted(unknown)}, chỉ hỗ trợ {sorted(sweepable)}",
+        )
+    try:
+        sweeps = {
+            feature: sweep_values(**sweep.dict())
+            for feature, sweep in request.features.items()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        features_dict = request.house.dict()
+        key = SensitivityCache.key(model.version, features_dict, sweeps)
+        result = sensitivity_cache.get(key)
+        cached = result is not None
+        if not cached:
+            location_premium = apply_location(features_dict)
+            result = sensitivity_curves(model, features_dict, sweeps, location_premium)
+            sensitivity_cache.put(key, result)
+
+        return SensitivityResponse(model_version=model.version, cached=cached, **result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Lỗi khi tính sensitivity: {str(e)}"
+        )
+
+
 @app.get("/features")
 async def get_features():
     """Lấy danh sách các features mà model yêu cầu"""
@@ -301,6 +611,169 @@ async def get_features():
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy features: {str(e)}")
 
 
+def run_training(target_model, request, data_path, n_jobs, progressive_stage=None):
+    """
+    Train target_model theo TrainRequest (dùng chung cho process API và
+    process train riêng)
+
+    Args:
+        target_model: HousePriceModel cần train
+        request: TrainRequest
+        data_path: File dữ liệu đã kiểm tra tồn tại
+        n_jobs: Số thread XGBoost của lần train này (ngân sách training)
+        progressive_stage: "preview" hoặc "full" khi train progressive
+
+    Returns:
+        Dict performance cho TrainResponse
+    """
+    # Train model với dữ liệu thật
+    print("Đang train model...")
+    train_options = {
+        "quantile_dmatrix": request.quantile_dmatrix,
+        "max_bin": request.max_bin,
+        "tune": request.tune,
+        "n_trials": request.n_trials,
+        "tune_workers": request.tune_workers,
+        "incremental": request.incremental,
+        "incremental_rounds": request.incremental_rounds,
+        # Đo từng bước (load, preprocess, fit, ...) của lần train này
+        "instrumentation": TrainingInstrumentation(),
+        "params": {"n_jobs": n_jobs},
+        "progressive": progressive_stage,
+        "preview_fraction": request.preview_fraction,
+        "comps_index": request.comps_index,
+    }
+
+    if request.distributed_workers:
+        # Mỗi worker đọc phần shard của mình, đồng bộ qua collective của XGBoost
+        result = target_model.train(
+            data_path=data_path,
+            distributed_workers=request.distributed_workers,
+            chunk_size=request.chunk_size,
+            max_bin=request.max_bin,
+            instrumentation=train_options["instrumentation"],
+            params=train_options["params"],
+        )
+    elif request.external_memory:
+        # Đọc, preprocess và train theo từng chunk, không qua processed CSV
+        result = target_model.train(
+            data_path=data_path,
+            external_memory=True,
+            chunk_size=request.chunk_size,
+            max_bin=request.max_bin,
+            instrumentation=train_options["instrumentation"],
+            params=train_options["params"],
+            comps_index=request.comps_index,
+        )
+    # Nếu không phải generate_sample, sử dụng preprocessing cho dữ liệu thật
+    elif not request.generate_sample:
+        try:
+            # Đọc và preprocess dữ liệu (có cache theo hash file gốc)
+            df_processed, transformer = load_processed(
+                data_path,
+                dataset_type="full" if request.full_features else "generic",
+                instrumentation=train_options["instrumentation"],
+                return_transformer=True,
+            )
+
+            # Train thẳng với DataFrame đã xử lý, preprocessing lưu cùng model
+            result = target_model.train(
+                X=df_processed.iloc[:, :-1],
+                y=df_processed.iloc[:, -1],
+                transformer=transformer,
+                **train_options,
+            )
+        except Exception as e:
+            print(f"⚠ Lỗi khi preprocess dữ liệu thật: {e}")
+            print("Đang train với dữ liệu gốc...")
+            result = target_model.train(data_path=data_path, **train_options)
+    else:
+        # Train với dữ liệu mẫu (đã có format đúng)
+        result = target_model.train(data_path=data_path, **train_options)
+
+    # Lấy metrics từ kết quả
+    metrics = result.get("metrics", {}) if isinstance(result, dict) else {}
+    performance = {
+        "metrics": metrics,
+        "feature_count": (
+            len(target_model.feature_names) if target_model.feature_names else 0
+        ),
+        "features": target_model.feature_names,
+    }
+    if isinstance(result, dict) and "tuning" in result:
+        performance["tuning"] = result["tuning"]
+    if target_model.category_maps:
+        performance["categorical_features"] = list(target_model.category_maps)
+    if isinstance(result, dict) and "distributed" in result:
+        performance["distributed"] = result["distributed"]
+    if isinstance(result, dict) and "instrumentation" in result:
+        performance["instrumentation"] = result["instrumentation"]
+    if isinstance(result, dict) and "progressive" in result:
+        performance["progressive"] = result["progressive"]
+    # Giai đoạn full giữ preview thì lưới của preview vẫn dùng được
+    if (
+        request.prediction_grid
+        and target_model.feature_names == GRID_FEATURES
+        and target_model.prediction_grid is None
+    ):
+        performance["prediction_grid"] = build_prediction_grid(target_model)
+
+    return performance
+
+
+def _training_job(model_path, request_data, data_path, n_jobs, progressive_stage=None):
+    """Job chạy trong process train riêng (ResourcePolicy.run_training)"""
+    target_model = HousePriceModel(model_path=model_path)
+    return run_training(
+        target_model, TrainRequest(**request_data), data_path, n_jobs, progressive_stage
+    )
+
+
+async def _train_in_background(request_data, data_path, progressive_stage):
+    """
+    Train trên model riêng (process train hoặc thread), không chặn event loop,
+    xong thì load lại model đã lưu
+    """
+    loop = asyncio.get_running_loop()
+    args = (
+        model.model_path,
+        request_data,
+        data_path,
+        resource_policy.training_threads,
+        progressive_stage,
+    )
+    if resource_policy.isolate_training:
+        performance = await loop.run_in_executor(
+            None, resource_policy.run_training, _training_job, *args
+        )
+    else:
+        performance = await loop.run_in_executor(None, _training_job, *args)
+    model.load()
+    resource_policy.apply_inference(model)
+    return performance
+
+
+async def _progressive_full_stage(request_data, data_path):
+    """Giai đoạn full của train progressive, thay preview nếu holdout tốt hơn"""
+    async with training_lock:
+        try:
+            performance = await _train_in_background(request_data, data_path, "full")
+            print(f"Giai đoạn full: {performance['progressive']['full']['status']}")
+        except Exception as e:
+            print(f"⚠ Lỗi khi train giai đoạn full: {e}")
+            # Lưu vào file model preview, không chỉ trong bộ nhớ worker này
+            loop = asyncio.get_running_loop()
+            try:
+                progressive = await loop.run_in_executor(
+                    None, mark_full_failed, model.model_path, repr(e)
+                )
+            except Exception as save_error:
+                print(f"⚠ Không lưu được trạng thái giai đoạn full: {save_error}")
+                progressive = None
+            if progressive is not None and model.progressive:
+                model.progressive["full"] = progressive["full"]
+
+
 @app.post("/train", response_model=TrainResponse)
 async def train_model_endpoint(request: TrainRequest = TrainRequest()):
     """
@@ -312,6 +785,7 @@ async def train_model_endpoint(request: TrainRequest = TrainRequest()):
     Returns:
         Kết quả train
     """
+    global progressive_task
     try:
         data_path = request.data_path or "data/house_data.csv"
 
@@ -326,44 +800,50 @@ async def train_model_endpoint(request: TrainRequest = TrainRequest()):
                 status_code=404, detail=f"Không tìm thấy file dữ liệu tại {data_path}"
             )
 
-        # Train model với dữ liệu thật
-        print("Đang train model...")
-
-        # Nếu không phải generate_sample, sử dụng preprocessing cho dữ liệu thật
-        if not request.generate_sample:
-            try:
-                # Đọc và preprocess dữ liệu
-                df = pd.read_csv(data_path)
-                df_processed = preprocess_generic_data(df)
-
-                # Lưu dữ liệu đã xử lý
-                processed_path = "data/processed_data.csv"
-                os.makedirs("data", exist_ok=True)
-                df_processed.to_csv(processed_path, index=False)
-                print(f"✓ Đã preprocess và lưu tại: {processed_path}")
-
-                # Train với dữ liệu đã xử lý
-                result = model.train(data_path=processed_path)
-            except Exception as e:
-                print(f"⚠ Lỗi khi preprocess dữ liệu thật: {e}")
-                print("Đang train với dữ liệu gốc...")
-                result = model.train(data_path=data_path)
-        else:
-            # Train với dữ liệu mẫu (đã có format đúng)
-            result = model.train(data_path=data_path)
+        if request.progressive and (
+            request.distributed_workers
+            or request.external_memory
+            or request.tune
+            or request.incremental
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail="progressive không dùng cùng distributed/external_memory/tune/incremental",
+            )
+        progressive_stage = "preview" if request.progressive else None
+
+        async with training_lock:
+            if resource_policy.isolate_training:
+                # Train trong process con có độ ưu tiên thấp, event loop vẫn
+                # phục vụ /predict trong lúc chờ; xong thì load model mới
+                performance = await _train_in_background(
+                    request.model_dump(), data_path, progressive_stage
+                )
+            else:
+                performance = run_training(
+                    model,
+                    request,
+                    data_path,
+                    resource_policy.training_threads,
+                    progressive_stage,
+                )
+                resource_policy.apply_inference(model)
 
-        # Lấy metrics từ kết quả
-        metrics = result.get("metrics", {}) if isinstance(result, dict) else {}
+        if request.progressive:
+            # Preview đã được phục vụ; train full tiếp tục chạy nền
+            progressive_task = asyncio.create_task(
+                _progressive_full_stage(request.model_dump(), data_path)
+            )
 
         return TrainResponse(
             status="success",
-            message="Model đã được train thành công!",
+            message=(
+                "Model preview đã sẵn sàng, model full đang train nền"
+                if request.progressive
+                else "Model đã được train thành công!"
+            ),
             model_path=model.model_path,
-            performance={
-                "metrics": metrics,
-                "feature_count": len(model.feature_names) if model.feature_names else 0,
-                "features": model.feature_names,
-            },
+            performance=performance,
         )
 
     except HTTPException:
@@ -0,0 +1,351 @@
+"""
+Audit log cho mọi dự đoán (input, version model, output) không chặn request
+
+/predict chỉ đưa record vào hàng đợi trong bộ nhớ; một thread nền gom record
+thành batch và ghi vào file cột nén (Parquet zstd nếu có pyarrow, không thì
+JSON lines gzip), xoay file theo số dòng hoặc thời gian. File đang ghi có đuôi
+.inprogress và chỉ được đổi tên khi đóng, nên file .parquet luôn đọc được.
+
+Khi disk không theo kịp và hàng đợi đầy:
+- policy "block" (mặc định): chờ tối đa block_timeout giây (backpressure),
+  quá thì bỏ. Thread gọi bị chặn, nên handler async phải gọi qua thread pool
+- policy "drop": bỏ record ngay (không ảnh hưởng latency, mặc định của API)
+Record bị bỏ được đếm trong dropped và in cảnh báo (lần đầu, rồi mỗi khi số
+record bị bỏ tăng gấp 10).
+
+Tên file gồm pid nên nhiều worker uvicorn ghi chung một thư mục không ghi đè
+file của nhau.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Cấu hình mặc định
+DEFAULT_AUDIT_DIR = "logs/audit"
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 1.0
+MAX_QUEUE = 100_000
+ROTATE_ROWS = 1_000_000
+ROTATE_SECONDS = 3600
+# Số record serialize liên tục trước khi nhường GIL
+SERIALIZE_SLICE = 100
+
+# Các cột của một record
+AUDIT_COLUMNS = [
+    "timestamp",
+    "endpoint",
+    "model_version",
+    "features",
+    "predicted_price_raw",
+    "predicted_price",
+]
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class AuditLog:
+    """
+    Sink ghi audit log bằng thread nền
+
+    Args:
+        directory: Thư mục chứa file audit
+        batch_size: Số record tối đa mỗi lần ghi
+        flush_interval: Thời gian (giây) tối đa một record nằm trong hàng đợi
+        max_queue: Số record tối đa chờ ghi
+        rotate_rows: Số dòng tối đa mỗi file
+        rotate_seconds: Thời gian tối đa ghi vào một file
+        policy: "block" hoặc "drop" khi hàng đợi đầy
+        block_timeout: Thời gian chờ tối đa (giây) với policy "block"
+    """
+
+    def __init__(
+        self,
+        directory=DEFAULT_AUDIT_DIR,
+        batch_size=BATCH_SIZE,
+        flush_interval=FLUSH_INTERVAL,
+        max_queue=MAX_QUEUE,
+        rotate_rows=ROTATE_ROWS,
+        rotate_seconds=ROTATE_SECONDS,
+        policy="block",
+        block_timeout=0.05,
+    ):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"policy không hợp lệ: {policy}")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_rows = rotate_rows
+        self.rotate_seconds = rotate_seconds
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.format = "parquet" if _has_pyarrow() else "jsonl.gz"
+
+        self.max_queue = max_queue
+        self._queue = deque()
+        # log_many đưa cả batch vào hàng đợi trong một lần
+        self._batch_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._space = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._writer = None
+        self._file_path = None
+        self._file_rows = 0
+        self._file_opened = 0.0
+        self._sequence = 0
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.last_error = None
+        self.files_written = 0
+        self._next_drop_warning = 1
+
+    def start(self):
+        """Khởi động thread ghi"""
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-writer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def log(self, endpoint, model_version, features, predicted_price_raw, price):
+        """
+        Đưa một record vào hàng đợi (không ghi disk trong request)
+
+        features được serialize ở thread ghi, nên không được sửa dict sau khi log.
+
+        Returns:
+            False nếu record bị bỏ vì hàng đợi đầy
+        """
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "drop" or not self._wait_for_space():
+                self._record_drop(1, "hàng đợi đầy")
+                return False
+        # deque.append an toàn giữa các thread, không cần lock
+        self._queue.append(
+            (
+                time.time(),
+                endpoint,
+                model_version,
+                features,
+                float(predicted_price_raw),
+                float(price),
+            )
+        )
+        self.enqueued += 1
+        # Chỉ đánh thức thread ghi khi đủ một batch, tránh chuyển thread mỗi request
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def log_many(self, endpoint, model_version, records):
+        """
+        Đưa nhiều record (features, predicted_price_raw, price) vào hàng đợi
+
+        Cả batch chỉ chờ chỗ trống một lần (policy "block"), phần không còn
+        chỗ trong hàng đợi bị bỏ.
+
+        Returns:
+            Số record đã đưa vào hàng đợi
+        """
+        now = time.time()
+        rows = [
+            (now, endpoint, model_version, features, float(raw), float(price))
+            for features, raw, price in records
+        ]
+        if not rows:
+            return 0
+        with self._batch_lock:
+            if len(self._queue) + len(rows) > self.max_queue and self.policy == "block":
+                self._wait_for_space(min(len(rows), self.max_queue))
+            accepted = rows[: max(0, self.max_queue - len(self._queue))]
+            self._queue.extend(accepted)
+        self.enqueued += len(accepted)
+        if len(accepted) < len(rows):
+            self._record_drop(len(rows) - len(accepted), "hàng đợi đầy")
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+        return len(accepted)
+
+    def _record_drop(self, n_records, reason):
+        """Đếm record bị bỏ, cảnh báo lần đầu rồi mỗi khi số bị bỏ tăng gấp 10"""
+        self.dropped += n_records
+        if self.dropped >= self._next_drop_warning:
+            print(
+                f"⚠ Audit log đã bỏ {self.dropped} record ({reason}), "
+                f"xem /monitoring/audit"
+            )
+            while self._next_drop_warning <= self.dropped:
+                self._next_drop_warning *= 10
+
+    def _wait_for_space(self, n_records=1):
+        """
+        Backpressure: chờ thread ghi giải phóng chỗ cho n_records record, tối đa
+        block_timeout
+        """
+        self._wake.set()
+        deadline = time.perf_counter() + self.block_timeout
+        while len(self._queue) + n_records > self.max_queue:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False
+            self._space.wait(remaining)
+            self._space.clear()
+        return True
+
+    def _drain(self):
+        """Lấy tối đa batch_size record khỏi hàng đợi"""
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set() or self._queue:
+            # Ghi theo chu kỳ flush_interval hoặc khi log() báo đủ batch
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            while self._queue:
+                batch = self._drain()
+                self._space.set()
+                try:
+                    self._write(batch)
+                    self.written += len(batch)
+                except Exception as e:  # Lỗi disk không được làm hỏng API
+                    self.write_errors += 1
+                    self.last_error = repr(e)
+                    self._record_drop(len(batch), f"lỗi ghi: {e!r}")
+                    self._close_file()
+                self._rotate_if_needed()
+                # Nhường GIL cho thread xử lý request giữa các batch
+                time.sleep(0)
+            self._rotate_if_needed()
+        self._close_file()
+
+    def _rotate_if_needed(self):
+        if self._writer is not None and (
+            self._file_rows >= self.rotate_rows
+            or time.time() - self._file_opened >= self.rotate_seconds
+        ):
+            self._close_file()
+
+    def _open_file(self):
+        self._sequence += 1
+        # pid: các worker cùng mở file trong một giây không trùng tên
+        name = (
+            f"audit_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+            f"_{self._sequence:04d}"
+        )
+        self._file_path = os.path.join(self.directory, f"{name}.{self.format}")
+        self._file_rows = 0
+        self._file_opened = time.time()
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema(
+                [
+                    ("timestamp", pa.timestamp("ms", tz="UTC")),
+                    ("endpoint", pa.string()),
+                    ("model_version", pa.string()),
+                    ("features", pa.string()),
+                    ("predicted_price_raw", pa.float64()),
+                    ("predicted_price", pa.float64()),
+                ]
+            )
+            self._writer = pq.ParquetWriter(
+                self._file_path + ".inprogress", schema, compression="zstd"
+            )
+        else:
+            self._writer = gzip.open(self._file_path + ".inprogress", "wt")
+
+    def _write(self, batch):
+        if self._writer is None:
+            self._open_file()
+        columns = list(zip(*batch))
+        features = []
+        for start in range(0, len(batch), SERIALIZE_SLICE):
+            features.extend(
+                json.dumps(f, ensure_ascii=False, default=str)
+                for f in columns[3][start : start + SERIALIZE_SLICE]
+            )
+            # Serialize từng phần rồi nhường GIL để không giữ request quá lâu
+            time.sleep(0)
+        if self.format == "parquet":
+            import pyarrow as pa
+
+            table = pa.Table.from_arrays(
+                [
+                    pa.array([int(t * 1000) for t in columns[0]], pa.int64()).cast(
+                        pa.timestamp("ms", tz="UTC")
+                    ),
+                    pa.array(columns[1], pa.string()),
+                    pa.array(columns[2], pa.string()),
+                    pa.array(features, pa.string()),
+                    pa.array(columns[4], pa.float64()),
+                    pa.array(columns[5], pa.float64()),
+                ],
+                schema=self._writer.schema,
+            )
+            self._writer.write_table(table)
+        else:
+            for record, feature_json in zip(batch, features):
+                row = dict(zip(AUDIT_COLUMNS, record))
+                row["features"] = feature_json
+                self._writer.write(json.dumps(row) + "\n")
+        self._file_rows += len(batch)
+
+    def _close_file(self):
+        if self._writer is None:
+            return
+        try:
+            self._writer.close()
+            os.replace(self._file_path + ".inprogress", self._file_path)
+            self.files_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            self.last_error = repr(e)
+        finally:
+            self._writer = None
+
+    def close(self, timeout=30):
+        """Ghi nốt hàng đợi, đóng file và dừng thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        """Bộ đếm của sink (cho /monitoring/audit)"""
+        return {
+            "dropped": self.dropped,
+            "directory": self.directory,
+            "format": self.format,
+            "policy": self.policy,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "queue_size": len(self._queue),
+            "write_errors": self.write_errors,
+            "last_error": self.last_error,
+            "files": self.files_written,
+            "current_file_rows": self._file_rows if self._writer else 0,
+        }
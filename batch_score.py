@@ -0,0 +1,209 @@
+"""
+Chấm giá offline cho file lớn (CSV/Parquet) bằng nhiều process
+
+Process cha đọc dữ liệu theo từng chunk và gửi cho process pool; mỗi worker
+load model một lần (initializer), tính features bằng preprocessing đã fit
+lúc train (FeatureTransformer lưu cùng model; model cũ lấy các cột theo
+feature_names), dự đoán, thêm cột predicted_price_raw và predicted_price_vnd
+(cùng hậu xử lý như /predict: premium theo lat/lng nếu có, quy đổi VND) rồi
+tự ghi shard part-NNNNN của chunk đó. Số chunk đang xử lý bị giới hạn nên bộ
+nhớ không phụ thuộc kích thước file; thứ tự dòng được giữ theo thứ tự shard.
+
+Chạy:
+    python batch_score.py data/listings.csv data/scored --workers 4
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from external_memory import iter_raw_chunks
+
+DEFAULT_CHUNK_SIZE = 100_000
+# Số chunk tối đa đang chờ xử lý trên mỗi worker
+IN_FLIGHT_PER_WORKER = 2
+
+# Model của worker, load một lần trong _init_worker
+_worker_model = None
+
+
+def _init_worker(model_path):
+    global _worker_model
+    from model import HousePriceModel
+
+    _worker_model = HousePriceModel(model_path=model_path)
+    _worker_model.load()
+    # Worker không phục vụ request nên không cần lưới dự đoán/drift monitor
+    _worker_model.prediction_grid = None
+    _worker_model.drift_monitor = None
+    # Song song theo process: mỗi worker một thread XGBoost, tránh N worker x
+    # N thread tranh nhau CPU làm mất khả năng scale theo số core
+    _worker_model.model.set_params(n_jobs=1)
+
+
+def score_frame(model, chunk):
+    """
+    Dự đoán cho một DataFrame
+
+    Model có transformer (preprocessing lúc train) nhận cả dữ liệu gốc lẫn
+    file đã có features; model cũ cần đủ các cột feature_names.
+
+    Returns:
+        chunk kèm cột predicted_price_raw, predicted_price_vnd
+    """
+    from gazetteer import get_gazetteer
+    from pricing import postprocess_price
+
+    if model.transformer is None:
+        missing = [f for f in model.feature_names if f not in chunk.columns]
+        if missing:
+            raise ValueError(f"Dữ liệu thiếu các cột feature của model: {missing}")
+
+    premium = np.zeros(len(chunk))
+    X = chunk if model.transformer is not None else chunk[model.feature_names]
+    if "lat" in chunk.columns and "lng" in chunk.columns:
+        # Tra quận của cả chunk trong một lần, như /predict/batch
+        resolved = get_gazetteer().resolve_batch(chunk["lat"], chunk["lng"])
+        premium = np.nan_to_num(resolved["premium"])
+        location_score = pd.Series(resolved["location_score"], index=X.index)
+        if "location_score" in X.columns:
+            X = X.assign(location_score=X["location_score"].fillna(location_score))
+        elif model.transformer is not None:
+            X = X.assign(location_score=location_score)
+
+    if model.transformer is not None:
+        X = model.transformer.transform(X)
+    else:
+        X = model._encode_categories(X).values
+    raw = model.model.predict(X)
+    return chunk.assign(
+        predicted_price_raw=raw,
+        predicted_price_vnd=postprocess_price(raw, premium),
+    )
+
+
+def _write_frame(frame, path, file_format):
+    tmp_path = path + ".tmp"
+    if file_format == "parquet":
+        frame.to_parquet(tmp_path, index=False)
+    else:
+        frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _score_chunk(index, chunk, output_dir, file_format):
+    start = time.perf_counter()
+    scored = score_frame(_worker_model, chunk)
+    path = os.path.join(output_dir, f"part-{index:05d}.{file_format}")
+    _write_frame(scored, path, file_format)
+    return {
+        "shard": index,
+        "path": path,
+        "rows": len(scored),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def batch_score(
+    data_path,
+    output_dir,
+    model_path="models/house_price_model.pkl",
+    n_workers=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    file_format=None,
+):
+    """
+    Chấm giá toàn bộ file/thư mục shard và ghi kết quả thành các shard
+
+    Args:
+        data_path: File CSV/Parquet hoặc thư mục shard
+        output_dir: Thư mục ghi part-NNNNN.<format> và _manifest.json
+        model_path: Model đã train
+        n_workers: Số process, None = số CPU
+        chunk_size: Số dòng mỗi chunk (mỗi chunk là một shard output)
+        file_format: "parquet" hoặc "csv", mặc định theo định dạng input
+
+    Returns:
+        Dict tóm tắt (rows, shards, seconds, rows_per_sec, model_version)
+    """
+    from model import HousePriceModel
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if file_format is None:
+        is_parquet = str(data_path).lower().endswith((".parquet", ".pq"))
+        file_format = "parquet" if is_parquet or os.path.isdir(data_path) else "csv"
+    os.makedirs(output_dir, exist_ok=True)
+    # Đọc metadata model một lần để ghi manifest và báo lỗi sớm nếu thiếu model
+    model = HousePriceModel(model_path=model_path)
+    model.load()
+
+    start = time.perf_counter()
+    shards = []
+    # spawn để worker không kế thừa thread pool của XGBoost từ process cha
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(model_path,),
+    ) as executor:
+        pending = deque()
+        for index, chunk in enumerate(iter_raw_chunks(data_path, chunk_size)):
+            pending.append(
+                executor.submit(_score_chunk, index, chunk, output_dir, file_format)
+            )
+            # Chờ chunk cũ nhất xong trước khi đọc thêm: giới hạn bộ nhớ
+            while len(pending) >= n_workers * IN_FLIGHT_PER_WORKER:
+                shards.append(pending.popleft().result())
+        while pending:
+            shards.append(pending.popleft().result())
+
+    seconds = time.perf_counter() - start
+    rows = sum(s["rows"] for s in shards)
+    summary = {
+        "data_path": str(data_path),
+        "model_version": model.version,
+        "rows": rows,
+        "shards": len(shards),
+        "workers": n_workers,
+        "chunk_size": chunk_size,
+        "format": file_format,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+        "files": [os.path.basename(s["path"]) for s in shards],
+    }
+    with open(os.path.join(output_dir, "_manifest.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    print(
+        f"✓ Đã chấm {rows:,} dòng thành {len(shards)} shard trong {seconds:.1f}s "
+        f"({summary['rows_per_sec']:,} dòng/s, {n_workers} worker) tại {output_dir}"
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chấm giá offline cho file lớn")
+    parser.add_argument("data_path", help="File CSV/Parquet hoặc thư mục shard")
+    parser.add_argument("output_dir", help="Thư mục ghi kết quả")
+    parser.add_argument("--model-path", default="models/house_price_model.pkl")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--format", choices=["parquet", "csv"], default=None)
+    args = parser.parse_args()
+
+    batch_score(
+        args.data_path,
+        args.output_dir,
+        model_path=args.model_path,
+        n_workers=args.workers,
+        chunk_size=args.chunk_size,
+        file_format=args.format,
+    )
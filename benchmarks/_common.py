@@ -0,0 +1,113 @@
+"""
+Tiện ích dùng chung cho các script benchmark
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+# Cho phép import các module ở thư mục gốc (model, app, ...)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _read_status_kb(field):
+    """Đọc một trường (VmRSS, VmHWM, ...) trong /proc/self/status, đơn vị KB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+
+    # Không có /proc (macOS): ru_maxrss là peak
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def rss_mb():
+    """RSS hiện tại của process (MB)"""
+    return _read_status_kb("VmRSS") / 1024
+
+
+def peak_rss_mb():
+    """Peak RSS của process từ lúc khởi động hoặc lần reset gần nhất (MB)"""
+    return _read_status_kb("VmHWM") / 1024
+
+
+def reset_peak_rss():
+    """Reset peak RSS (Linux >= 4.0), trả về False nếu không hỗ trợ"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class Timer:
+    """Context manager đo wall time: with Timer() as t: ...; t.seconds"""
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self.seconds = None
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+
+
+def _isolated_target(result_queue, fn, args, kwargs):
+    try:
+        result_queue.put(("ok", fn(*args, **kwargs)))
+    except Exception as e:  # Trả lỗi về process cha
+        result_queue.put(("error", repr(e)))
+
+
+def run_isolated(fn, *args, **kwargs):
+    """
+    Chạy fn trong một process mới (spawn) để peak RSS không bị lẫn giữa các lần đo
+
+    fn phải là hàm top-level và trả về giá trị picklable.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    process = ctx.Process(
+        target=_isolated_target, args=(result_queue, fn, args, kwargs)
+    )
+    process.start()
+    status, result = result_queue.get()
+    process.join()
+    if status == "error":
+        raise RuntimeError(result)
+    return result
+
+
+def parse_sizes(text):
+    """'50k,1M,10M' -> [50000, 1000000, 10000000]"""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    sizes = []
+    for token in text.split(","):
+        token = token.strip().lower()
+        if token[-1] in multipliers:
+            sizes.append(int(float(token[:-1]) * multipliers[token[-1]]))
+        else:
+            sizes.append(int(token))
+    return sizes
+
+
+def format_table(rows, columns):
+    """In bảng kết quả dạng text, rows là list các dict"""
+    widths = [
+        max(len(col), *(len(str(row.get(col, ""))) for row in rows)) for col in columns
+    ]
+    lines = ["  ".join(col.ljust(w) for col, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for row in rows:
+        lines.append(
+            "  ".join(str(row.get(col, "")).ljust(w) for col, w in zip(columns, widths))
+        )
+    return "\n".join(lines)
@@ -0,0 +1,251 @@
+"""
+Bản preprocessing cũ (pandas, xử lý mọi cột) giữ lại làm mốc so sánh cho
+benchmarks/bench_preprocessing.py
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from train_with_real_data import detect_target_column
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def legacy_preprocess_ames_data(df):
+    """
+    Xử lý Ames Housing dataset và map về features của form
+    """
+    print("Đang xử lý dữ liệu Ames Housing...")
+
+    # Lấy target (SalePrice)
+    if "SalePrice" in df.columns:
+        y = df["SalePrice"]
+        X = df.drop("SalePrice", axis=1)
+    else:
+        raise ValueError("Không tìm thấy cột SalePrice trong dataset")
+
+    # Xử lý missing values cho numerical columns
+    numerical_cols = X.select_dtypes(include=[np.number]).columns
+    X[numerical_cols] = X[numerical_cols].fillna(X[numerical_cols].median())
+
+    # Xử lý missing values cho categorical columns
+    categorical_cols = X.select_dtypes(include=["object"]).columns
+    X[categorical_cols] = X[categorical_cols].fillna("Unknown")
+
+    # Label encoding cho categorical columns
+    label_encoders = {}
+    for col in categorical_cols:
+        le = LabelEncoder()
+        X[col] = le.fit_transform(X[col].astype(str))
+        label_encoders[col] = le
+
+    # Map về các features mà form có thể cung cấp
+    # Form có: area, bedrooms, bathrooms, floors, year_built, location_score
+    X_mapped = pd.DataFrame()
+
+    # Mapping area (diện tích) - Ames dùng sqft, cần convert sang m²
+    # 1 sqft ≈ 0.0929 m², nhưng để đơn giản ta dùng trực tiếp sqft
+    if "GrLivArea" in X.columns:
+        # GrLivArea là diện tích sống chính (sqft)
+        X_mapped["area"] = X["GrLivArea"] * 0.0929  # Convert sqft to m²
+    elif "LotArea" in X.columns:
+        X_mapped["area"] = X["LotArea"] * 0.0929
+    elif "TotalBsmtSF" in X.columns and "1stFlrSF" in X.columns:
+        X_mapped["area"] = (X["TotalBsmtSF"] + X["1stFlrSF"]) * 0.0929
+    else:
+        X_mapped["area"] = 100  # Default
+
+    # Mapping bedrooms
+    if "BedroomAbvGr" in X.columns:
+        X_mapped["bedrooms"] = X["BedroomAbvGr"]
+    else:
+        X_mapped["bedrooms"] = 3
+
+    # Mapping bathrooms
+    if "FullBath" in X.columns:
+        X_mapped["bathrooms"] = X["FullBath"] + (
+            X["HalfBath"] * 0.5 if "HalfBath" in X.columns else 0
+        )
+    else:
+        X_mapped["bathrooms"] = 2
+
+    # Mapping floors
+    if "2ndFlrSF" in X.columns:
+        X_mapped["floors"] = (X["2ndFlrSF"] > 0).astype(int) + 1
+    else:
+        X_mapped["floors"] = 1
+
+    # Mapping year_built
+    if "YearBuilt" in X.columns:
+        X_mapped["year_built"] = X["YearBuilt"]
+    else:
+        X_mapped["year_built"] = 2000
+
+    # Mapping location_score (từ OverallQual)
+    if "OverallQual" in X.columns:
+        X_mapped["location_score"] = X["OverallQual"] / 10.0  # Scale từ 1-10
+    else:
+        X_mapped["location_score"] = 5.0
+
+    # Đảm bảo thứ tự features
+    feature_order = [
+        "area",
+        "bedrooms",
+        "bathrooms",
+        "floors",
+        "year_built",
+        "location_score",
+    ]
+    X_mapped = X_mapped[feature_order]
+
+    # Thêm target
+    X_mapped["Price"] = y
+
+    print(f"✓ Đã map Ames Housing về {len(feature_order)} features: {feature_order}")
+    print(
+        f"✓ Diện tích range: {X_mapped['area'].min():.1f} - {X_mapped['area'].max():.1f} m²"
+    )
+
+    return X_mapped, label_encoders
+
+
+def legacy_preprocess_generic_data(
+    df, target_column=None, fill_values=None, verbose=True
+):
+    """
+    Xử lý dataset tổng quát và map về các features mà form có thể cung cấp
+
+    Args:
+        df: DataFrame dữ liệu gốc
+        target_column: Tên cột target, None để tự động phát hiện
+        fill_values: Giá trị điền missing cho các cột số (Series/dict theo tên
+            cột). None để dùng median của chính df. Truyền vào khi xử lý theo
+            từng chunk để mọi chunk được điền giống nhau
+        verbose: In log quá trình xử lý
+    """
+    log = print if verbose else _silent
+    log("Đang xử lý dữ liệu...")
+
+    # Tìm cột target
+    if target_column:
+        if target_column not in df.columns:
+            raise ValueError(f"Không tìm thấy cột {target_column}")
+    else:
+        target_column = detect_target_column(list(df.columns), log=log)
+
+    y = df[target_column]
+    X = df.drop(target_column, axis=1)
+
+    # Xử lý missing values
+    numerical_cols = X.select_dtypes(include=[np.number]).columns
+    if fill_values is None:
+        fill_values = X[numerical_cols].median()
+    X[numerical_cols] = X[numerical_cols].fillna(fill_values)
+
+    categorical_cols = X.select_dtypes(include=["object"]).columns
+    if len(categorical_cols) > 0:
+        for col in categorical_cols:
+            le = LabelEncoder()
+            X[col] = le.fit_transform(X[col].astype(str))
+
+    # Map features về các features mà form có thể cung cấp
+    # Form có: area, bedrooms, bathrooms, floors, year_built, location_score
+    X_mapped = pd.DataFrame()
+
+    # Mapping area (diện tích)
+    area_cols = [
+        "area",
+        "LotArea",
+        "GrLivArea",
+        "TotalBsmtSF",
+        "1stFlrSF",
+        "LotFrontage",
+        "LotArea",
+    ]
+    for col in area_cols:
+        if col in X.columns:
+            X_mapped["area"] = X[col]
+            log(f"✓ Map {col} -> area")
+            break
+    if "area" not in X_mapped.columns:
+        # Nếu không tìm thấy, tính từ các cột liên quan
+        if "GrLivArea" in X.columns:
+            X_mapped["area"] = X["GrLivArea"]
+        elif "TotalBsmtSF" in X.columns and "1stFlrSF" in X.columns:
+            X_mapped["area"] = X["TotalBsmtSF"] + X["1stFlrSF"]
+        else:
+            X_mapped["area"] = X.iloc[:, 0] if len(X.columns) > 0 else 100
+            log("⚠ Không tìm thấy cột area, sử dụng cột đầu tiên")
+
+    # Mapping bedrooms
+    bedroom_cols = ["bedrooms", "BedroomAbvGr", "Bedrooms", "BR"]
+    for col in bedroom_cols:
+        if col in X.columns:
+            X_mapped["bedrooms"] = X[col]
+            log(f"✓ Map {col} -> bedrooms")
+            break
+    if "bedrooms" not in X_mapped.columns:
+        X_mapped["bedrooms"] = 3  # Default
+
+    # Mapping bathrooms
+    if "bathrooms" in X.columns:
+        X_mapped["bathrooms"] = X["bathrooms"]
+    elif "FullBath" in X.columns:
+        X_mapped["bathrooms"] = X["FullBath"] + (
+            X["HalfBath"] * 0.5 if "HalfBath" in X.columns else 0
+        )
+    elif "BsmtFullBath" in X.columns:
+        X_mapped["bathrooms"] = X["BsmtFullBath"] + (
+            X["BsmtHalfBath"] * 0.5 if "BsmtHalfBath" in X.columns else 0
+        )
+    else:
+        X_mapped["bathrooms"] = 2  # Default
+
+    # Mapping floors
+    if "floors" in X.columns:
+        X_mapped["floors"] = X["floors"]
+    elif "2ndFlrSF" in X.columns:
+        X_mapped["floors"] = (X["2ndFlrSF"] > 0).astype(int) + 1
+    else:
+        X_mapped["floors"] = 1  # Default
+
+    # Mapping year_built
+    year_cols = ["year_built", "YearBuilt", "YearRemodAdd", "YrBuilt"]
+    for col in year_cols:
+        if col in X.columns:
+            X_mapped["year_built"] = X[col]
+            log(f"✓ Map {col} -> year_built")
+            break
+    if "year_built" not in X_mapped.columns:
+        X_mapped["year_built"] = 2000  # Default
+
+    # Mapping location_score (từ OverallQual hoặc OverallCond)
+    if "location_score" in X.columns:
+        X_mapped["location_score"] = X["location_score"]
+    elif "OverallQual" in X.columns:
+        X_mapped["location_score"] = X["OverallQual"] / 10.0  # Scale từ 1-10
+    elif "OverallCond" in X.columns:
+        X_mapped["location_score"] = X["OverallCond"] / 10.0
+    else:
+        X_mapped["location_score"] = 5.0  # Default
+
+    # Đảm bảo thứ tự features: area, bedrooms, bathrooms, floors, year_built, location_score
+    feature_order = [
+        "area",
+        "bedrooms",
+        "bathrooms",
+        "floors",
+        "year_built",
+        "location_score",
+    ]
+    X_mapped = X_mapped[feature_order]
+
+    # Thêm target
+    X_mapped["Price"] = y
+
+    log(f"✓ Đã map về {len(feature_order)} features: {feature_order}")
+
+    return X_mapped
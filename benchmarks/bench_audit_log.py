@@ -0,0 +1,170 @@
+"""
+Benchmark: latency của /predict khi bật audit log
+
+Gọi trực tiếp handler predict_price (không qua HTTP) với cùng một model và
+so sánh p50/p99 giữa:
+- none: không audit
+- async_drop / async_block: AuditLog (thread nền, Parquet) với hai policy
+- sync_fsync: ghi JSON line + fsync ngay trong request (cách làm đồng bộ)
+- slow_disk_drop / slow_disk_block: AuditLog với disk giả lập chậm (mỗi batch
+  chờ --slow-write-ms) và hàng đợi nhỏ, để thấy drop giữ nguyên latency còn
+  block tạo backpressure
+
+Chạy:
+    python benchmarks/bench_audit_log.py --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _common import format_table, parse_sizes
+
+os.environ["AUDIT_LOG"] = "0"
+# Đo đúng thời gian dự đoán, không trả kết quả từ cache dùng chung
+os.environ["PREDICTION_CACHE"] = "0"
+
+
+class SyncAuditLog:
+    """Audit đồng bộ để so sánh: mỗi request ghi một dòng và fsync"""
+
+    def __init__(self, path):
+        self._file = open(path, "a")
+        self.written = 0
+        self.dropped = 0
+
+    def log(self, endpoint, model_version, features, predicted_price_raw, price):
+        record = {
+            "timestamp": time.time(),
+            "endpoint": endpoint,
+            "model_version": model_version,
+            "features": features,
+            "predicted_price_raw": float(predicted_price_raw),
+            "predicted_price": float(price),
+        }
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.written += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _slow_audit_log(directory, slow_write_ms, policy):
+    from audit import AuditLog
+
+    class SlowAuditLog(AuditLog):
+        def _write(self, batch):
+            time.sleep(slow_write_ms / 1000)
+            super()._write(batch)
+
+    return SlowAuditLog(directory, batch_size=100, max_queue=200, policy=policy)
+
+
+def measure(app_module, houses, audit_log):
+    """Latency (µs) của từng request predict_price"""
+    app_module.audit_log = audit_log
+    loop = asyncio.new_event_loop()
+    latencies = []
+    try:
+        for house in houses:
+            start = time.perf_counter()
+            loop.run_until_complete(app_module.predict_price(house))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        loop.close()
+    return np.asarray(latencies) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", default="5k")
+    parser.add_argument("--train-rows", default="20k")
+    parser.add_argument("--slow-write-ms", type=float, default=200)
+    parser.add_argument("--output", default="benchmarks/results/audit_log.json")
+    args = parser.parse_args()
+
+    import app as app_module
+    from audit import AuditLog
+    from create_large_dataset import generate_chunk
+    from model import HousePriceModel
+
+    n_requests, train_rows = parse_sizes(f"{args.requests},{args.train_rows}")
+    rng = np.random.default_rng(42)
+    train = generate_chunk(train_rows, rng)
+    live = generate_chunk(n_requests, rng)
+    houses = [
+        app_module.HouseFeatures(
+            area=float(r["area"]),
+            bedrooms=int(r["bedrooms"]),
+            bathrooms=int(r["bathrooms"]),
+            floors=int(r["floors"]),
+            year_built=int(r["year_built"]),
+            location_score=float(r["location_score"]),
+        )
+        for r in live.to_dict("records")
+    ]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = HousePriceModel(model_path=os.path.join(tmp_dir, "model.pkl"))
+        model.train(X=train.iloc[:, :-1], y=train.iloc[:, -1])
+        app_module.model = model
+        # Warm up
+        measure(app_module, houses[:200], None)
+
+        modes = {
+            "none": lambda: None,
+            "async_drop": lambda: AuditLog(
+                os.path.join(tmp_dir, "drop"), policy="drop"
+            ).start(),
+            "async_block": lambda: AuditLog(
+                os.path.join(tmp_dir, "block"), policy="block"
+            ).start(),
+            "sync_fsync": lambda: SyncAuditLog(os.path.join(tmp_dir, "sync.jsonl")),
+            "slow_disk_drop": lambda: _slow_audit_log(
+                os.path.join(tmp_dir, "slow_drop"), args.slow_write_ms, "drop"
+            ).start(),
+            "slow_disk_block": lambda: _slow_audit_log(
+                os.path.join(tmp_dir, "slow_block"), args.slow_write_ms, "block"
+            ).start(),
+        }
+        base_p99 = None
+        for mode, make_sink in modes.items():
+            sink = make_sink()
+            latencies = measure(app_module, houses, sink)
+            if sink is not None:
+                sink.close()
+            p99 = float(np.percentile(latencies, 99))
+            base_p99 = base_p99 or p99
+            rows.append(
+                {
+                    "mode": mode,
+                    "requests": n_requests,
+                    "p50_us": round(float(np.percentile(latencies, 50)), 1),
+                    "p99_us": round(p99, 1),
+                    "mean_us": round(float(latencies.mean()), 1),
+                    "p99_overhead_pct": round((p99 / base_p99 - 1) * 100, 1),
+                    "written": getattr(sink, "written", 0),
+                    "dropped": getattr(sink, "dropped", 0),
+                }
+            )
+            print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"cpu_count": os.cpu_count(), "results": rows}, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: throughput của batch_score.py theo số worker
+
+Sinh một file Parquet tổng hợp, train một model nhỏ rồi chấm toàn bộ file với
+từng số worker, đo dòng/giây, speedup so với 1 worker và peak RSS của process
+cha và worker (bộ nhớ phải gần như không đổi theo kích thước file).
+
+Chạy:
+    python benchmarks/bench_batch_scoring.py --rows 2m --workers 1,2,4
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+
+import numpy as np
+
+from _common import format_table, parse_sizes, peak_rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="1m")
+    parser.add_argument("--train-rows", default="50k")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--chunk-size", default="100k")
+    parser.add_argument("--output", default="benchmarks/results/batch_scoring.json")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    from batch_score import batch_score
+    from create_large_dataset import generate_chunk
+    from model import HousePriceModel
+
+    n_rows, train_rows, chunk_size = parse_sizes(
+        f"{args.rows},{args.train_rows},{args.chunk_size}"
+    )
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    rng = np.random.default_rng(42)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        train = generate_chunk(train_rows, rng)
+        model = HousePriceModel(model_path=model_path)
+        model.train(X=train.iloc[:, :-1], y=train.iloc[:, -1])
+        model.save()
+
+        data_path = os.path.join(tmp_dir, "listings.parquet")
+        # Bỏ cột giá, như dữ liệu cần chấm thực tế
+        generate_chunk(n_rows, rng).drop(columns="price").to_parquet(data_path)
+
+        base_rate = None
+        for n_workers in worker_counts:
+            output_dir = os.path.join(tmp_dir, f"scored_{n_workers}")
+            summary = batch_score(
+                data_path,
+                output_dir,
+                model_path=model_path,
+                n_workers=n_workers,
+                chunk_size=chunk_size,
+            )
+            scored_rows = sum(
+                len(
+                    pd.read_parquet(
+                        os.path.join(output_dir, name), columns=["predicted_price_vnd"]
+                    )
+                )
+                for name in summary["files"]
+            )
+            assert scored_rows == n_rows, "Số dòng output không khớp input"
+            base_rate = base_rate or summary["rows_per_sec"]
+            rows.append(
+                {
+                    "workers": n_workers,
+                    "rows": n_rows,
+                    "seconds": summary["seconds"],
+                    "rows_per_sec": summary["rows_per_sec"],
+                    "speedup": round(summary["rows_per_sec"] / base_rate, 2),
+                    "parent_peak_mb": round(peak_rss_mb(), 1),
+                    # ru_maxrss của RUSAGE_CHILDREN: peak của worker lớn nhất (KB)
+                    "worker_peak_mb": round(
+                        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+                        1,
+                    ),
+                }
+            )
+            print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"cpu_count": os.cpu_count(), "results": rows}, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
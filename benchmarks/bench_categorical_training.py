@@ -0,0 +1,124 @@
+"""
+Benchmark: train full features bằng native categorical (pandas category +
+bảng mã lưu cùng model) so với label encode mọi cột chuỗi
+
+Cả hai cách đều giữ toàn bộ cột của dataset rộng kiểu Ames. Mỗi cấu hình
+chạy trong process riêng để đo peak RSS chính xác.
+
+Chạy:
+    python benchmarks/bench_categorical_training.py --sizes 10k,100k \
+        --numeric-columns 40 --categorical-columns 40
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+from _common import Timer, format_table, parse_sizes, peak_rss_mb, rss_mb, run_isolated
+
+
+def label_encode_once(data_path):
+    """Đọc toàn bộ CSV, LabelEncoder từng cột chuỗi rồi train (cách cũ)"""
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+
+    from model import HousePriceModel
+
+    rss_before = rss_mb()
+    with Timer() as encode_timer:
+        df = pd.read_csv(data_path)
+        label_encoders = {}
+        for col in df.columns:
+            if df[col].dtype == object:
+                le = LabelEncoder()
+                df[col] = le.fit_transform(df[col].astype(str))
+                label_encoders[col] = le
+        df = df.fillna(df.median())
+        X = df.drop(columns="SalePrice").astype(np.float32)
+        y = df["SalePrice"]
+    return _train(HousePriceModel, X, y, encode_timer.seconds, rss_before)
+
+
+def native_once(data_path):
+    """Đọc bằng ingestion (dataset_type="full") rồi train native categorical"""
+    from ingestion import read_typed_csv
+    from model import HousePriceModel
+    from train_with_real_data import preprocess_full_features
+
+    rss_before = rss_mb()
+    with Timer() as encode_timer:
+        df, target_column = read_typed_csv(data_path, dataset_type="full")
+        df = preprocess_full_features(df, target_column=target_column, verbose=False)
+        X = df.iloc[:, :-1]
+        y = df.iloc[:, -1]
+    return _train(HousePriceModel, X, y, encode_timer.seconds, rss_before)
+
+
+def _train(model_class, X, y, encode_seconds, rss_before):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = model_class(model_path=os.path.join(tmp_dir, "model.pkl"))
+        with Timer() as train_timer:
+            result = model.train(X=X, y=y)
+        model_size_kb = os.path.getsize(model.model_path) / 1024
+    return {
+        "encode_s": round(encode_seconds, 2),
+        "train_s": round(train_timer.seconds, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_delta_mb": round(peak_rss_mb() - rss_before, 1),
+        "model_kb": round(model_size_kb, 1),
+        "rmse": round(result["metrics"]["rmse"], 2),
+        "r2_score": round(result["metrics"]["r2_score"], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k")
+    parser.add_argument("--numeric-columns", type=int, default=40)
+    parser.add_argument("--categorical-columns", type=int, default=40)
+    parser.add_argument("--data-dir", default="data/benchmarks")
+    parser.add_argument(
+        "--output", default="benchmarks/results/categorical_training.json"
+    )
+    args = parser.parse_args()
+
+    from bench_preprocessing import make_wide_dataset
+
+    rows = []
+    for n_rows in parse_sizes(args.sizes):
+        data_path = os.path.join(
+            args.data_dir,
+            f"wide_ames_{n_rows}_{args.numeric_columns}x{args.categorical_columns}.csv",
+        )
+        if not os.path.exists(data_path):
+            os.makedirs(args.data_dir, exist_ok=True)
+            make_wide_dataset(
+                n_rows, args.numeric_columns, args.categorical_columns
+            ).to_csv(data_path, index=False)
+
+        for mode, fn in (("label_encode", label_encode_once), ("native", native_once)):
+            result = run_isolated(fn, data_path)
+            rows.append({"rows": n_rows, "mode": mode, **result})
+            print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "numeric_columns": args.numeric_columns,
+                "categorical_columns": args.categorical_columns,
+                "results": rows,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
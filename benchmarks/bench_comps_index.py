@@ -0,0 +1,116 @@
+"""
+Benchmark: thời gian build và truy vấn của index comps theo số dòng train
+
+Với mỗi kích thước, sinh dữ liệu tổng hợp (create_large_dataset), build index
+(k-means + ghi mảng memory-mapped) rồi đo latency của từng truy vấn top-k,
+throughput khi tìm comps cho cả batch và recall@k so với tìm kiếm vét cạn
+(chính xác) trên cùng khoảng cách chuẩn hoá.
+
+Chạy:
+    python benchmarks/bench_comps_index.py --sizes 100k,1m,3m
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _common import Timer, format_table, parse_sizes, peak_rss_mb, reset_peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100k,1m")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n-probe", type=int, default=None)
+    parser.add_argument("--output", default="benchmarks/results/comps_index.json")
+    args = parser.parse_args()
+
+    from comps import N_PROBE, build_comps_index
+    from create_large_dataset import generate_chunk
+    from model import HousePriceModel
+
+    n_probe = args.n_probe or N_PROBE
+    queries = (
+        generate_chunk(args.queries, np.random.default_rng(0))
+        .iloc[:, :-1]
+        .to_numpy(dtype=np.float32)
+    )
+
+    rows = []
+    for n_rows in parse_sizes(args.sizes):
+        df = generate_chunk(n_rows, np.random.default_rng(42))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Chỉ cần model_path, version và feature_names để build index
+            model = HousePriceModel(model_path=os.path.join(tmp_dir, "model.pkl"))
+            model.version = "bench"
+            model.feature_names = df.columns[:-1].tolist()
+
+            reset_peak_rss()
+            with Timer() as build:
+                metadata = build_comps_index(
+                    model, df.iloc[:, :-1].values, df.iloc[:, -1].values
+                )
+            build_peak = peak_rss_mb()
+            index = model.comps_index
+
+            latencies = []
+            found = []
+            for q in queries:
+                start = time.perf_counter()
+                result_rows, _ = index.query(q, k=args.k, n_probe=n_probe)
+                latencies.append(time.perf_counter() - start)
+                found.append(result_rows)
+            latencies = np.asarray(latencies) * 1e6
+
+            with Timer() as batch:
+                for q in queries:
+                    index.comps(q, k=args.k, n_probe=n_probe)
+
+            # Recall@k và latency của vét cạn trên một phần truy vấn
+            features = np.asarray(index.features)
+            n_exact = min(100, len(queries))
+            hits = 0
+            with Timer() as exact:
+                for q, result_rows in zip(queries[:n_exact], found):
+                    diff = np.nan_to_num(features - q)
+                    distances = (diff * diff) @ index.weights
+                    true_rows = np.argpartition(distances, args.k - 1)[: args.k]
+                    hits += len(set(true_rows) & set(result_rows))
+
+            rows.append(
+                {
+                    "rows": n_rows,
+                    "clusters": metadata["clusters"],
+                    "build_s": round(build.seconds, 2),
+                    "build_peak_mb": round(build_peak, 1),
+                    "index_mb": metadata["size_mb"],
+                    "query_p50_us": round(float(np.percentile(latencies, 50)), 1),
+                    "query_p99_us": round(float(np.percentile(latencies, 99)), 1),
+                    "batch_qps": round(len(queries) / batch.seconds),
+                    "exact_us": round(exact.seconds / n_exact * 1e6, 1),
+                    f"recall@{args.k}": round(hits / (n_exact * args.k), 4),
+                }
+            )
+            del features, index, model
+        print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(
+            {"cpu_count": os.cpu_count(), "n_probe": n_probe, "results": rows},
+            f,
+            indent=2,
+        )
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
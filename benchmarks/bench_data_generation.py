@@ -0,0 +1,99 @@
+"""
+Benchmark: tốc độ tạo dataset (dòng/s) theo số worker của
+generate_sharded_dataset
+
+Với cùng seed và rows_per_shard, dữ liệu phải giống hệt nhau ở mọi số worker;
+script kiểm tra điều này bằng hash nội dung các shard.
+
+Chạy:
+    python benchmarks/bench_data_generation.py --rows 20M --workers 1,2,4,8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from _common import format_table, parse_sizes
+
+
+def dataset_digest(files):
+    """Hash nội dung các shard theo thứ tự"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in files:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="20M")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--rows-per-shard", default="1M")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--output", default="benchmarks/results/data_generation.json")
+    args = parser.parse_args()
+
+    from create_large_dataset import generate_sharded_dataset
+
+    (n_rows,) = parse_sizes(args.rows)
+    (rows_per_shard,) = parse_sizes(args.rows_per_shard)
+    cpu_count = os.cpu_count() or 1
+
+    rows = []
+    for n_workers in (int(w) for w in args.workers.split(",")):
+        output_dir = tempfile.mkdtemp(prefix="bench_generation_")
+        try:
+            summary = generate_sharded_dataset(
+                n_rows,
+                output_dir=output_dir,
+                file_format=args.format,
+                rows_per_shard=rows_per_shard,
+                n_workers=n_workers,
+            )
+            digest = dataset_digest(summary["files"])
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        rows.append(
+            {
+                "rows": n_rows,
+                "workers": n_workers,
+                "seconds": summary["seconds"],
+                "rows_per_sec": summary["rows_per_sec"],
+                "speedup": (
+                    round(summary["rows_per_sec"] / rows[0]["rows_per_sec"], 2)
+                    if rows
+                    else 1.0
+                ),
+                "digest": digest,
+            }
+        )
+        print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+    deterministic = len({row["digest"] for row in rows}) == 1
+    print(f"\nDữ liệu giống nhau ở mọi số worker: {deterministic} (CPU: {cpu_count})")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "format": args.format,
+                "rows_per_shard": rows_per_shard,
+                "cpu_count": cpu_count,
+                "deterministic": deterministic,
+                "results": rows,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Đã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
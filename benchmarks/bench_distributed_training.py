@@ -0,0 +1,85 @@
+"""
+Benchmark: train phân tán (distributed.py) với 1, 2, 4, 8 worker trên cùng
+một dataset shard
+
+Ghi lại wall time, thời gian đọc/preprocess và fit của worker rank 0,
+speedup/efficiency so với 1 worker và RMSE/R² trên holdout.
+
+Chạy:
+    python benchmarks/bench_distributed_training.py --rows 2M --workers 1,2,4,8
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from _common import format_table, parse_sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="2M")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--rows-per-shard", default="125k")
+    parser.add_argument("--data-dir", default="data/benchmarks")
+    parser.add_argument(
+        "--output", default="benchmarks/results/distributed_training.json"
+    )
+    args = parser.parse_args()
+
+    from create_large_dataset import generate_sharded_dataset
+    from model import HousePriceModel
+
+    (n_rows,) = parse_sizes(args.rows)
+    (rows_per_shard,) = parse_sizes(args.rows_per_shard)
+    data_path = os.path.join(args.data_dir, f"sharded_{n_rows}_{rows_per_shard}")
+    if not os.path.exists(os.path.join(data_path, "_manifest.json")):
+        generate_sharded_dataset(
+            n_rows, output_dir=data_path, rows_per_shard=rows_per_shard
+        )
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_workers in (int(w) for w in args.workers.split(",")):
+            model = HousePriceModel(
+                model_path=os.path.join(tmp_dir, f"model_{n_workers}.pkl")
+            )
+            result = model.train(data_path=data_path, distributed_workers=n_workers)
+            distributed = result["distributed"]
+            wall_time = distributed["wall_time_s"]
+            base_time = rows[0]["wall_time_s"] if rows else wall_time
+            rows.append(
+                {
+                    "rows": n_rows,
+                    "workers": n_workers,
+                    "wall_time_s": wall_time,
+                    "load_s": distributed["load_s"],
+                    "fit_s": distributed["fit_s"],
+                    "speedup": round(base_time / wall_time, 2),
+                    "efficiency": round(base_time / wall_time / n_workers, 2),
+                    "rmse": round(result["metrics"]["rmse"], 2),
+                    "r2_score": round(result["metrics"]["r2_score"], 4),
+                }
+            )
+            print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "cpu_count": os.cpu_count(),
+                "rows_per_shard": rows_per_shard,
+                "results": rows,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
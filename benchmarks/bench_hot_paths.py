@@ -0,0 +1,417 @@
+"""
+Benchmark: micro-benchmark các hot path của model và preprocessing, so sánh với baseline
+
+Đo HousePriceModel.predict (dict, list dict, numpy), _map_features,
+_calculate_feature, save/load, preprocess_generic_data và
+preprocess_ames_data trên dữ liệu tổng hợp cố định (seed cố định, từ
+create_large_dataset.generate_chunk và make_wide_dataset của
+bench_preprocessing) với nhiều kích thước input.
+
+Mỗi mẫu lặp một trường hợp đủ lâu (ít nhất --min-time giây); các trường hợp
+được đo xen kẽ trong --repeats vòng, mỗi vòng đo thêm một khối lượng tham
+chiếu cố định. Khi có baseline (benchmarks/baselines/hot_paths.json), từng
+trường hợp được so sánh bằng kiểm định Mann-Whitney U một phía trên các mẫu đã
+chia cho thời gian tham chiếu cùng vòng (bù trừ máy nhanh/chậm hơn lúc tạo
+baseline): chỉ báo chậm hơn khi p-value nhỏ hơn --alpha (chia cho số trường
+hợp) và median chậm hơn quá --threshold. Có trường hợp chậm hơn thì thoát
+với mã 1. Chỉ cần numpy, không cần mạng.
+
+Chạy:
+    python benchmarks/bench_hot_paths.py --sizes 100,10k,100k
+    # Chỉ một số hàm
+    python benchmarks/bench_hot_paths.py --functions predict,load
+    # Cập nhật baseline sau khi thay đổi có chủ đích
+    python benchmarks/bench_hot_paths.py --save-baseline
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from _common import ROOT_DIR, format_table, parse_sizes
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baselines", "hot_paths.json")
+# Số cây của các model dùng để đo save/load
+SAVE_LOAD_TREES = [50, 300]
+TRAIN_ROWS = 20_000
+
+
+def _time(fn, number):
+    """Thời gian chạy fn number lần (tắt gc, nuốt output in ra)"""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def calibrate(fn, min_time):
+    """
+    Số lần gọi fn mỗi mẫu
+
+    Tăng dần (1, 2, 5, 10, ...) tới khi một mẫu dài ít nhất min_time giây,
+    như timeit.autorange.
+    """
+    _time(fn, 1)  # Warm-up
+    number = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            n = number * multiplier
+            if _time(fn, n) >= min_time:
+                return n
+        number *= 10
+
+
+def reference_workload():
+    """Khối lượng cố định (Python thuần + NumPy) để đo tốc độ máy ở mỗi vòng"""
+    values = np.arange(200_000, dtype=np.float64)[::-1]
+    total = 0
+    for i in range(20_000):
+        total += i * i
+    return float(np.sort(values).sum()) + total
+
+
+def measure(cases, repeats, min_time):
+    """
+    Các mẫu thời gian (giây mỗi lần gọi) của từng trường hợp
+
+    Các trường hợp được đo xen kẽ theo vòng (mỗi vòng một mẫu mỗi trường hợp
+    và một mẫu reference_workload) để máy chậm đi trong lúc chạy ảnh hưởng
+    đều mọi trường hợp thay vì dồn vào vài trường hợp.
+
+    Returns:
+        (list số lần gọi mỗi mẫu, list mẫu từng trường hợp, list mẫu reference)
+    """
+    numbers = [calibrate(fn, min_time) for fn in cases]
+    reference_number = calibrate(reference_workload, min_time)
+    samples = [[] for _ in cases]
+    reference = []
+    for _ in range(repeats):
+        reference.append(_time(reference_workload, reference_number) / reference_number)
+        for fn, number, case_samples in zip(cases, numbers, samples):
+            case_samples.append(_time(fn, number) / number)
+    return numbers, samples, reference
+
+
+def _average_ranks(values):
+    """Hạng (bắt đầu từ 1) của các giá trị, giá trị bằng nhau lấy hạng trung bình"""
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values, kind="mergesort")] = np.arange(1, len(values) + 1)
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    return (np.bincount(inverse, weights=ranks) / counts)[inverse], counts
+
+
+def mann_whitney_greater(current, baseline):
+    """
+    p-value một phía của kiểm định Mann-Whitney U: current lớn hơn baseline
+
+    Xấp xỉ chuẩn với hiệu chỉnh ties và continuity (đủ chính xác từ khoảng
+    8 mẫu mỗi bên).
+    """
+    current = np.asarray(current, dtype=np.float64)
+    baseline = np.asarray(baseline, dtype=np.float64)
+    n1, n2 = len(current), len(baseline)
+    ranks, counts = _average_ranks(np.concatenate([current, baseline]))
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    ties = float((counts**3 - counts).sum())
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def build_cases(sizes, tmp_dir):
+    """
+    Các trường hợp cần đo
+
+    Returns:
+        List (tên hàm, kích thước input, hàm không tham số)
+    """
+    from bench_preprocessing import make_wide_dataset
+    from create_large_dataset import generate_chunk
+    from model import HousePriceModel
+    from train_with_real_data import preprocess_ames_data, preprocess_generic_data
+
+    max_size = max(sizes)
+    form = generate_chunk(max(max_size, TRAIN_ROWS), np.random.default_rng(42))
+    records = form.iloc[:, :-1].to_dict("records")
+    wide = make_wide_dataset(max_size, numeric_columns=20, categorical_columns=5)
+
+    # Bỏ log train: print (stdout) và log JSON từng stage (handler riêng)
+    training_logger = logging.getLogger("house_price.training")
+    training_logger.disabled = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        processed, transformer = preprocess_generic_data(
+            form.iloc[:TRAIN_ROWS],
+            target_column="price",
+            verbose=False,
+            return_transformer=True,
+        )
+        models = {}
+        for n_trees in SAVE_LOAD_TREES:
+            model = HousePriceModel(
+                model_path=os.path.join(tmp_dir, f"model_{n_trees}.pkl")
+            )
+            model.train(
+                X=processed.iloc[:, :-1],
+                y=processed.iloc[:, -1],
+                params={"n_estimators": n_trees, "n_jobs": 1},
+                transformer=transformer,
+                comps_index=False,
+            )
+            models[n_trees] = model
+    training_logger.disabled = False
+    model = models[max(SAVE_LOAD_TREES)]
+    X = transformer.transform(form.iloc[:max_size])
+
+    # Model chưa có transformer: predict đi qua _map_features như model cũ
+    legacy = HousePriceModel(model_path=model.model_path)
+    legacy.model = model.model
+    legacy.feature_names = model.feature_names
+
+    # Model train trên cột kiểu Ames: _map_features phải tra mapping từng cột
+    ames = HousePriceModel()
+    ames.feature_names = [
+        "LotArea",
+        "GrLivArea",
+        "2ndFlrSF",
+        "BedroomAbvGr",
+        "FullBath",
+        "YearBuilt",
+        "OverallQual",
+        "num_0",
+    ]
+
+    record = records[0]
+    cases = [
+        ("predict_dict", 1, lambda: model.predict(record)),
+        ("predict_dict_legacy", 1, lambda: legacy.predict(record)),
+        ("_map_features", 1, lambda: ames._map_features(record)),
+        (
+            "_calculate_feature",
+            1,
+            lambda: [
+                ames._calculate_feature(name, record)
+                for name in ("GrLivArea", "2ndFlrSF", "OverallQual", "num_0")
+            ],
+        ),
+    ]
+    for size in sizes:
+        batch = records[:size]
+        X_batch = X[:size]
+        cases.append(("predict_records", size, lambda b=batch: model.predict(b)))
+        cases.append(("predict_numpy", size, lambda b=X_batch: model.predict(b)))
+    for n_trees, trees_model in models.items():
+        loaded = HousePriceModel(model_path=trees_model.model_path)
+        cases.append((f"save_{n_trees}_trees", 1, trees_model.save))
+        cases.append((f"load_{n_trees}_trees", 1, loaded.load))
+    for size in sizes:
+        frame = wide.iloc[:size]
+        cases.append(
+            (
+                "preprocess_generic_data",
+                size,
+                lambda f=frame: preprocess_generic_data(
+                    f, target_column="SalePrice", verbose=False
+                ),
+            )
+        )
+        cases.append(
+            ("preprocess_ames_data", size, lambda f=frame: preprocess_ames_data(f))
+        )
+    return cases
+
+
+def _relative(samples, reference):
+    """Mẫu chia cho mẫu reference_workload cùng vòng"""
+    return np.asarray(samples) / np.asarray(reference)
+
+
+def compare_with_baseline(report, baseline, alpha, threshold, normalize=True):
+    """
+    So sánh từng trường hợp với baseline (cùng function, size)
+
+    Với normalize, mẫu được chia cho thời gian reference_workload cùng vòng
+    của chính lần chạy đó, nên máy nhanh/chậm hơn lúc tạo baseline (CPU bị
+    chia sẻ, đổi xung nhịp) không bị tính là thay đổi của code.
+
+    Returns:
+        List dòng so sánh; status "slower" khi chậm hơn có ý nghĩa thống kê
+        (p < alpha / số trường hợp) và median tăng quá threshold, "faster"
+        ngược lại
+    """
+    baseline_rows = {(r["function"], r["size"]): r for r in baseline["results"]}
+    pairs = [
+        (row, baseline_rows[(row["function"], row["size"])])
+        for row in report["results"]
+        if (row["function"], row["size"]) in baseline_rows
+    ]
+    # Bonferroni: nhiều trường hợp cùng lúc thì mỗi kiểm định chặt hơn, để cả
+    # lần chạy không báo nhầm quá alpha
+    alpha = alpha / max(len(pairs), 1)
+    comparison = []
+    for row, base in pairs:
+        current_samples = np.asarray(row["samples_us"])
+        base_samples = np.asarray(base["samples_us"])
+        if normalize:
+            current_samples = _relative(current_samples, report["reference_us"])
+            base_samples = _relative(base_samples, baseline["reference_us"])
+        ratio = float(np.median(current_samples) / np.median(base_samples))
+        p_slower = mann_whitney_greater(current_samples, base_samples)
+        p_faster = mann_whitney_greater(base_samples, current_samples)
+        status = "ok"
+        if p_slower < alpha and ratio > 1 + threshold:
+            status = "slower"
+        elif p_faster < alpha and ratio < 1 / (1 + threshold):
+            status = "faster"
+        comparison.append(
+            {
+                "function": row["function"],
+                "size": row["size"],
+                "baseline_us": base["median_us"],
+                "current_us": row["median_us"],
+                "ratio": round(ratio, 3),
+                "p_slower": float(f"{p_slower:.3g}"),
+                "status": status,
+            }
+        )
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,10k,100k")
+    parser.add_argument("--functions", default=None, help="Lọc theo tên, vd predict")
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--min-time", type=float, default=0.02)
+    parser.add_argument("--output", default="benchmarks/results/hot_paths.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Ghi kết quả làm baseline mới"
+    )
+    parser.add_argument("--alpha", type=float, default=0.01)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Tỉ lệ tăng median tối thiểu để báo chậm hơn",
+    )
+    parser.add_argument(
+        "--no-normalize",
+        action="store_true",
+        help="So sánh thời gian tuyệt đối, không chia cho reference_workload",
+    )
+    args = parser.parse_args()
+
+    # Một thread cho XGBoost để kết quả ổn định và so sánh được giữa các máy
+    os.environ["OMP_NUM_THREADS"] = "1"
+    sizes = parse_sizes(args.sizes)
+    filters = args.functions.split(",") if args.functions else None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = [
+            case
+            for case in build_cases(sizes, tmp_dir)
+            if not filters or any(f in case[0] for f in filters)
+        ]
+        if not cases:
+            parser.error(f"Không có trường hợp nào khớp --functions {args.functions}")
+        print(f"Đo {len(cases)} trường hợp x {args.repeats} vòng...")
+        numbers, samples, reference = measure(
+            [fn for _, _, fn in cases], args.repeats, args.min_time
+        )
+
+    rows = []
+    for (function, size, _), number, case_samples in zip(cases, numbers, samples):
+        samples_us = [round(s * 1e6, 3) for s in case_samples]
+        q1, median, q3 = np.percentile(samples_us, [25, 50, 75])
+        rows.append(
+            {
+                "function": function,
+                "size": size,
+                "number": number,
+                "median_us": round(float(median), 3),
+                "iqr_us": round(float(q3 - q1), 3),
+                "samples_us": samples_us,
+            }
+        )
+    print()
+    print(format_table(rows, list(rows[0])[:-1]))
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "machine": {
+            "cpu_count": os.cpu_count(),
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+        },
+        "reference_us": [round(s * 1e6, 3) for s in reference],
+        "results": rows,
+    }
+
+    regression = False
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["machine"] != report["machine"]:
+            print(
+                "\n⚠ Baseline được tạo trên máy/môi trường khác, so sánh chỉ để tham khảo"
+            )
+        comparison = compare_with_baseline(
+            report,
+            baseline,
+            args.alpha,
+            args.threshold,
+            normalize=not args.no_normalize,
+        )
+        report["baseline"] = {"path": args.baseline, "comparison": comparison}
+        if comparison:
+            print(f"\nSo sánh với baseline {args.baseline}:")
+            print(format_table(comparison, list(comparison[0])))
+            slower = [row for row in comparison if row["status"] == "slower"]
+            if slower:
+                regression = True
+                print(
+                    f"⚠ {len(slower)} trường hợp chậm hơn baseline có ý nghĩa thống kê"
+                )
+        else:
+            print("\nBaseline không có trường hợp nào trùng để so sánh")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Đã lưu baseline tại {args.baseline}")
+
+    if regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: train incremental (append / refresh) so với train lại toàn bộ
+
+Model gốc train trên base_rows dòng; sau đó có new_rows dòng mới. So sánh
+thời gian và độ chính xác (trên cùng một tập đánh giá độc lập) giữa:
+- full: train lại từ đầu trên base + new
+- append: thêm cây mới từ booster cũ, chỉ dùng dữ liệu mới
+- refresh: cập nhật giá trị lá của booster cũ trên dữ liệu mới
+
+Chạy:
+    python benchmarks/bench_incremental_training.py --base-rows 200k --new-rows 5k
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from _common import Timer, format_table, parse_sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-rows", default="200k")
+    parser.add_argument("--new-rows", default="5k")
+    parser.add_argument("--eval-rows", default="20k")
+    parser.add_argument("--incremental-rounds", type=int, default=50)
+    parser.add_argument(
+        "--output", default="benchmarks/results/incremental_training.json"
+    )
+    args = parser.parse_args()
+
+    from create_large_dataset import generate_large_dataset
+    from model import HousePriceModel
+
+    base_rows, new_rows, eval_rows = parse_sizes(
+        f"{args.base_rows},{args.new_rows},{args.eval_rows}"
+    )
+    tmp_dir = tempfile.mkdtemp(prefix="bench_incremental_")
+    try:
+        df = generate_large_dataset(
+            base_rows + new_rows + eval_rows, os.path.join(tmp_dir, "all.csv")
+        )
+        base = df.iloc[:base_rows]
+        new = df.iloc[base_rows : base_rows + new_rows]
+        evaluation = df.iloc[base_rows + new_rows :]
+        X_eval, y_eval = evaluation.iloc[:, :-1], evaluation.iloc[:, -1].values
+
+        parent_path = os.path.join(tmp_dir, "parent.pkl")
+        parent = HousePriceModel(model_path=parent_path)
+        parent.train(X=base.iloc[:, :-1], y=base.iloc[:, -1])
+
+        rows = [
+            {
+                "mode": "parent (không train lại)",
+                "train_rows": base_rows,
+                "wall_time_s": 0.0,
+                "eval_rmse": round(
+                    parent._evaluate(parent.model, X_eval.values, y_eval)["rmse"], 2
+                ),
+            }
+        ]
+
+        full_data = df.iloc[: base_rows + new_rows]
+        full = HousePriceModel(model_path=os.path.join(tmp_dir, "full.pkl"))
+        with Timer() as timer:
+            full.train(X=full_data.iloc[:, :-1], y=full_data.iloc[:, -1])
+        rows.append(
+            {
+                "mode": "full",
+                "train_rows": base_rows + new_rows,
+                "wall_time_s": round(timer.seconds, 3),
+                "eval_rmse": round(
+                    full._evaluate(full.model, X_eval.values, y_eval)["rmse"], 2
+                ),
+            }
+        )
+
+        for mode in ("append", "refresh"):
+            model_path = os.path.join(tmp_dir, f"{mode}.pkl")
+            shutil.copy(parent_path, model_path)
+            model = HousePriceModel(model_path=model_path)
+            with Timer() as timer:
+                model.train(
+                    X=new.iloc[:, :-1],
+                    y=new.iloc[:, -1],
+                    incremental=mode,
+                    incremental_rounds=args.incremental_rounds,
+                )
+            rows.append(
+                {
+                    "mode": mode,
+                    "train_rows": new_rows,
+                    "wall_time_s": round(timer.seconds, 3),
+                    "eval_rmse": round(
+                        model._evaluate(model.model, X_eval.values, y_eval)["rmse"], 2
+                    ),
+                }
+            )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"results": rows}, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
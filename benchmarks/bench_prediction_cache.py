@@ -0,0 +1,202 @@
+"""
+Benchmark: hit rate và latency tra cứu của cache /predict dùng chung khi chạy nhiều worker
+
+Mỗi worker là một process riêng (như worker uvicorn) import app, load cùng
+một model và gọi trực tiếp handler predict_price với các căn nhà lấy theo
+phân phối Zipf từ một tập căn phổ biến (vài căn được hỏi rất nhiều). Các chế
+độ:
+- none: không cache
+- per_worker: mỗi worker một file cache riêng (như cache trong process:
+  worker nào cũng bắt đầu lạnh)
+- shared: mọi worker dùng chung một file cache
+- shared_restart: chạy lại shared với file cache còn từ lần trước (worker
+  khởi động lại)
+
+Chạy:
+    python benchmarks/bench_prediction_cache.py --workers 4 --requests 5000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _common import format_table
+
+os.environ["AUDIT_LOG"] = "0"
+
+
+def _worker(model_path, cache_dir, houses, order, result_queue):
+    """Gửi các request theo thứ tự order, đo latency và thời gian tra cache"""
+    if cache_dir is None:
+        os.environ["PREDICTION_CACHE"] = "0"
+    else:
+        os.environ["PREDICTION_CACHE_DIR"] = cache_dir
+    import asyncio
+
+    import app as app_module
+    from model import HousePriceModel
+
+    model = HousePriceModel(model_path=model_path)
+    model.load()
+    # Không dùng lưới dự đoán để đo đúng thời gian chạy model khi miss
+    model.prediction_grid = None
+    app_module.model = model
+
+    cache = app_module.prediction_cache
+    lookups = []
+    if cache is not None:
+        get = cache.get
+
+        def timed_get(key):
+            start = time.perf_counter()
+            value = get(key)
+            lookups.append((time.perf_counter() - start, value is not None))
+            return value
+
+        cache.get = timed_get
+
+    loop = asyncio.new_event_loop()
+    latencies = []
+    for i in order:
+        house = app_module.HouseFeatures(**houses[i])
+        start = time.perf_counter()
+        loop.run_until_complete(app_module.predict_price(house))
+        latencies.append(time.perf_counter() - start)
+    loop.close()
+    result_queue.put(
+        {
+            "latencies": latencies,
+            "lookups": lookups,
+            "stats": cache.stats() if cache is not None else None,
+        }
+    )
+
+
+def run_mode(model_path, cache_dirs, houses, orders):
+    """Chạy các worker song song, trả về kết quả gộp"""
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(
+            target=_worker,
+            args=(model_path, cache_dir, houses, order, result_queue),
+        )
+        for cache_dir, order in zip(cache_dirs, orders)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [result_queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - start
+
+    latencies = np.concatenate([r["latencies"] for r in results]) * 1e6
+    lookups = [item for r in results for item in r["lookups"]]
+    row = {
+        "requests": len(latencies),
+        "wall_s": round(wall, 2),
+        "p50_us": round(float(np.percentile(latencies, 50)), 1),
+        "p99_us": round(float(np.percentile(latencies, 99)), 1),
+        "hit_rate": None,
+        "lookup_hit_p50_us": None,
+        "lookup_hit_p99_us": None,
+        "lookup_miss_p50_us": None,
+        "entries": None,
+    }
+    if lookups:
+        seconds = np.array([s for s, _ in lookups]) * 1e6
+        hit = np.array([h for _, h in lookups])
+        row["hit_rate"] = round(float(hit.mean()), 4)
+        if hit.any():
+            row["lookup_hit_p50_us"] = round(float(np.percentile(seconds[hit], 50)), 1)
+            row["lookup_hit_p99_us"] = round(float(np.percentile(seconds[hit], 99)), 1)
+        if (~hit).any():
+            row["lookup_miss_p50_us"] = round(
+                float(np.percentile(seconds[~hit], 50)), 1
+            )
+        row["entries"] = max(r["stats"]["entries"] for r in results)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5000, help="Mỗi worker")
+    parser.add_argument("--distinct", type=int, default=20000)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--max-entries", type=int, default=65536)
+    parser.add_argument("--output", default="benchmarks/results/prediction_cache.json")
+    args = parser.parse_args()
+
+    from create_large_dataset import generate_chunk
+    from model import HousePriceModel
+
+    os.environ["PREDICTION_CACHE_ENTRIES"] = str(args.max_entries)
+    rng = np.random.default_rng(42)
+    houses = [
+        {
+            "area": round(float(r["area"]), 1),
+            "bedrooms": int(r["bedrooms"]),
+            "bathrooms": int(r["bathrooms"]),
+            "floors": int(r["floors"]),
+            "year_built": int(r["year_built"]),
+            "location_score": round(float(r["location_score"]), 1),
+        }
+        for r in generate_chunk(args.distinct, rng).to_dict("records")
+    ]
+
+    def orders():
+        # Zipf: căn thứ k được hỏi với xác suất tỉ lệ 1/k^s
+        return [
+            (rng.zipf(args.zipf, args.requests) - 1) % args.distinct
+            for _ in range(args.workers)
+        ]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        df = generate_chunk(20_000, np.random.default_rng(7))
+        model = HousePriceModel(model_path=os.path.join(tmp_dir, "model.pkl"))
+        model.train(X=df.iloc[:, :-1], y=df.iloc[:, -1], comps_index=False)
+
+        shared_dir = os.path.join(tmp_dir, "shared")
+        modes = [
+            ("none", [None] * args.workers),
+            (
+                "per_worker",
+                [os.path.join(tmp_dir, f"worker_{i}") for i in range(args.workers)],
+            ),
+            ("shared", [shared_dir] * args.workers),
+            ("shared_restart", [shared_dir] * args.workers),
+        ]
+        for mode, cache_dirs in modes:
+            row = {"mode": mode, "workers": args.workers}
+            row.update(run_mode(model.model_path, cache_dirs, houses, orders()))
+            rows.append(row)
+            print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "cpu_count": os.cpu_count(),
+                "distinct": args.distinct,
+                "zipf": args.zipf,
+                "results": rows,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: preprocessing theo spec (chỉ xử lý cột nguồn cần dùng) so với
+bản cũ (fill median + LabelEncoder trên mọi cột) trên dataset rộng
+
+Chạy:
+    python benchmarks/bench_preprocessing.py --sizes 100k,1M --numeric-columns 200 \
+        --categorical-columns 40
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from _common import Timer, format_table, parse_sizes
+
+# Các cột kiểu Ames mà preprocessing dùng để map features
+AMES_COLUMNS = {
+    "LotArea": (1300, 20000),
+    "GrLivArea": (400, 4000),
+    "TotalBsmtSF": (0, 3000),
+    "1stFlrSF": (400, 3000),
+    "2ndFlrSF": (0, 1500),
+    "BedroomAbvGr": (0, 6),
+    "FullBath": (0, 3),
+    "HalfBath": (0, 2),
+    "YearBuilt": (1880, 2010),
+    "OverallQual": (1, 10),
+}
+
+
+def make_wide_dataset(n_rows, numeric_columns, categorical_columns, seed=42):
+    """Dataset rộng kiểu Ames: các cột dùng để map + nhiều cột thừa, có missing"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col, (low, high) in AMES_COLUMNS.items():
+        data[col] = rng.integers(low, high + 1, n_rows).astype(np.float64)
+    for i in range(numeric_columns):
+        values = rng.normal(0, 1, n_rows)
+        values[rng.random(n_rows) < 0.05] = np.nan
+        data[f"num_{i}"] = values
+    vocabulary = np.array([f"cat_{i}" for i in range(12)], dtype=object)
+    for i in range(categorical_columns):
+        data[f"cat_{i}"] = vocabulary[rng.integers(0, len(vocabulary), n_rows)]
+
+    df = pd.DataFrame(data)
+    df.loc[rng.random(n_rows) < 0.05, "GrLivArea"] = np.nan
+    df["SalePrice"] = df["GrLivArea"].fillna(1500) * 120 + rng.normal(0, 2e4, n_rows)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100k,1M")
+    parser.add_argument("--numeric-columns", type=int, default=200)
+    parser.add_argument("--categorical-columns", type=int, default=40)
+    parser.add_argument("--output", default="benchmarks/results/preprocessing.json")
+    args = parser.parse_args()
+
+    from _legacy_preprocessing import (
+        legacy_preprocess_ames_data,
+        legacy_preprocess_generic_data,
+    )
+    from train_with_real_data import preprocess_ames_data, preprocess_generic_data
+
+    cases = [
+        (
+            "generic",
+            lambda df: legacy_preprocess_generic_data(
+                df, target_column="SalePrice", verbose=False
+            ),
+            lambda df: preprocess_generic_data(
+                df, target_column="SalePrice", verbose=False
+            ),
+        ),
+        (
+            "ames",
+            lambda df: legacy_preprocess_ames_data(df)[0],
+            lambda df: preprocess_ames_data(df)[0],
+        ),
+    ]
+
+    rows = []
+    for n_rows in parse_sizes(args.sizes):
+        df = make_wide_dataset(n_rows, args.numeric_columns, args.categorical_columns)
+        for name, legacy_fn, spec_fn in cases:
+            # Bản cũ sửa df tại chỗ, nên mỗi lần chạy dùng một bản copy
+            legacy_input, spec_input = df.copy(), df.copy()
+            with Timer() as legacy_timer:
+                legacy_result = legacy_fn(legacy_input)
+            with Timer() as spec_timer:
+                spec_result = spec_fn(spec_input)
+            max_abs_diff = float(
+                np.nanmax(
+                    np.abs(
+                        legacy_result.to_numpy(dtype=np.float64)
+                        - spec_result.to_numpy(dtype=np.float64)
+                    )
+                )
+            )
+            rows.append(
+                {
+                    "rows": n_rows,
+                    "columns": df.shape[1],
+                    "function": name,
+                    "legacy_s": round(legacy_timer.seconds, 3),
+                    "spec_s": round(spec_timer.seconds, 3),
+                    "speedup": round(legacy_timer.seconds / spec_timer.seconds, 1),
+                    "max_abs_diff": max_abs_diff,
+                }
+            )
+            print(format_table(rows[-1:], list(rows[-1])))
+        del df
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"results": rows}, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
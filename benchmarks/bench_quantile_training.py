@@ -0,0 +1,72 @@
+"""
+Benchmark: train mặc định (float64 dense + XGBRegressor.fit) so với
+QuantileDMatrix (float32, hist)
+
+Mỗi cấu hình chạy trong process riêng để đo peak RSS chính xác.
+
+Chạy:
+    python benchmarks/bench_quantile_training.py --sizes 50k,1M,10M
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from _common import Timer, format_table, parse_sizes, peak_rss_mb, rss_mb, run_isolated
+
+
+def train_once(data_path, quantile_dmatrix, max_bin):
+    """Train một lần trong process con, trả về thời gian và bộ nhớ"""
+    from model import HousePriceModel
+
+    rss_before = rss_mb()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = HousePriceModel(model_path=os.path.join(tmp_dir, "model.pkl"))
+        with Timer() as timer:
+            result = model.train(
+                data_path=data_path, quantile_dmatrix=quantile_dmatrix, max_bin=max_bin
+            )
+    return {
+        "wall_time_s": round(timer.seconds, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_delta_mb": round(peak_rss_mb() - rss_before, 1),
+        "rmse": round(result["metrics"]["rmse"], 2),
+        "r2_score": round(result["metrics"]["r2_score"], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="50k,1M,10M", help="Số dòng, vd 50k,1M")
+    parser.add_argument("--max-bin", type=int, default=256)
+    parser.add_argument("--data-dir", default="data/benchmarks")
+    parser.add_argument("--output", default="benchmarks/results/quantile_training.json")
+    args = parser.parse_args()
+
+    from create_large_dataset import generate_large_dataset
+
+    rows = []
+    for n_samples in parse_sizes(args.sizes):
+        data_path = os.path.join(args.data_dir, f"large_house_data_{n_samples}.csv")
+        if not os.path.exists(data_path):
+            run_isolated(
+                generate_large_dataset, n_samples=n_samples, save_path=data_path
+            )
+
+        for mode, quantile_dmatrix in (("default", False), ("quantile", True)):
+            result = run_isolated(train_once, data_path, quantile_dmatrix, args.max_bin)
+            rows.append({"rows": n_samples, "mode": mode, **result})
+            print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"max_bin": args.max_bin, "results": rows}, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
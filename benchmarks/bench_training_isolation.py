@@ -0,0 +1,184 @@
+"""
+Benchmark: p99 latency của /predict trong lúc đang train
+
+Gọi trực tiếp handler predict_price liên tục trong khi một lần train chạy nền,
+so sánh các chế độ:
+- idle: không train (baseline)
+- in_process: train trong process API với n_jobs=-1 (cách cũ)
+- isolated: train trong process riêng, nice thấp, ngân sách thread training
+- isolated_affinity: như isolated và chia core cố định (cần >= 2 CPU)
+
+Chạy:
+    python benchmarks/bench_training_isolation.py --train-rows 500k
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from _common import format_table, parse_sizes
+
+os.environ["AUDIT_LOG"] = "0"
+# Đo đúng thời gian dự đoán, không trả kết quả từ cache dùng chung
+os.environ["PREDICTION_CACHE"] = "0"
+
+
+def _train_job(model_path, rows, n_jobs):
+    """Train một model trên dữ liệu tổng hợp (chạy trong thread hoặc process)"""
+    from create_large_dataset import generate_chunk
+    from model import HousePriceModel
+
+    df = generate_chunk(rows, np.random.default_rng(7))
+    model = HousePriceModel(model_path=model_path)
+    model.train(X=df.iloc[:, :-1], y=df.iloc[:, -1], params={"n_jobs": n_jobs})
+    return model.training_samples
+
+
+def measure_during(app_module, houses, run_training):
+    """
+    Gửi request liên tục trong lúc run_training chạy ở thread nền
+
+    Returns:
+        (latencies µs, thời gian train giây)
+    """
+    done = threading.Event()
+    timing = {}
+
+    def target():
+        start = time.perf_counter()
+        try:
+            run_training()
+        finally:
+            timing["seconds"] = time.perf_counter() - start
+            done.set()
+
+    loop = asyncio.new_event_loop()
+    latencies = []
+    thread = threading.Thread(target=target)
+    thread.start()
+    try:
+        i = 0
+        while not done.is_set():
+            house = houses[i % len(houses)]
+            start = time.perf_counter()
+            loop.run_until_complete(app_module.predict_price(house))
+            latencies.append(time.perf_counter() - start)
+            i += 1
+    finally:
+        loop.close()
+        thread.join()
+    return np.asarray(latencies) * 1e6, timing["seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--train-rows", default="200k")
+    parser.add_argument("--serve-rows", default="20k")
+    parser.add_argument("--inference-threads", type=int, default=None)
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--output", default="benchmarks/results/training_isolation.json"
+    )
+    args = parser.parse_args()
+
+    import app as app_module
+    from create_large_dataset import generate_chunk
+    from model import HousePriceModel
+    from resources import ResourcePolicy
+
+    train_rows, serve_rows = parse_sizes(f"{args.train_rows},{args.serve_rows}")
+    rng = np.random.default_rng(42)
+    serve = generate_chunk(serve_rows, rng)
+    houses = [
+        app_module.HouseFeatures(
+            area=float(r["area"]),
+            bedrooms=int(r["bedrooms"]),
+            bathrooms=int(r["bathrooms"]),
+            floors=int(r["floors"]),
+            year_built=int(r["year_built"]),
+            location_score=float(r["location_score"]),
+        )
+        for r in serve.head(5000).to_dict("records")
+    ]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = HousePriceModel(model_path=os.path.join(tmp_dir, "serving.pkl"))
+        model.train(X=serve.iloc[:, :-1], y=serve.iloc[:, -1])
+        # Không dùng lưới dự đoán để đo đúng thời gian chạy model
+        model.prediction_grid = None
+        app_module.model = model
+        train_path = os.path.join(tmp_dir, "training.pkl")
+
+        isolated = ResourcePolicy(inference_threads=args.inference_threads)
+        pinned = ResourcePolicy(
+            inference_threads=args.inference_threads, cpu_affinity=True
+        )
+        modes = {
+            "idle": (isolated, lambda: time.sleep(args.idle_seconds)),
+            "in_process": (
+                isolated,
+                lambda: _train_job(train_path, train_rows, -1),
+            ),
+            "isolated": (
+                isolated,
+                lambda: isolated.run_training(
+                    _train_job, train_path, train_rows, isolated.training_threads
+                ),
+            ),
+        }
+        if pinned.cpu_affinity:
+            modes["isolated_affinity"] = (
+                pinned,
+                lambda: pinned.run_training(
+                    _train_job, train_path, train_rows, pinned.training_threads
+                ),
+            )
+        else:
+            print("Bỏ qua isolated_affinity: cần ít nhất 2 CPU")
+
+        base_p99 = None
+        for mode, (policy, run_training) in modes.items():
+            policy.apply_inference(model)
+            if mode == "isolated_affinity":
+                pinned.apply_serving()
+            latencies, train_seconds = measure_during(app_module, houses, run_training)
+            if mode == "isolated_affinity":
+                os.sched_setaffinity(0, pinned.cpus)
+            p99 = float(np.percentile(latencies, 99))
+            base_p99 = base_p99 or p99
+            rows.append(
+                {
+                    "mode": mode,
+                    "requests": len(latencies),
+                    "p50_us": round(float(np.percentile(latencies, 50)), 1),
+                    "p99_us": round(p99, 1),
+                    "p99_vs_idle": round(p99 / base_p99, 2),
+                    "train_s": round(train_seconds, 2) if mode != "idle" else None,
+                    "inference_threads": policy.inference_threads,
+                    # in_process train với n_jobs=-1 như cách cũ
+                    "training_threads": {
+                        "idle": None,
+                        "in_process": -1,
+                    }.get(mode, policy.training_threads),
+                }
+            )
+            print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    print(format_table(rows, list(rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"cpu_count": os.cpu_count(), "results": rows}, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
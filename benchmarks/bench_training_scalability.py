@@ -0,0 +1,218 @@
+"""
+Benchmark: khả năng mở rộng của HousePriceModel.train theo kích thước dữ liệu
+và số CPU (n_jobs)
+
+Với mỗi kích thước, dataset được tạo bằng create_large_dataset rồi train bằng
+cấu hình hiện tại (XGB_PARAMS) với từng n_jobs, mỗi lần trong process riêng.
+Ghi lại thời gian từng bước (read, preprocess, prepare, split, fit, evaluate,
+save), peak RSS và RMSE/R². Kết quả được ghi JSON và so sánh với baseline đã
+lưu (benchmarks/baselines/training_scalability.json).
+
+Chạy:
+    python benchmarks/bench_training_scalability.py --sizes 10k,100k,1M --n-jobs=1,-1
+    # Cập nhật baseline sau khi thay đổi có chủ đích
+    python benchmarks/bench_training_scalability.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+from _common import (
+    ROOT_DIR,
+    Timer,
+    format_table,
+    parse_sizes,
+    peak_rss_mb,
+    rss_mb,
+    run_isolated,
+)
+
+DEFAULT_BASELINE = os.path.join(
+    ROOT_DIR, "benchmarks", "baselines", "training_scalability.json"
+)
+STAGES = ["read", "preprocess", "prepare", "split", "fit", "evaluate", "save"]
+
+
+def train_once(data_path, n_jobs, quantile_dmatrix):
+    """Đọc, preprocess và train một lần trong process con"""
+    from ingestion import read_typed_csv
+    from model import HousePriceModel
+    from train_with_real_data import preprocess_generic_data
+
+    rss_before = rss_mb()
+    with Timer() as read_timer:
+        df, target_column = read_typed_csv(data_path, dataset_type="generic")
+    with Timer() as preprocess_timer:
+        df = preprocess_generic_data(df, target_column=target_column, verbose=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = HousePriceModel(model_path=os.path.join(tmp_dir, "model.pkl"))
+        with Timer() as train_timer:
+            result = model.train(
+                X=df.iloc[:, :-1],
+                y=df.iloc[:, -1],
+                params={"n_jobs": n_jobs},
+                quantile_dmatrix=quantile_dmatrix,
+            )
+
+    stage_times = {
+        "read": read_timer.seconds,
+        "preprocess": preprocess_timer.seconds,
+        **result["stage_times"],
+    }
+    return {
+        "stages_s": {name: round(stage_times.get(name, 0.0), 3) for name in STAGES},
+        "total_s": round(
+            read_timer.seconds + preprocess_timer.seconds + train_timer.seconds, 3
+        ),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_delta_mb": round(peak_rss_mb() - rss_before, 1),
+        "rmse": round(result["metrics"]["rmse"], 2),
+        "r2_score": round(result["metrics"]["r2_score"], 4),
+    }
+
+
+def _key(row):
+    return (row["rows"], row["n_jobs"], row["mode"])
+
+
+def compare_with_baseline(rows, baseline, tolerance):
+    """
+    So sánh từng cấu hình với baseline (cùng rows, n_jobs, mode)
+
+    Returns:
+        List dòng so sánh; "regression" True khi thời gian hoặc peak RSS tăng
+        quá tolerance, hoặc R² giảm quá 0.01
+    """
+    baseline_rows = {_key(row): row for row in baseline["results"]}
+    comparison = []
+    for row in rows:
+        base = baseline_rows.get(_key(row))
+        if base is None:
+            continue
+        time_ratio = row["total_s"] / base["total_s"] if base["total_s"] else 1.0
+        fit_ratio = (
+            row["stages_s"]["fit"] / base["stages_s"]["fit"]
+            if base["stages_s"]["fit"]
+            else 1.0
+        )
+        rss_ratio = (
+            row["peak_rss_mb"] / base["peak_rss_mb"] if base["peak_rss_mb"] else 1.0
+        )
+        r2_delta = row["r2_score"] - base["r2_score"]
+        comparison.append(
+            {
+                "rows": row["rows"],
+                "n_jobs": row["n_jobs"],
+                "mode": row["mode"],
+                "total_ratio": round(time_ratio, 2),
+                "fit_ratio": round(fit_ratio, 2),
+                "rss_ratio": round(rss_ratio, 2),
+                "r2_delta": round(r2_delta, 4),
+                "regression": time_ratio > 1 + tolerance
+                or rss_ratio > 1 + tolerance
+                or r2_delta < -0.01,
+            }
+        )
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k,1M")
+    parser.add_argument("--n-jobs", default="-1", help="Danh sách n_jobs, vd 1,2,-1")
+    parser.add_argument(
+        "--quantile", action="store_true", help="Train thêm với quantile_dmatrix"
+    )
+    parser.add_argument("--data-dir", default="data/benchmarks")
+    parser.add_argument(
+        "--output", default="benchmarks/results/training_scalability.json"
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Ghi kết quả làm baseline mới"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Tỉ lệ tăng thời gian/bộ nhớ chấp nhận được so với baseline",
+    )
+    args = parser.parse_args()
+
+    from create_large_dataset import generate_large_dataset
+
+    n_jobs_list = [int(n) for n in args.n_jobs.split(",")]
+    modes = [("default", False)] + ([("quantile", True)] if args.quantile else [])
+
+    rows = []
+    for n_samples in parse_sizes(args.sizes):
+        data_path = os.path.join(args.data_dir, f"large_house_data_{n_samples}.csv")
+        if not os.path.exists(data_path):
+            run_isolated(
+                generate_large_dataset, n_samples=n_samples, save_path=data_path
+            )
+        for mode, quantile_dmatrix in modes:
+            for n_jobs in n_jobs_list:
+                result = run_isolated(train_once, data_path, n_jobs, quantile_dmatrix)
+                rows.append(
+                    {"rows": n_samples, "n_jobs": n_jobs, "mode": mode, **result}
+                )
+                print(format_table([_flatten(rows[-1])], list(_flatten(rows[-1]))))
+
+    print()
+    table = [_flatten(row) for row in rows]
+    print(format_table(table, list(table[0])))
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "machine": {
+            "cpu_count": os.cpu_count(),
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+        },
+        "results": rows,
+    }
+
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare_with_baseline(rows, baseline, args.tolerance)
+        report["baseline"] = {"path": args.baseline, "comparison": comparison}
+        if comparison:
+            print(f"\nSo sánh với baseline {args.baseline}:")
+            print(format_table(comparison, list(comparison[0])))
+            if any(row["regression"] for row in comparison):
+                print(
+                    "⚠ Có cấu hình chậm hơn/tốn bộ nhớ hơn/kém chính xác hơn baseline"
+                )
+        else:
+            print("\nBaseline không có cấu hình nào trùng để so sánh")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Đã lưu baseline tại {args.baseline}")
+
+
+def _flatten(row):
+    """Dòng kết quả phẳng (mỗi bước một cột) để in bảng"""
+    flat = {key: value for key, value in row.items() if key != "stages_s"}
+    for name, seconds in row["stages_s"].items():
+        flat[f"{name}_s"] = seconds
+    return flat
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark: FeatureTransformer (NumPy, kế hoạch compile sẵn) so với preprocessing bằng pandas
+
+Transformer được fit bằng preprocess_ames_data trên dữ liệu kiểu Ames
+(make_wide_dataset của bench_preprocessing, có missing). Các trường hợp:
+- raw: tính features từ các cột gốc (fill median, phép tính theo spec) như
+  batch_score trên file dữ liệu gốc. "pandas" là cùng các bước viết bằng
+  Series.fillna/.map/DataFrame
+- form: các dict từ form (/predict/batch). "pandas" là cách cũ
+  (_map_features từng dict + DataFrame + reindex)
+- single: một dict (/predict), đo latency từng lần gọi
+
+Cột max_abs_diff so sánh kết quả hai cách (0 = giống hệt).
+
+Chạy:
+    python benchmarks/bench_transformer.py --sizes 10k,100k,1m
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import Timer, format_table, parse_sizes
+
+FORM_FEATURES = ["area", "bedrooms", "bathrooms", "floors", "year_built"]
+
+
+def pandas_transform(transformer, df):
+    """Các bước của transformer.transform viết bằng pandas (để so sánh)"""
+    from feature_transformer import DERIVATIONS
+
+    sources = {}
+    features = {}
+    for feature in transformer.features:
+        source_cols, derivation = transformer.rules[feature]
+        if not source_cols:
+            features[feature] = transformer.feature_fill[feature]
+            continue
+        for col in source_cols:
+            if col not in sources:
+                series = df[col]
+                if col in transformer.category_maps:
+                    series = series.astype(str).map(transformer.category_maps[col])
+                elif col in transformer.source_fill:
+                    series = series.fillna(transformer.source_fill[col])
+                sources[col] = series.astype(np.float64)
+        features[feature] = DERIVATIONS[derivation](
+            *(sources[col] for col in source_cols)
+        )
+    X = pd.DataFrame(features, index=df.index, columns=transformer.features)
+    return X.fillna(transformer.feature_fill).to_numpy(dtype=np.float64)
+
+
+def legacy_form_encode(model, records):
+    """Cách /predict/batch cũ: _map_features từng dict, DataFrame, reindex"""
+    X_df = pd.DataFrame([model._map_features(x) for x in records])
+    X_df = X_df.reindex(columns=model.feature_names, fill_value=0)
+    return model._encode_categories(X_df).values.astype(np.float64)
+
+
+def _row(case, n_rows, pandas_seconds, numpy_seconds, pandas_X, numpy_X):
+    return {
+        "case": case,
+        "rows": n_rows,
+        "pandas_s": round(pandas_seconds, 4),
+        "numpy_s": round(numpy_seconds, 4),
+        "pandas_rows_per_s": round(n_rows / pandas_seconds),
+        "numpy_rows_per_s": round(n_rows / numpy_seconds),
+        "speedup": round(pandas_seconds / numpy_seconds, 1),
+        "max_abs_diff": float(np.nanmax(np.abs(pandas_X - numpy_X))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k,1m")
+    parser.add_argument("--single-calls", type=int, default=5000)
+    parser.add_argument("--output", default="benchmarks/results/transformer.json")
+    args = parser.parse_args()
+
+    from bench_preprocessing import make_wide_dataset
+    from model import HousePriceModel
+    from train_with_real_data import preprocess_ames_data
+
+    sizes = parse_sizes(args.sizes)
+    df = make_wide_dataset(max(sizes), numeric_columns=0, categorical_columns=0)
+    processed, transformer = preprocess_ames_data(df)
+
+    # Model chỉ dùng để map dict theo cách cũ (không cần booster)
+    model = HousePriceModel()
+    model.feature_names = transformer.features
+
+    rows = []
+    for n_rows in sizes:
+        raw = df.iloc[:n_rows]
+        with Timer() as pandas_timer:
+            pandas_X = pandas_transform(transformer, raw)
+        with Timer() as numpy_timer:
+            numpy_X = transformer.transform(raw)
+        rows.append(
+            _row(
+                "raw",
+                n_rows,
+                pandas_timer.seconds,
+                numpy_timer.seconds,
+                pandas_X,
+                numpy_X,
+            )
+        )
+        print(format_table(rows[-1:], list(rows[-1])))
+
+        # Dict từ form: không có location_score (lấy median lúc train)
+        records = processed.iloc[:n_rows][FORM_FEATURES].to_dict("records")
+        with Timer() as pandas_timer:
+            pandas_X = legacy_form_encode(model, records)
+        with Timer() as numpy_timer:
+            numpy_X = transformer.transform(records)
+        rows.append(
+            _row(
+                "form",
+                n_rows,
+                pandas_timer.seconds,
+                numpy_timer.seconds,
+                # Cách cũ điền 0 cho feature thiếu, chỉ so các feature có
+                pandas_X[:, : len(FORM_FEATURES)],
+                numpy_X[:, : len(FORM_FEATURES)],
+            )
+        )
+        print(format_table(rows[-1:], list(rows[-1])))
+
+    # Một dict mỗi lần gọi, như /predict
+    records = processed.iloc[: args.single_calls][FORM_FEATURES].to_dict("records")
+    latencies = {}
+    for name, fn in (
+        ("pandas", lambda r: legacy_form_encode(model, [r])),
+        ("numpy", transformer.transform),
+    ):
+        samples = []
+        for record in records:
+            start = time.perf_counter()
+            fn(record)
+            samples.append(time.perf_counter() - start)
+        latencies[name] = np.asarray(samples) * 1e6
+    rows.append(
+        {
+            "case": "single",
+            "rows": len(records),
+            "pandas_p50_us": round(float(np.percentile(latencies["pandas"], 50)), 1),
+            "numpy_p50_us": round(float(np.percentile(latencies["numpy"], 50)), 1),
+            "pandas_p99_us": round(float(np.percentile(latencies["pandas"], 99)), 1),
+            "numpy_p99_us": round(float(np.percentile(latencies["numpy"], 99)), 1),
+            "speedup": round(
+                float(np.median(latencies["pandas"]) / np.median(latencies["numpy"])),
+                1,
+            ),
+        }
+    )
+    print(format_table(rows[-1:], list(rows[-1])))
+
+    print()
+    batch_rows = [row for row in rows if row["case"] != "single"]
+    print(format_table(batch_rows, list(batch_rows[0])))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"cpu_count": os.cpu_count(), "results": rows}, f, indent=2)
+    print(f"\nĐã lưu kết quả tại {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Python client cho House Price Prediction API
+
+Hỗ trợ:
+- Keep-alive connection pooling (requests.Session / httpx.AsyncClient)
+- Interface đồng bộ (HousePriceClient) và asyncio (AsyncHousePriceClient)
+- Gộp các lời gọi predict() riêng lẻ thành request /predict/batch
+- Retry với exponential backoff khi server trả về 429/503 (chỉ GET và các
+  endpoint predict; /train không idempotent nên không bao giờ retry)
+- Cache cục bộ cho /features và /model/info
+
+Ví dụ:
+    with HousePriceClient("http://localhost:8000", batch_window=0.01) as client:
+        price = client.predict({"area": 120, "bedrooms": 3, "bathrooms": 2})
+
+    async with AsyncHousePriceClient("http://localhost:8000") as client:
+        prices = await asyncio.gather(*(client.predict(h) for h in houses))
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+RETRY_STATUS_CODES = (429, 503)
+
+
+class HousePriceAPIError(Exception):
+    """Lỗi trả về từ API (status code và detail của server)"""
+
+    def __init__(self, status_code, detail):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _raise_for_status(status_code, payload):
+    if status_code >= 400:
+        detail = payload.get("detail") if isinstance(payload, dict) else payload
+        raise HousePriceAPIError(status_code, detail)
+
+
+class _ResponseCache:
+    """Cache TTL đơn giản cho các endpoint GET ít thay đổi"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key):
+        if not self.ttl:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        if self.ttl:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class HousePriceClient:
+    """
+    Client đồng bộ, an toàn khi dùng từ nhiều thread
+
+    Args:
+        base_url: Địa chỉ API
+        timeout: Timeout cho mỗi request (giây)
+        pool_maxsize: Số connection keep-alive tối đa giữ trong pool
+        max_retries: Số lần retry GET/predict khi gặp 429/503 hoặc lỗi kết nối
+        backoff_factor: Hệ số backoff (0.5 -> 0.5s, 1s, 2s, ...)
+        batch_window: Thời gian (giây) gom các predict() lại trước khi gửi
+            /predict/batch. 0 để tắt, mỗi predict() gọi thẳng /predict
+        max_batch_size: Số nhà tối đa trong một request batch
+        cache_ttl: Thời gian cache /features và /model/info (giây). None để tắt
+    """
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        timeout=30,
+        pool_maxsize=10,
+        max_retries=3,
+        backoff_factor=0.5,
+        batch_window=0,
+        max_batch_size=256,
+        cache_ttl=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._cache = _ResponseCache(cache_ttl)
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            # POST chỉ đi qua session này với các endpoint predict (idempotent)
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Session không retry cho /train: gửi lại sẽ train thêm một lần nữa
+        self._no_retry_session = requests.Session()
+        no_retry_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self._no_retry_session.mount("http://", no_retry_adapter)
+        self._no_retry_session.mount("https://", no_retry_adapter)
+
+        self._queue = None
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Gửi nốt các predict đang chờ và đóng connection pool"""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+        self.session.close()
+        self._no_retry_session.close()
+
+    def _request(self, method, path, retry=True, **kwargs):
+        session = self.session if retry else self._no_retry_session
+        response = session.request(
+            method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs
+        )
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = response.text
+        _raise_for_status(response.status_code, payload)
+        return payload
+
+    def _cached_get(self, path):
+        cached = self._cache.get(path)
+        if cached is not None:
+            return cached
+        payload = self._request("GET", path)
+        self._cache.set(path, payload)
+        return payload
+
+    def health(self):
+        """Health check chi tiết"""
+        return self._request("GET", "/health")
+
+    def features(self):
+        """Danh sách features model yêu cầu (có cache nếu bật cache_ttl)"""
+        return self._cached_get("/features")
+
+    def model_info(self):
+        """Thông tin model đã train (có cache nếu bật cache_ttl)"""
+        return self._cached_get("/model/info")
+
+    def train(self, **train_request):
+        """Train model, tham số giống TrainRequest của API (không retry)"""
+        payload = self._request("POST", "/train", retry=False, json=train_request)
+        # Model đã đổi nên bỏ cache features/model info
+        self._cache.clear()
+        return payload
+
+    def predict_raw(self, house):
+        """Gọi thẳng /predict, trả về response đầy đủ"""
+        return self._request("POST", "/predict", json=house)
+
+    def predict_batch(self, houses):
+        """
+        Dự đoán nhiều nhà trong một request /predict/batch
+
+        Returns:
+            List giá dự đoán (VND) theo đúng thứ tự houses
+        """
+        prices = []
+        for start in range(0, len(houses), self.max_batch_size):
+            chunk = houses[start : start + self.max_batch_size]
+            payload = self._request("POST", "/predict/batch", json={"houses": chunk})
+            prices.extend(p["predicted_price"] for p in payload["predictions"])
+        return prices
+
+    def predict(self, house):
+        """
+        Dự đoán giá một nhà
+
+        Khi bật batch_window, các lời gọi đồng thời từ nhiều thread được gom
+        lại và gửi chung một request /predict/batch.
+        """
+        if not self.batch_window:
+            return self.predict_raw(house)["predicted_price"]
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((house, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._batch_loop, daemon=True)
+                self._worker.start()
+
+    def _batch_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            deadline = time.monotonic() + self.batch_window
+            stop = False
+            while len(pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                pending.append(item)
+            self._flush(pending)
+            if stop:
+                return
+
+    def _flush(self, pending):
+        try:
+            prices = self.predict_batch([house for house, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        for (_, future), price in zip(pending, prices):
+            future.set_result(price)
+
+
+class AsyncHousePriceClient:
+    """
+    Client asyncio dùng httpx.AsyncClient, tham số giống HousePriceClient
+
+    Các coroutine predict() chạy đồng thời trong cùng batch_window được gom
+    thành một request /predict/batch.
+    """
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        timeout=30,
+        pool_maxsize=10,
+        max_retries=3,
+        backoff_factor=0.5,
+        batch_window=0.005,
+        max_batch_size=256,
+        cache_ttl=None,
+    ):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._cache = _ResponseCache(cache_ttl)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize
+            ),
+        )
+        self._pending = []
+        self._flush_handle = None
+        # Event loop chỉ giữ weak reference tới task: giữ lại cho đến khi xong,
+        # không thì task có thể bị GC và các predict() đang chờ không bao giờ trả
+        self._flush_tasks = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Gửi nốt các predict đang chờ và đóng connection pool"""
+        if self._pending:
+            await self._flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks)
+        await self.client.aclose()
+
+    def _backoff(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * (2**attempt)
+
+    async def _request(self, method, path, retry=True, **kwargs):
+        import httpx
+
+        max_retries = self.max_retries if retry else 0
+        for attempt in range(max_retries + 1):
+            response = None
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError:
+                if attempt == max_retries:
+                    raise
+            else:
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt == max_retries
+                ):
+                    break
+            await asyncio.sleep(self._backoff(attempt, response))
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = response.text
+        _raise_for_status(response.status_code, payload)
+        return payload
+
+    async def _cached_get(self, path):
+        cached = self._cache.get(path)
+        if cached is not None:
+            return cached
+        payload = await self._request("GET", path)
+        self._cache.set(path, payload)
+        return payload
+
+    async def health(self):
+        return await self._request("GET", "/health")
+
+    async def features(self):
+        return await self._cached_get("/features")
+
+    async def model_info(self):
+        return await self._cached_get("/model/info")
+
+    async def train(self, **train_request):
+        payload = await self._request("POST", "/train", retry=False, json=train_request)
+        self._cache.clear()
+        return payload
+
+    async def predict_raw(self, house):
+        return await self._request("POST", "/predict", json=house)
+
+    async def predict_batch(self, houses):
+        chunks = [
+            houses[start : start + self.max_batch_size]
+            for start in range(0, len(houses), self.max_batch_size)
+        ]
+        payloads = await asyncio.gather(
+            *(
+                self._request("POST", "/predict/batch", json={"houses": c})
+                for c in chunks
+            )
+        )
+        return [
+            p["predicted_price"] for payload in payloads for p in payload["predictions"]
+        ]
+
+    async def predict(self, house):
+        if not self.batch_window:
+            return (await self.predict_raw(house))["predicted_price"]
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((house, future))
+        if len(self._pending) >= self.max_batch_size:
+            await self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_window, self._start_flush
+            )
+        return await future
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            prices = await self.predict_batch([house for house, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), price in zip(pending, prices):
+            if not future.done():
+                future.set_result(price)
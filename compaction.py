@@ -0,0 +1,365 @@
+"""
+Thu gọn model theo ngân sách latency (số cây / thời gian dự đoán mỗi dòng)
+
+Từ model đã train (teacher), thử các cách làm model nhỏ hơn:
+- truncate: giữ n cây đầu tiên (boosting nên các cây đầu quan trọng nhất)
+- prune: cắt các nhánh có loss reduction nhỏ hơn gamma (updater "prune")
+- distill: train model nông hơn, ít cây hơn (student) trên dự đoán của teacher
+
+Mỗi ứng viên được đo RMSE trên cùng tập test như HousePriceModel.train và
+latency dự đoán (một dòng như /predict, và theo batch). Ứng viên chính xác
+nhất trong ngân sách được lưu thành model bình thường, kèm báo cáo JSON.
+
+Chạy:
+    python compaction.py data/house_data.csv --target-latency-us 150 --max-trees 100
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+
+from model import XGB_PARAMS, HousePriceModel, booster_params
+from train_with_real_data import detect_target_column
+
+# Số cây thử khi truncate, và cấu hình student (max_depth, n_estimators)
+TRUNCATE_FRACTIONS = [0.75, 0.5, 0.33, 0.25, 0.15, 0.1]
+PRUNE_GAMMA_FRACTIONS = [1e-4, 1e-3, 1e-2]
+STUDENT_CONFIGS = [(6, 100), (4, 100), (4, 50), (3, 50)]
+
+# Số lần gọi predict một dòng khi đo latency
+LATENCY_REPEATS = 200
+LATENCY_BATCH_ROWS = 10_000
+
+
+def count_leaves(booster):
+    """Tổng số lá của booster"""
+    return sum(tree.count("leaf=") for tree in booster.get_dump())
+
+
+def measure_latency(regressor, X, repeats=LATENCY_REPEATS):
+    """
+    Latency dự đoán (µs): median một dòng (như /predict) và trung bình mỗi
+    dòng khi dự đoán theo batch
+    """
+    row = X[:1]
+    regressor.predict(row)  # Warm up
+    single = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        regressor.predict(row)
+        single.append(time.perf_counter() - start)
+
+    batch = X[:LATENCY_BATCH_ROWS]
+    start = time.perf_counter()
+    regressor.predict(batch)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "single_row_us": round(float(np.median(single)) * 1e6, 1),
+        "batch_row_us": round(batch_seconds / len(batch) * 1e6, 3),
+    }
+
+
+def _read_eval_file(model, data_path, target_column=None):
+    """
+    Đọc file đánh giá qua cùng pipeline với lúc train
+
+    Model có transformer: tính features từ file gốc bằng preprocessing đã fit
+    lúc train (file đã preprocess cũng được, cột trùng tên feature giữ
+    nguyên). Không có transformer: preprocess bằng load_processed như /train.
+
+    Returns:
+        (X, y)
+    """
+    if model.transformer is not None:
+        df = pd.read_csv(data_path)
+        if target_column is None:
+            columns = list(df.columns)
+            target_column = (
+                "SalePrice" if "SalePrice" in columns else detect_target_column(columns)
+            )
+        return model.transformer.transform(df), df[target_column]
+
+    from ingestion import load_processed
+
+    df = load_processed(
+        data_path,
+        dataset_type="full" if model.category_maps else "auto",
+        target_column=target_column,
+    )
+    return df.iloc[:, :-1], df.iloc[:, -1]
+
+
+def _load_eval_data(model, data_path=None, X=None, y=None, target_column=None):
+    """Dữ liệu đã encode theo model, chia train/test giống HousePriceModel.train"""
+    if data_path:
+        X, y = _read_eval_file(model, data_path, target_column)
+    if isinstance(X, pd.DataFrame):
+        X = model._encode_categories(X[model.feature_names])
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float64)
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def _dmatrix(model, X, y=None):
+    return xgb.DMatrix(
+        X,
+        y,
+        feature_types=model._feature_types(model.feature_names),
+        enable_categorical=bool(model.category_maps),
+    )
+
+
+def _truncate_candidates(booster, n_trees, budget_trees):
+    sizes = {int(n_trees * f) for f in TRUNCATE_FRACTIONS}
+    if budget_trees:
+        sizes.add(min(budget_trees, n_trees))
+    for size in sorted(s for s in sizes if 0 < s < n_trees):
+        yield f"truncate_{size}", booster[:size], {"n_estimators": size}
+
+
+def _prune_candidates(model, booster, params, X_train, y_train):
+    dtrain = _dmatrix(model, X_train, y_train)
+    native_params, _ = booster_params(params)
+    # Gain của một split tỉ lệ với số dòng * bình phương chênh lệch trung bình
+    scale = float(np.var(y_train)) * len(y_train)
+    for fraction in PRUNE_GAMMA_FRACTIONS:
+        pruned = xgb.train(
+            dict(
+                native_params,
+                process_type="update",
+                updater="prune",
+                gamma=scale * fraction,
+            ),
+            dtrain,
+            num_boost_round=booster.num_boosted_rounds(),
+            xgb_model=booster.copy(),
+            verbose_eval=False,
+        )
+        yield f"prune_gamma_{fraction:g}", pruned, {"gamma": scale * fraction}
+
+
+def _distill_candidates(model, teacher, params, X_train, budget_trees):
+    # Student học dự đoán của teacher (mượt hơn nhãn gốc nên cần ít cây hơn)
+    dtrain = _dmatrix(model, X_train, teacher.predict(_dmatrix(model, X_train)))
+    for max_depth, n_estimators in STUDENT_CONFIGS:
+        if budget_trees:
+            n_estimators = min(n_estimators, budget_trees)
+        student_params = dict(
+            params,
+            max_depth=max_depth,
+            n_estimators=n_estimators,
+            # Ít cây hơn nên tăng learning rate để hội tụ kịp
+            learning_rate=max(params.get("learning_rate", 0.05), 0.1),
+        )
+        native_params, num_boost_round = booster_params(student_params)
+        student = xgb.train(
+            native_params, dtrain, num_boost_round=num_boost_round, verbose_eval=False
+        )
+        yield (
+            f"distill_d{max_depth}_n{n_estimators}",
+            student,
+            {"max_depth": max_depth, "n_estimators": n_estimators},
+        )
+
+
+def compact_model(
+    model,
+    data_path=None,
+    X=None,
+    y=None,
+    target_latency_us=None,
+    max_trees=None,
+    strategies=("truncate", "prune", "distill"),
+    output_path=None,
+    target_column=None,
+):
+    """
+    Tạo model nhỏ hơn trong ngân sách latency/số cây và lưu thành model mới
+
+    Args:
+        model: HousePriceModel đã train (teacher)
+        data_path, X, y: Dữ liệu để đánh giá (và train student). data_path
+            là file dữ liệu gốc, được preprocess như lúc train; X, y đã
+            preprocess như khi gọi HousePriceModel.train
+        target_latency_us: Latency tối đa khi dự đoán một dòng (µs)
+        max_trees: Số cây tối đa
+        strategies: Các cách thu gọn được thử
+        output_path: Nơi lưu model thu gọn, mặc định <model>_compact.pkl
+        target_column: Cột target của data_path, None để tự phát hiện
+
+    Returns:
+        Báo cáo (teacher, các ứng viên, ứng viên được chọn)
+    """
+    if model.model is None:
+        model.load()
+
+    X_train, X_test, y_train, y_test = _load_eval_data(
+        model, data_path, X, y, target_column
+    )
+    teacher = model.model.get_booster()
+    params = dict(model.hyperparameters or XGB_PARAMS)
+    n_trees = teacher.num_boosted_rounds()
+
+    def describe(name, booster, changes):
+        candidate_params = dict(params, **changes)
+        candidate_params["n_estimators"] = booster.num_boosted_rounds()
+        regressor = HousePriceModel._wrap_booster(booster, candidate_params)
+        rmse = model._evaluate(regressor, X_test, y_test)["rmse"]
+        return {
+            "name": name,
+            "n_trees": booster.num_boosted_rounds(),
+            "n_leaves": count_leaves(booster),
+            "rmse": round(rmse, 4),
+            **measure_latency(regressor, X_test),
+            "_regressor": regressor,
+            "_params": candidate_params,
+        }
+
+    baseline = describe("teacher", teacher, {})
+    candidates = []
+    if "truncate" in strategies:
+        for name, booster, changes in _truncate_candidates(teacher, n_trees, max_trees):
+            candidates.append(describe(name, booster, changes))
+    if "prune" in strategies:
+        for name, booster, changes in _prune_candidates(
+            model, teacher, params, X_train, y_train
+        ):
+            candidates.append(describe(name, booster, changes))
+    if "distill" in strategies:
+        for name, booster, changes in _distill_candidates(
+            model, teacher, params, X_train, max_trees
+        ):
+            candidates.append(describe(name, booster, changes))
+
+    for candidate in candidates:
+        candidate["rmse_increase_pct"] = round(
+            (candidate["rmse"] / baseline["rmse"] - 1) * 100, 2
+        )
+        candidate["speedup_single"] = round(
+            baseline["single_row_us"] / candidate["single_row_us"], 2
+        )
+        candidate["speedup_batch"] = round(
+            baseline["batch_row_us"] / candidate["batch_row_us"], 2
+        )
+        candidate["within_budget"] = (
+            target_latency_us is None or candidate["single_row_us"] <= target_latency_us
+        ) and (max_trees is None or candidate["n_trees"] <= max_trees)
+
+    within_budget = [c for c in candidates if c["within_budget"]]
+    if within_budget:
+        selected = min(within_budget, key=lambda c: c["rmse"])
+    else:
+        # Không ứng viên nào đạt ngân sách: chọn ứng viên nhanh nhất
+        selected = min(candidates, key=lambda c: c["single_row_us"])
+        print("⚠ Không có ứng viên nào đạt ngân sách, chọn ứng viên nhanh nhất")
+
+    output_path = output_path or (
+        os.path.splitext(model.model_path)[0] + "_compact.pkl"
+    )
+    compact = HousePriceModel(model_path=output_path)
+    compact.model = selected["_regressor"]
+    compact.feature_names = model.feature_names
+    compact.category_maps = model.category_maps
+    compact.drift_reference = model.drift_reference
+    compact.version = model.version
+    compact.training_samples = model.training_samples
+    compact.lineage = model.lineage
+    compact.transformer = model.transformer
+    # Thiếu feature cuối để kiểm tra cả cách điền giá trị thiếu
+    probe = dict(zip(model.feature_names[:-1], X_test[0]))
+    _check_same_encoding(model, compact, probe)
+    metrics = compact._evaluate(compact.model, X_test, y_test)
+    compact._finish_training(
+        metrics,
+        model.training_samples,
+        selected["_params"],
+        mode="compacted",
+        lineage_extra={
+            "strategy": selected["name"],
+            "teacher_rmse": baseline["rmse"],
+            "rmse_increase_pct": selected["rmse_increase_pct"],
+            "speedup_single": selected["speedup_single"],
+        },
+    )
+
+    report = {
+        "teacher_version": model.version,
+        "compact_version": compact.version,
+        "target_latency_us": target_latency_us,
+        "max_trees": max_trees,
+        "teacher": _public(baseline),
+        "candidates": [_public(c) for c in candidates],
+        "selected": selected["name"],
+        "model_path": output_path,
+    }
+    report_path = os.path.splitext(output_path)[0] + "_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(
+        f"✓ Chọn {selected['name']}: {selected['n_trees']} cây, RMSE "
+        f"{selected['rmse_increase_pct']:+.2f}%, nhanh hơn {selected['speedup_single']}x "
+        f"(một dòng), {selected['speedup_batch']}x (batch)"
+    )
+    print(f"✓ Đã lưu báo cáo tại {report_path}")
+    report["report_path"] = report_path
+    return report
+
+
+def _check_same_encoding(teacher, compact, features_dict):
+    """
+    Model thu gọn phải tính features từ dict (/predict) giống hệt teacher,
+    nếu không nó dự đoán trên input chưa qua preprocessing lúc train
+    """
+    expected = float(compact.model.predict(teacher.encode_features([features_dict]))[0])
+    actual = compact.predict(features_dict)
+    if not np.isclose(actual, expected):
+        raise ValueError(
+            f"Model thu gọn dự đoán {actual:.2f} cho {features_dict}, "
+            f"theo preprocessing của teacher phải là {expected:.2f}"
+        )
+
+
+def _public(candidate):
+    return {k: v for k, v in candidate.items() if not k.startswith("_")}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from instrumentation import configure_logging
+
+    parser = argparse.ArgumentParser(description="Thu gọn model theo ngân sách")
+    parser.add_argument("data_path", help="CSV dữ liệu gốc để đánh giá")
+    parser.add_argument(
+        "--target-column", default=None, help="Cột target, mặc định tự phát hiện"
+    )
+    parser.add_argument("--model-path", default="models/house_price_model.pkl")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--target-latency-us", type=float, default=None)
+    parser.add_argument("--max-trees", type=int, default=None)
+    parser.add_argument(
+        "--strategies",
+        default="truncate,prune,distill",
+        help="Các cách thử, phân tách bằng dấu phẩy",
+    )
+    args = parser.parse_args()
+    configure_logging()
+
+    report = compact_model(
+        HousePriceModel(model_path=args.model_path),
+        data_path=args.data_path,
+        target_latency_us=args.target_latency_us,
+        max_trees=args.max_trees,
+        strategies=args.strategies.split(","),
+        output_path=args.output,
+        target_column=args.target_column,
+    )
+    columns = ["name", "n_trees", "n_leaves", "rmse", "rmse_increase_pct"]
+    columns += ["single_row_us", "speedup_single", "batch_row_us", "speedup_batch"]
+    for candidate in [report["teacher"]] + report["candidates"]:
+        print("  ".join(f"{candidate.get(c, '')}" for c in columns))
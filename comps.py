@@ -0,0 +1,266 @@
+"""
+Tìm các căn nhà tương tự trong dữ liệu train ("comps") cho mỗi định giá
+
+Lúc train, features đã encode của tập train được lưu thành mảng .npy float32
+(mở bằng memory map) cùng giá thật của từng căn. Khoảng cách tính trên
+features đã chuẩn hoá (trừ mean, chia std của tập train), giá trị thiếu không
+tính vào khoảng cách.
+
+Để truy vấn nhanh với hàng triệu dòng, index chia dữ liệu thành các cụm
+k-means (khoảng sqrt(N) cụm) và lưu các dòng của cùng một cụm liền nhau. Mỗi
+truy vấn chỉ so với các tâm cụm rồi tính khoảng cách chính xác trên n_probe
+cụm gần nhất, nên chỉ đọc vài nghìn dòng thay vì toàn bộ mảng. Dataset nhỏ
+(dưới EXACT_MAX_ROWS dòng) dùng một cụm, tức tìm kiếm chính xác.
+
+Chạy:
+    python comps.py --model-path models/house_price_model.pkl --data data/house_data.csv
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+# Dưới số dòng này tìm kiếm vét cạn (chính xác) đã đủ nhanh
+EXACT_MAX_ROWS = 20_000
+# Số dòng tối đa dùng để fit k-means
+KMEANS_SAMPLE_ROWS = 100_000
+# Số cụm được quét mỗi truy vấn (nhiều hơn = chính xác hơn, chậm hơn)
+N_PROBE = 4
+DEFAULT_K = 5
+MAX_K = 50
+# Số dòng gán cụm mỗi lần khi build (giới hạn bộ nhớ ma trận khoảng cách)
+ASSIGN_CHUNK_ROWS = 50_000
+
+
+def comps_paths(model_path):
+    """Đường dẫn features (.npy), giá (.npy) và metadata (.json) cạnh file model"""
+    base = os.path.splitext(model_path)[0] + "_comps"
+    return base + ".npy", base + "_prices.npy", base + ".json"
+
+
+def _assign(X_scaled, centroids):
+    """Cụm gần nhất của từng dòng (theo từng khối để giới hạn bộ nhớ)"""
+    centroid_norms = (centroids**2).sum(axis=1)
+    labels = np.empty(len(X_scaled), dtype=np.int64)
+    for start in range(0, len(X_scaled), ASSIGN_CHUNK_ROWS):
+        block = X_scaled[start : start + ASSIGN_CHUNK_ROWS]
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2, bỏ ||x||^2 vì không đổi argmin
+        distances = centroid_norms - 2 * block @ centroids.T
+        labels[start : start + ASSIGN_CHUNK_ROWS] = distances.argmin(axis=1)
+    return labels
+
+
+class CompsIndex:
+    """
+    Index các căn nhà train (features và prices là mảng memory-mapped,
+    sắp xếp theo cụm; cụm c gồm các dòng offsets[c]:offsets[c + 1])
+
+    Args:
+        features: Features gốc đã encode (float32), thứ tự theo cụm
+        prices: Giá thật tương ứng (float32)
+        metadata: Dict từ file .json (mean, std, centroids, offsets, ...)
+    """
+
+    def __init__(self, features, prices, metadata):
+        self.features = features
+        self.prices = prices
+        self.metadata = metadata
+        self.feature_names = metadata["feature_names"]
+        self.mean = np.asarray(metadata["mean"], dtype=np.float32)
+        self.inv_std = 1.0 / np.asarray(metadata["std"], dtype=np.float32)
+        # Trọng số 1/std^2: khoảng cách chuẩn hoá mà không cần lưu bản scale
+        self.weights = self.inv_std**2
+        self.centroids = np.asarray(metadata["centroids"], dtype=np.float32)
+        self.centroid_norms = (self.centroids**2).sum(axis=1)
+        self.offsets = np.asarray(metadata["offsets"], dtype=np.int64)
+        self.has_missing = metadata["has_missing"]
+
+    def query(self, x, k=DEFAULT_K, n_probe=N_PROBE):
+        """
+        k căn gần nhất với một căn nhà
+
+        Args:
+            x: Features đã encode theo feature_names (NaN = thiếu)
+            k: Số comps
+            n_probe: Số cụm được quét
+
+        Returns:
+            (chỉ số dòng trong index, khoảng cách) sắp xếp tăng dần
+        """
+        x = np.asarray(x, dtype=np.float32)
+        n_clusters = len(self.centroids)
+        if n_clusters == 1:
+            block = self.features[:]
+        else:
+            scaled = np.nan_to_num((x - self.mean) * self.inv_std)
+            # Bỏ ||x||^2 vì không đổi thứ tự các tâm cụm
+            center = self.centroid_norms - 2 * (self.centroids @ scaled)
+            n_probe = min(n_probe, n_clusters)
+            probe = np.argpartition(center, n_probe - 1)[:n_probe]
+            starts = self.offsets[probe]
+            ends = self.offsets[probe + 1]
+            # Mỗi cụm là một đoạn liền nhau của memmap: đọc tuần tự
+            block = np.concatenate(
+                [self.features[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+            )
+
+        diff = block - x
+        if self.has_missing or np.isnan(x).any():
+            diff = np.nan_to_num(diff)
+        distances = (diff * diff) @ self.weights
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        if n_clusters == 1:
+            return top, np.sqrt(distances[top])
+        # Vị trí trong block -> chỉ số dòng trong index
+        lengths = np.cumsum(ends - starts)
+        cluster = np.searchsorted(lengths, top, side="right")
+        rows = starts[cluster] + top - (lengths[cluster] - (ends - starts)[cluster])
+        return rows, np.sqrt(distances[top])
+
+    def comps(self, x, k=DEFAULT_K, n_probe=N_PROBE):
+        """
+        Comps của một căn nhà dạng list dict (features, price, distance)
+        """
+        rows, distances = self.query(x, k=k, n_probe=n_probe)
+        features = self.features[rows]
+        prices = self.prices[rows]
+        return [
+            {
+                "features": {
+                    name: (None if np.isnan(value) else round(float(value), 4))
+                    for name, value in zip(self.feature_names, row)
+                },
+                "price_raw": float(price),
+                "distance": round(float(distance), 4),
+            }
+            for row, price, distance in zip(features, prices, distances)
+        ]
+
+
+def build_comps_index(model, X, y, n_clusters=None, seed=42):
+    """
+    Tạo index comps từ dữ liệu train đã encode và lưu cạnh file model
+
+    Args:
+        model: HousePriceModel vừa train (dùng version, feature_names, model_path)
+        X: Features đã encode (numpy, cột theo feature_names)
+        y: Giá thật
+        n_clusters: Số cụm, None = sqrt(số dòng) (một cụm nếu dataset nhỏ)
+
+    Returns:
+        Metadata của index (đồng thời gán model.comps_index)
+    """
+    start = time.perf_counter()
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    mean = np.nanmean(X, axis=0)
+    std = np.nanstd(X, axis=0)
+    # Cột hằng số hoặc toàn NaN: không chia cho 0
+    std = np.where(np.isfinite(std) & (std > 0), std, 1.0).astype(np.float32)
+    mean = np.nan_to_num(mean)
+    X_scaled = np.nan_to_num((X - mean) / std)
+
+    if n_clusters is None:
+        n_clusters = 1 if len(X) <= EXACT_MAX_ROWS else int(np.sqrt(len(X)))
+    if n_clusters > 1:
+        from sklearn.cluster import MiniBatchKMeans
+
+        rng = np.random.default_rng(seed)
+        sample = X_scaled
+        if len(X_scaled) > KMEANS_SAMPLE_ROWS:
+            sample = X_scaled[
+                rng.choice(len(X_scaled), KMEANS_SAMPLE_ROWS, replace=False)
+            ]
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_clusters, random_state=seed, n_init=1, batch_size=4096
+        ).fit(sample)
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        labels = _assign(X_scaled, centroids)
+    else:
+        centroids = np.zeros((1, X.shape[1]), dtype=np.float32)
+        labels = np.zeros(len(X), dtype=np.int64)
+    del X_scaled
+
+    order = np.argsort(labels, kind="stable")
+    offsets = np.searchsorted(labels[order], np.arange(n_clusters + 1))
+
+    features_path, prices_path, metadata_path = comps_paths(model.model_path)
+    os.makedirs(os.path.dirname(features_path) or ".", exist_ok=True)
+    for path, values in ((features_path, X[order]), (prices_path, y[order])):
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, values)
+        os.replace(tmp_path, path)
+    build_seconds = time.perf_counter() - start
+
+    metadata = {
+        "model_version": model.version,
+        "feature_names": list(model.feature_names),
+        "rows": len(X),
+        "clusters": n_clusters,
+        "mean": mean.tolist(),
+        "std": std.tolist(),
+        "centroids": centroids.tolist(),
+        "offsets": offsets.tolist(),
+        "has_missing": bool(np.isnan(X).any()),
+        "size_mb": round(
+            (os.path.getsize(features_path) + os.path.getsize(prices_path)) / 1024**2,
+            1,
+        ),
+        "build_s": round(build_seconds, 2),
+    }
+    with open(metadata_path, "w") as f:
+        json.dump(metadata, f)
+    model.comps_index = CompsIndex(
+        np.load(features_path, mmap_mode="r"),
+        np.load(prices_path, mmap_mode="r"),
+        metadata,
+    )
+    print(
+        f"✓ Đã tạo index comps {len(X):,} dòng, {n_clusters} cụm "
+        f"({metadata['size_mb']} MB) trong {build_seconds:.1f}s"
+    )
+    return {k: v for k, v in metadata.items() if k not in ("centroids", "offsets")}
+
+
+def load_comps_index(model):
+    """
+    Mở index comps của model nếu có và đúng version model, không thì None
+    """
+    features_path, prices_path, metadata_path = comps_paths(model.model_path)
+    if not all(os.path.exists(p) for p in (features_path, prices_path, metadata_path)):
+        return None
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    if metadata.get("model_version") != model.version:
+        print("⚠ Index comps không khớp version model, bỏ qua")
+        return None
+    return CompsIndex(
+        np.load(features_path, mmap_mode="r"),
+        np.load(prices_path, mmap_mode="r"),
+        metadata,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import pandas as pd
+
+    from model import HousePriceModel
+
+    parser = argparse.ArgumentParser(description="Tạo index comps cho model")
+    parser.add_argument("--model-path", default="models/house_price_model.pkl")
+    parser.add_argument(
+        "--data", required=True, help="CSV đã preprocess (cột cuối là giá)"
+    )
+    args = parser.parse_args()
+
+    model = HousePriceModel(model_path=args.model_path)
+    model.load()
+    df = pd.read_csv(args.data)
+    X = df.iloc[:, :-1].reindex(columns=model.feature_names)
+    build_comps_index(model, model._encode_categories(X).values, df.iloc[:, -1].values)
@@ -1,88 +1,96 @@
 """
 Tạo dataset lớn hơn để train model chính xác hơn
+
+- generate_large_dataset: tạo một DataFrame và ghi một file CSV (dataset vừa RAM)
+- generate_sharded_dataset: tạo dataset rất lớn (100M+ dòng) thành nhiều shard
+  Parquet/CSV song song trên process pool. Mỗi shard có seed riêng suy ra từ
+  (seed, số thứ tự shard) nên kết quả không phụ thuộc số worker, và được ghi
+  theo từng chunk nên bộ nhớ mỗi worker chỉ phụ thuộc chunk_rows
 """
-import pandas as pd
-import numpy as np
+import json
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Số dòng mỗi shard và mỗi chunk ghi ra (bộ nhớ mỗi worker ~ chunk_rows)
+DEFAULT_ROWS_PER_SHARD = 5_000_000
+DEFAULT_CHUNK_ROWS = 500_000
 
-def generate_large_dataset(n_samples=50000, save_path='data/large_house_data.csv'):
+
+def generate_chunk(n_rows, rng):
     """
-    Tạo dataset lớn với công thức giá nhà thực tế hơn
+    Tạo n_rows dòng dữ liệu với công thức giá nhà thực tế, vectorized hoàn toàn
+
+    Args:
+        n_rows: Số dòng
+        rng: np.random.Generator
+
+    Returns:
+        DataFrame các features và cột price
     """
-    np.random.seed(42)
-    
-    print(f"Đang tạo dataset với {n_samples:,} mẫu...")
-    
-    # Tạo dữ liệu với phân phối thực tế hơn
-    data = {
-        # Diện tích: phân phối chuẩn, trung bình 120m²
-        'area': np.clip(np.random.normal(120, 50, n_samples), 30, 500),
-        
-        # Số phòng ngủ: phân phối thực tế (1-5 phòng, ưu tiên 2-3)
-        'bedrooms': np.random.choice([1, 2, 3, 4, 5], n_samples, p=[0.1, 0.25, 0.35, 0.2, 0.1]),
-        
-        # Số phòng tắm: thường bằng hoặc ít hơn số phòng ngủ
-        'bathrooms': np.array([max(1, b - np.random.randint(0, 2)) for b in np.random.choice([1, 2, 3, 4], n_samples, p=[0.2, 0.4, 0.3, 0.1])]),
-        
-        # Số tầng: 1-4 tầng
-        'floors': np.random.choice([1, 2, 3, 4], n_samples, p=[0.4, 0.35, 0.2, 0.05]),
-        
-        # Năm xây dựng: từ 1980 đến 2024
-        'year_built': np.random.randint(1980, 2025, n_samples),
-        
-        # Điểm vị trí: phân phối chuẩn, trung bình 6.5
-        'location_score': np.clip(np.random.normal(6.5, 2, n_samples), 0, 10),
-    }
-    
-    df = pd.DataFrame(data)
-    
-    # Tạo giá nhà với công thức phức tạp và thực tế hơn
-    # Giá cơ bản = diện tích * giá/m²
-    base_price = df['area'] * np.random.uniform(40, 80, n_samples)  # 40-80 triệu/m²
-    
+    # Diện tích: phân phối chuẩn, trung bình 120m²
+    area = np.clip(rng.normal(120, 50, n_rows), 30, 500)
+    # Số phòng ngủ: phân phối thực tế (1-5 phòng, ưu tiên 2-3)
+    bedrooms = rng.choice([1, 2, 3, 4, 5], n_rows, p=[0.1, 0.25, 0.35, 0.2, 0.1])
+    # Số phòng tắm: thường bằng hoặc ít hơn một phòng
+    bathrooms = np.maximum(
+        1,
+        rng.choice([1, 2, 3, 4], n_rows, p=[0.2, 0.4, 0.3, 0.1])
+        - rng.integers(0, 2, n_rows),
+    )
+    # Số tầng: 1-4 tầng
+    floors = rng.choice([1, 2, 3, 4], n_rows, p=[0.4, 0.35, 0.2, 0.05])
+    # Năm xây dựng: từ 1980 đến 2024
+    year_built = rng.integers(1980, 2025, n_rows)
+    # Điểm vị trí: phân phối chuẩn, trung bình 6.5
+    location_score = np.clip(rng.normal(6.5, 2, n_rows), 0, 10)
+
+    # Giá cơ bản = diện tích * giá/m² (40-80 triệu/m²)
+    price = area * rng.uniform(40, 80, n_rows)
     # Phòng ngủ: mỗi phòng thêm 100-200 triệu
-    bedroom_bonus = df['bedrooms'] * np.random.uniform(100, 200, n_samples) * 1_000_000
-    
+    price += bedrooms * rng.uniform(100, 200, n_rows) * 1_000_000
     # Phòng tắm: mỗi phòng thêm 50-100 triệu
-    bathroom_bonus = df['bathrooms'] * np.random.uniform(50, 100, n_samples) * 1_000_000
-    
+    price += bathrooms * rng.uniform(50, 100, n_rows) * 1_000_000
     # Số tầng: mỗi tầng thêm 50-150 triệu
-    floor_bonus = (df['floors'] - 1) * np.random.uniform(50, 150, n_samples) * 1_000_000
-    
+    price += (floors - 1) * rng.uniform(50, 150, n_rows) * 1_000_000
     # Năm xây dựng: nhà mới hơn đắt hơn
-    year_factor = (df['year_built'] - 1980) / (2024 - 1980)  # 0-1
-    year_bonus = year_factor * np.random.uniform(200, 500, n_samples) * 1_000_000
-    
+    year_factor = (year_built - 1980) / (2024 - 1980)  # 0-1
+    price += year_factor * rng.uniform(200, 500, n_rows) * 1_000_000
     # Điểm vị trí: ảnh hưởng lớn đến giá
-    location_bonus = df['location_score'] * np.random.uniform(50, 150, n_samples) * 1_000_000
-    
+    price += location_score * rng.uniform(50, 150, n_rows) * 1_000_000
     # Tương tác giữa các features
-    interaction = (df['area'] * df['bedrooms'] * df['location_score']) * np.random.uniform(1000, 5000, n_samples)
-    
-    # Tính tổng giá
-    df['price'] = (
-        base_price +
-        bedroom_bonus +
-        bathroom_bonus +
-        floor_bonus +
-        year_bonus +
-        location_bonus +
-        interaction +
-        np.random.normal(0, 50_000_000, n_samples)  # Noise
-    )
-    
-    # Đảm bảo giá > 0 và trong khoảng hợp lý (500 triệu - 50 tỷ)
-    df['price'] = np.clip(df['price'], 500_000_000, 50_000_000_000)
-    
-    # Làm tròn
-    df['price'] = df['price'].round(0)
-    df['area'] = df['area'].round(1)
-    df['location_score'] = df['location_score'].round(1)
-    
+    price += (area * bedrooms * location_score) * rng.uniform(1000, 5000, n_rows)
+    # Noise
+    price += rng.normal(0, 50_000_000, n_rows)
+
+    # Đảm bảo giá trong khoảng hợp lý (500 triệu - 50 tỷ) và làm tròn
+    return pd.DataFrame({
+        'area': area.round(1),
+        'bedrooms': bedrooms,
+        'bathrooms': bathrooms,
+        'floors': floors,
+        'year_built': year_built,
+        'location_score': location_score.round(1),
+        'price': np.clip(price, 500_000_000, 50_000_000_000).round(0),
+    })
+
+
+def generate_large_dataset(n_samples=50000, save_path='data/large_house_data.csv', seed=42):
+    """
+    Tạo dataset lớn với công thức giá nhà thực tế hơn (một process, một file CSV)
+    """
+    print(f"Đang tạo dataset với {n_samples:,} mẫu...")
+
+    df = generate_chunk(n_samples, np.random.default_rng(seed))
+
     # Lưu file
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     df.to_csv(save_path, index=False)
-    
+
     print(f"✓ Đã tạo dataset tại {save_path}")
     print(f"  - Số mẫu: {len(df):,}")
     print(f"  - Giá trung bình: {df['price'].mean():,.0f} VND")
@@ -90,16 +98,152 @@ def generate_large_dataset(n_samples=50000, save_path='data/large_house_data.csv
     print(f"  - Giá max: {df['price'].max():,.0f} VND")
     print(f"\nBạn có thể train model bằng lệnh:")
     print(f"  python train_with_real_data.py {save_path}")
-    
+
     return df
 
 
+def shard_rng(seed, shard_index):
+    """Generator riêng cho từng shard, chỉ phụ thuộc seed và số thứ tự shard"""
+    return np.random.default_rng(np.random.SeedSequence([seed, shard_index]))
+
+
+def write_shard(shard_index, n_rows, output_dir, file_format='parquet', seed=42,
+                chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Tạo và ghi một shard theo từng chunk (Parquet: mỗi chunk một row group)
+
+    Returns:
+        Dict thông tin shard (path, rows, seconds)
+    """
+    start = time.perf_counter()
+    rng = shard_rng(seed, shard_index)
+    path = os.path.join(output_dir, f'part-{shard_index:05d}.{file_format}')
+    tmp_path = path + '.tmp'
+
+    writer = None
+    written = 0
+    try:
+        while written < n_rows:
+            chunk = generate_chunk(min(chunk_rows, n_rows - written), rng)
+            if file_format == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp_path, mode='w' if written == 0 else 'a',
+                             header=written == 0, index=False)
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    # Ghi file tạm rồi rename để shard dở dang không bị đọc nhầm
+    os.replace(tmp_path, path)
+
+    return {
+        'shard': shard_index,
+        'path': path,
+        'rows': written,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def generate_sharded_dataset(n_samples, output_dir='data/large_house_data',
+                             file_format='parquet', rows_per_shard=DEFAULT_ROWS_PER_SHARD,
+                             n_workers=None, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Tạo dataset rất lớn thành nhiều shard song song
+
+    Args:
+        n_samples: Tổng số dòng
+        output_dir: Thư mục chứa các shard (part-00000.parquet, ...)
+        file_format: "parquet" hoặc "csv"
+        rows_per_shard: Số dòng mỗi shard (đơn vị chia việc cho các worker)
+        n_workers: Số process song song, None = số CPU
+        seed: Seed gốc; cùng seed và rows_per_shard cho cùng dữ liệu với mọi
+            n_workers
+        chunk_rows: Số dòng tạo và ghi mỗi lần trong một shard
+
+    Returns:
+        Dict tóm tắt (rows, shards, seconds, rows_per_sec, ...), cũng được ghi
+        ra output_dir/_manifest.json
+    """
+    if file_format not in ('parquet', 'csv'):
+        raise ValueError(f"file_format không hợp lệ: {file_format}")
+
+    n_workers = n_workers or os.cpu_count() or 1
+    shard_sizes = [
+        min(rows_per_shard, n_samples - start)
+        for start in range(0, n_samples, rows_per_shard)
+    ]
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Đang tạo {n_samples:,} dòng thành {len(shard_sizes)} shard "
+          f"{file_format} với {n_workers} worker...")
+
+    start = time.perf_counter()
+    # spawn thay vì fork để không kế thừa thread pool của numpy/XGBoost
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as executor:
+        futures = [
+            executor.submit(write_shard, shard_index, n_rows, output_dir,
+                            file_format, seed, chunk_rows)
+            for shard_index, n_rows in enumerate(shard_sizes)
+        ]
+        shards = [future.result() for future in futures]
+    seconds = time.perf_counter() - start
+
+    summary = {
+        'rows': n_samples,
+        'shards': len(shards),
+        'file_format': file_format,
+        'rows_per_shard': rows_per_shard,
+        'n_workers': n_workers,
+        'seed': seed,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(n_samples / seconds),
+        'files': [shard['path'] for shard in shards],
+    }
+    with open(os.path.join(output_dir, '_manifest.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"✓ Đã tạo {n_samples:,} dòng tại {output_dir} trong {seconds:.1f}s "
+          f"({summary['rows_per_sec']:,} dòng/s)")
+    return summary
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tạo dataset lớn để train model")
+    parser.add_argument('--rows', type=int, default=50000, help="Tổng số dòng")
+    parser.add_argument('--output', default=None,
+                        help="File CSV (một file) hoặc thư mục shard (khi --sharded)")
+    parser.add_argument('--sharded', action='store_true',
+                        help="Tạo song song thành nhiều shard")
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--rows-per-shard', type=int, default=DEFAULT_ROWS_PER_SHARD)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Tạo Dataset Lớn để Train Model Chính Xác Hơn")
     print("=" * 60)
     print()
-    
-    # Tạo dataset 50,000 mẫu
-    generate_large_dataset(n_samples=50000, save_path='data/large_house_data.csv')
 
+    if args.sharded:
+        generate_sharded_dataset(
+            args.rows,
+            output_dir=args.output or 'data/large_house_data',
+            file_format=args.format,
+            rows_per_shard=args.rows_per_shard,
+            n_workers=args.workers,
+            seed=args.seed,
+        )
+    else:
+        generate_large_dataset(n_samples=args.rows,
+                               save_path=args.output or 'data/large_house_data.csv',
+                               seed=args.seed)
@@ -0,0 +1,354 @@
+"""
+Train data-parallel trên nhiều worker process/máy bằng collective của XGBoost
+
+Mỗi worker chỉ đọc phần dữ liệu của mình (các shard part-*.parquet/csv chia
+đều theo rank, hoặc các chunk xen kẽ nếu chỉ có một file), preprocess bằng
+đúng preprocess_generic_data và train trên QuantileDMatrix. XGBoost đồng bộ
+quantile sketch và histogram giữa các worker qua tracker (RabitTracker), nên
+mọi worker có cùng một model. Worker rank 0 trả về model; model được lưu như
+HousePriceModel bình thường (XGBRegressor), predict/save/load không đổi.
+
+Chạy trên một máy (local cluster):
+    python distributed.py train data/large_house_data --workers 4
+
+Chạy trên nhiều máy: khởi động tracker trên một máy, rồi chạy worker trên
+từng máy với cùng data_path (ví dụ thư mục shard trên storage dùng chung):
+    python distributed.py tracker --host-ip 10.0.0.1 --workers 8 --port 9091
+    python distributed.py worker data/large_house_data --rank 0 --workers 8 \
+        --tracker-uri 10.0.0.1 --tracker-port 9091
+"""
+
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+import xgboost as xgb
+from xgboost.tracker import RabitTracker
+
+from external_memory import (
+    MEDIAN_SAMPLE_ROWS,
+    error_sums,
+    iter_raw_chunks,
+    list_data_files,
+    metrics_from_sums,
+    process_chunk,
+    scan_dataset,
+)
+from instrumentation import RoundTimingCallback, configure_logging
+from model import XGB_PARAMS, booster_params
+from tuning import thread_budget
+
+# Timeout (giây) chờ worker kết thúc trước khi coi là lỗi
+WORKER_TIMEOUT = 24 * 3600
+# Chu kỳ (giây) kiểm tra worker còn sống trong lúc chờ kết quả
+POLL_INTERVAL = 1.0
+
+
+def iter_worker_chunks(data_path, chunk_size, rank, world_size):
+    """
+    Các chunk dữ liệu gốc thuộc về worker rank
+
+    Đủ shard thì mỗi worker chỉ đọc các file của mình (files[rank::world_size]),
+    không thì chia các chunk xen kẽ theo thứ tự đọc.
+    """
+    files = list_data_files(data_path)
+    if len(files) >= world_size:
+        for path in files[rank::world_size]:
+            yield from iter_raw_chunks(path, chunk_size)
+    else:
+        for index, chunk in enumerate(iter_raw_chunks(data_path, chunk_size)):
+            if index % world_size == rank:
+                yield chunk
+
+
+def _load_partition(data_path, chunk_size, rank, world_size, target_column, fills):
+    """Đọc và preprocess phần dữ liệu của worker, chia train/holdout"""
+    train_X, train_y, test_X, test_y = [], [], [], []
+    feature_names = None
+    for chunk in iter_worker_chunks(data_path, chunk_size, rank, world_size):
+        X, y, is_test, feature_names = process_chunk(chunk, target_column, fills)
+        train_X.append(X[~is_test])
+        train_y.append(y[~is_test])
+        test_X.append(X[is_test])
+        test_y.append(y[is_test])
+    if feature_names is None:
+        raise ValueError(f"Worker {rank} không có dữ liệu, giảm số worker")
+    return (
+        np.concatenate(train_X),
+        np.concatenate(train_y),
+        np.concatenate(test_X),
+        np.concatenate(test_y),
+        feature_names,
+    )
+
+
+def worker_threads(params, world_size):
+    """Số thread mỗi worker: ngân sách n_jobs của params chia đều cho các worker"""
+    return max(1, thread_budget((params or {}).get("n_jobs")) // world_size)
+
+
+def run_worker(
+    data_path,
+    rank,
+    world_size,
+    tracker_env,
+    chunk_size=100_000,
+    max_bin=256,
+    params=None,
+    nthread=None,
+    target_column=None,
+):
+    """
+    Chạy một worker trong collective
+
+    Returns:
+        Với rank 0: dict (model_raw, feature_names, metrics, training_samples,
+        params, timings); các rank khác trả về None
+    """
+    timings = {}
+    start = time.perf_counter()
+    # Mọi worker tính fill values trên cùng một mẫu đầu dataset (deterministic)
+    target_column, fill_values, _ = scan_dataset(
+        data_path, chunk_size, target_column, max_rows=MEDIAN_SAMPLE_ROWS
+    )
+    X_train, y_train, X_test, y_test, feature_names = _load_partition(
+        data_path, chunk_size, rank, world_size, target_column, fill_values
+    )
+    timings["load_s"] = round(time.perf_counter() - start, 3)
+
+    nthread = nthread or worker_threads(params, world_size)
+    params = dict(
+        params or XGB_PARAMS, tree_method="hist", max_bin=max_bin, n_jobs=nthread
+    )
+    native_params, num_boost_round = booster_params(params)
+
+    env = dict(tracker_env, DMLC_TASK_ID=str(rank))
+    with xgb.collective.CommunicatorContext(**env):
+        start = time.perf_counter()
+        dtrain = xgb.QuantileDMatrix(X_train, y_train, max_bin=max_bin, nthread=nthread)
+        callback = RoundTimingCallback(run_id=f"rank{rank}")
+        booster = xgb.train(
+            native_params,
+            dtrain,
+            num_boost_round=num_boost_round,
+            verbose_eval=False,
+            callbacks=[callback],
+        )
+        timings["fit_s"] = round(time.perf_counter() - start, 3)
+        timings["rounds"] = callback.summary()
+
+        # Metrics trên holdout của toàn bộ worker: cộng các tổng qua allreduce
+        local_sums = error_sums(y_test, booster.inplace_predict(X_test))
+        sums = xgb.collective.allreduce(local_sums, xgb.collective.Op.SUM)
+        counts = xgb.collective.allreduce(
+            np.array([len(y_train)], dtype=np.float64), xgb.collective.Op.SUM
+        )
+        training_samples = int(counts[0])
+
+    if rank != 0:
+        return None
+    return {
+        "model_raw": bytes(booster.save_raw(raw_format="ubj")),
+        "feature_names": feature_names,
+        "metrics": metrics_from_sums(sums),
+        "training_samples": training_samples,
+        "params": params,
+        "timings": timings,
+    }
+
+
+def _worker_process(result_queue, data_path, rank, *args):
+    # Process spawn mới: cấu hình log train như process cha
+    configure_logging()
+    try:
+        result_queue.put(("ok", rank, run_worker(data_path, rank, *args)))
+    except Exception as e:  # Trả lỗi về process cha
+        result_queue.put(("error", rank, repr(e)))
+
+
+def collect_results(result_queue, processes, timeout=WORKER_TIMEOUT):
+    """
+    Chờ kết quả của mọi worker, lỗi ngay khi có worker chết
+
+    Worker bị kill (ví dụ OOM) không gửi được gì vào result_queue, nên thay vì
+    chờ đến timeout, mỗi POLL_INTERVAL kiểm tra exitcode của các worker.
+
+    Returns:
+        Dict {rank: kết quả của run_worker}
+    """
+    results = {}
+    exited = set()
+    deadline = time.monotonic() + timeout
+    while len(results) < len(processes):
+        try:
+            status, rank, payload = result_queue.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            for rank, process in enumerate(processes):
+                if rank in results or process.exitcode is None:
+                    continue
+                # Exit 0: cho thêm một chu kỳ để đọc kết quả còn trong pipe
+                if process.exitcode != 0 or rank in exited:
+                    raise RuntimeError(
+                        f"Worker {rank} dừng (exit code {process.exitcode}) "
+                        f"mà không trả kết quả"
+                    )
+                exited.add(rank)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Worker không xong sau {timeout}s")
+            continue
+        if status == "error":
+            raise RuntimeError(f"Worker {rank} lỗi: {payload}")
+        results[rank] = payload
+    return results
+
+
+def start_tracker(n_workers, host_ip="127.0.0.1", port=0):
+    """Khởi động RabitTracker, trả về (tracker, env cho các worker)"""
+    tracker = RabitTracker(
+        host_ip=host_ip, n_workers=n_workers, port=port, sortby="task"
+    )
+    tracker.start(n_workers)
+    return tracker, tracker.worker_envs()
+
+
+def finish_model(model, result, n_workers, wall_time):
+    """Đưa kết quả của rank 0 vào HousePriceModel, lưu và trả về result"""
+    booster = xgb.Booster()
+    booster.load_model(bytearray(result["model_raw"]))
+    params = result["params"]
+    model.model = model._wrap_booster(booster, params)
+    model.feature_names = result["feature_names"]
+    model.category_maps = None
+    train_result = model._finish_training(
+        result["metrics"],
+        result["training_samples"],
+        params,
+        lineage_extra={"distributed_workers": n_workers},
+    )
+    train_result["distributed"] = {
+        "n_workers": n_workers,
+        "wall_time_s": round(wall_time, 3),
+        **result["timings"],
+    }
+    return train_result
+
+
+def train_distributed(
+    model,
+    data_path,
+    n_workers=2,
+    chunk_size=100_000,
+    max_bin=256,
+    params=None,
+    nthread=None,
+    host_ip="127.0.0.1",
+):
+    """
+    Train HousePriceModel trên local cluster n_workers process
+
+    Args:
+        model: HousePriceModel để lưu kết quả
+        data_path: File hoặc thư mục shard CSV/Parquet chưa preprocess
+        n_workers: Số worker process
+        chunk_size: Số dòng mỗi chunk khi đọc
+        max_bin: Số bin tối đa cho mỗi feature (hist)
+        params: Hyperparameters (tên theo XGBRegressor), mặc định XGB_PARAMS
+        nthread: Số thread mỗi worker, None = n_jobs của params (số CPU nếu
+            không đặt) chia cho n_workers
+        host_ip: Địa chỉ tracker lắng nghe
+    """
+    start = time.perf_counter()
+    tracker, tracker_env = start_tracker(n_workers, host_ip=host_ip)
+    print(f"Đang train phân tán với {n_workers} worker ({data_path})...")
+
+    # spawn thay vì fork để không kế thừa thread pool của XGBoost/uvicorn
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(
+            target=_worker_process,
+            args=(
+                result_queue,
+                data_path,
+                rank,
+                n_workers,
+                tracker_env,
+                chunk_size,
+                max_bin,
+                params,
+                nthread,
+            ),
+        )
+        for rank in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        result = collect_results(result_queue, processes)[0]
+        tracker.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    return finish_model(model, result, n_workers, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from model import HousePriceModel
+
+    parser = argparse.ArgumentParser(description="Train phân tán với XGBoost")
+    parser.add_argument("command", choices=["train", "tracker", "worker"])
+    parser.add_argument("data_path", nargs="?")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rank", type=int, default=0)
+    parser.add_argument("--host-ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--tracker-uri", default="127.0.0.1")
+    parser.add_argument("--tracker-port", type=int, default=9091)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--max-bin", type=int, default=256)
+    parser.add_argument("--nthread", type=int, default=None)
+    parser.add_argument("--model-path", default="models/house_price_model.pkl")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.command == "train":
+        HousePriceModel(model_path=args.model_path).train(
+            data_path=args.data_path,
+            distributed_workers=args.workers,
+            chunk_size=args.chunk_size,
+            max_bin=args.max_bin,
+        )
+    elif args.command == "tracker":
+        tracker, env = start_tracker(args.workers, host_ip=args.host_ip, port=args.port)
+        print(f"Tracker đang chờ {args.workers} worker: {env}")
+        tracker.join()
+    else:
+        start = time.perf_counter()
+        tracker_env = {
+            "DMLC_TRACKER_URI": args.tracker_uri,
+            "DMLC_TRACKER_PORT": args.tracker_port,
+            "DMLC_NUM_WORKER": args.workers,
+        }
+        result = run_worker(
+            args.data_path,
+            args.rank,
+            args.workers,
+            tracker_env,
+            chunk_size=args.chunk_size,
+            max_bin=args.max_bin,
+            nthread=args.nthread,
+        )
+        if result is not None:
+            finish_model(
+                HousePriceModel(model_path=args.model_path),
+                result,
+                args.workers,
+                time.perf_counter() - start,
+            )
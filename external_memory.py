@@ -0,0 +1,364 @@
+"""
+Train out-of-core (external memory) cho dataset lớn hơn RAM
+
+Dữ liệu gốc (CSV/Parquet) được đọc theo từng chunk, preprocess bằng đúng
+preprocess_generic_data, rồi đưa vào XGBoost qua xgb.DataIter với cache trên
+đĩa. Tập holdout được chia bằng hash nội dung từng dòng nên không cần giữ
+toàn bộ dữ liệu trong bộ nhớ: bộ nhớ chỉ phụ thuộc vào chunk_size.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from model import XGB_PARAMS
+from train_with_real_data import (
+    GENERIC_FEATURE_SPEC,
+    detect_target_column,
+    preprocess_generic_data,
+    resolve_feature_spec,
+    spec_source_columns,
+)
+
+# Số dòng tối đa giữ lại để ước lượng median cho việc điền missing values
+MEDIAN_SAMPLE_ROWS = 200_000
+
+
+def list_data_files(data_path):
+    """Các file dữ liệu (CSV/Parquet) theo tên trong thư mục shard, hoặc chính file"""
+    if not os.path.isdir(data_path):
+        return [data_path]
+    return [
+        os.path.join(data_path, name)
+        for name in sorted(os.listdir(data_path))
+        if name.lower().endswith((".parquet", ".pq", ".csv"))
+    ]
+
+
+def iter_raw_chunks(data_path, chunk_size):
+    """
+    Đọc file CSV hoặc Parquet theo từng chunk DataFrame
+
+    data_path cũng có thể là thư mục shard (output của
+    create_large_dataset.generate_sharded_dataset): các file được đọc lần lượt
+    theo tên.
+    """
+    if os.path.isdir(data_path):
+        for path in list_data_files(data_path):
+            yield from iter_raw_chunks(path, chunk_size)
+        return
+    if data_path.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(data_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(data_path, chunksize=chunk_size)
+
+
+def holdout_mask(chunk, test_size=0.2):
+    """
+    Chia train/test bằng hash nội dung từng dòng
+
+    Cùng một dòng luôn rơi vào cùng một tập, không phụ thuộc chunk_size hay
+    thứ tự đọc.
+    """
+    row_hash = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    return (row_hash % 1000) < int(test_size * 1000)
+
+
+def scan_dataset(
+    data_path,
+    chunk_size,
+    target_column=None,
+    seed=42,
+    max_rows=None,
+    return_sample=False,
+):
+    """
+    Duyệt dữ liệu một lượt để tìm cột target và ước lượng median các cột số
+    mà preprocessing sẽ dùng
+
+    Median được tính trên một mẫu ngẫu nhiên đều tối đa MEDIAN_SAMPLE_ROWS
+    dòng (giữ các dòng có key ngẫu nhiên nhỏ nhất qua các chunk). max_rows
+    giới hạn số dòng đầu tiên được duyệt (n_rows khi đó chỉ là số dòng đã
+    duyệt).
+
+    Returns:
+        (target_column, fill_values, n_rows), thêm mẫu (DataFrame các cột
+        nguồn và target) nếu return_sample=True
+    """
+    rng = np.random.default_rng(seed)
+    source_columns = None
+    sample = None
+    n_rows = 0
+
+    for chunk in iter_raw_chunks(data_path, chunk_size):
+        if target_column is None:
+            target_column = detect_target_column(list(chunk.columns))
+        if source_columns is None:
+            feature_columns = [c for c in chunk.columns if c != target_column]
+            resolved = resolve_feature_spec(GENERIC_FEATURE_SPEC, feature_columns)
+            source_columns = spec_source_columns(resolved)
+        rows = chunk[source_columns + [target_column]]
+        rows = rows.assign(_sample_key=rng.random(len(rows)))
+        sample = rows if sample is None else pd.concat([sample, rows])
+        sample = sample.nsmallest(MEDIAN_SAMPLE_ROWS, "_sample_key")
+        n_rows += len(chunk)
+        if max_rows is not None and n_rows >= max_rows:
+            break
+
+    if sample is None:
+        raise ValueError(f"File dữ liệu rỗng: {data_path}")
+
+    sample = sample.drop(columns="_sample_key")
+    fill_values = sample[source_columns].select_dtypes(include=[np.number]).median()
+    if return_sample:
+        return target_column, fill_values, n_rows, sample
+    return target_column, fill_values, n_rows
+
+
+def fit_sample_transformer(sample, target_column, fill_values):
+    """
+    Fit FeatureTransformer trên mẫu của scan_dataset
+
+    Returns:
+        (X float32 của mẫu, y float32, FeatureTransformer)
+    """
+    processed, transformer = preprocess_generic_data(
+        sample,
+        target_column=target_column,
+        fill_values=fill_values,
+        verbose=False,
+        return_transformer=True,
+    )
+    return (
+        processed.iloc[:, :-1].to_numpy(dtype=np.float32),
+        processed.iloc[:, -1].to_numpy(dtype=np.float32),
+        transformer,
+    )
+
+
+def iter_processed_chunks(
+    data_path, chunk_size, target_column, fill_values, transformer=None
+):
+    """
+    Đọc và preprocess từng chunk
+
+    Yields:
+        (X float32, y float32, is_test mask, feature_names)
+    """
+    for chunk in iter_raw_chunks(data_path, chunk_size):
+        yield process_chunk(chunk, target_column, fill_values, transformer)
+
+
+def process_chunk(chunk, target_column, fill_values, transformer=None):
+    """
+    Chia holdout và preprocess một chunk dữ liệu gốc
+
+    Args:
+        transformer: FeatureTransformer đã fit (fit_sample_transformer) để mọi
+            chunk được tính giống hệt nhau và giống lúc serving. None để
+            preprocess từng chunk với fill_values
+
+    Returns:
+        (X float32, y float32, is_test mask, feature_names)
+    """
+    is_test = holdout_mask(chunk)
+    if transformer is not None:
+        return (
+            transformer.transform(chunk).astype(np.float32),
+            chunk[target_column].to_numpy(dtype=np.float32),
+            is_test,
+            list(transformer.features),
+        )
+    processed = preprocess_generic_data(
+        chunk, target_column=target_column, fill_values=fill_values, verbose=False
+    )
+    X = processed.iloc[:, :-1]
+    y = processed.iloc[:, -1]
+    return (
+        X.to_numpy(dtype=np.float32),
+        y.to_numpy(dtype=np.float32),
+        is_test,
+        X.columns.tolist(),
+    )
+
+
+class ChunkDataIter(xgb.DataIter):
+    """
+    xgb.DataIter đọc phần train của từng chunk cho external memory DMatrix
+    """
+
+    def __init__(
+        self,
+        data_path,
+        chunk_size,
+        target_column,
+        fill_values,
+        cache_dir,
+        transformer=None,
+    ):
+        self.data_path = data_path
+        self.chunk_size = chunk_size
+        self.target_column = target_column
+        self.fill_values = fill_values
+        self.transformer = transformer
+        self.feature_names = None
+        self.n_rows = 0
+        self._chunks = None
+        super().__init__(cache_prefix=os.path.join(cache_dir, "dtrain"))
+
+    def reset(self):
+        self._chunks = None
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_processed_chunks(
+                self.data_path,
+                self.chunk_size,
+                self.target_column,
+                self.fill_values,
+                self.transformer,
+            )
+            self.n_rows = 0
+
+        for X, y, is_test, feature_names in self._chunks:
+            self.feature_names = feature_names
+            train_rows = ~is_test
+            if not train_rows.any():
+                continue
+            input_data(data=X[train_rows], label=y[train_rows])
+            self.n_rows += int(train_rows.sum())
+            return 1
+        return 0
+
+
+def error_sums(y_true, y_pred):
+    """
+    Các tổng cần để tính metrics theo kiểu streaming/phân tán:
+    [n, sum err², sum |err|, sum y, sum y²]
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    err = y_true - np.asarray(y_pred, dtype=np.float64)
+    return np.array(
+        [
+            len(y_true),
+            np.dot(err, err),
+            np.abs(err).sum(),
+            y_true.sum(),
+            np.dot(y_true, y_true),
+        ]
+    )
+
+
+def metrics_from_sums(sums):
+    """RMSE/MAE/R²/MSE từ tổng của error_sums (cộng qua các chunk/worker)"""
+    n, sum_sq_err, sum_abs_err, sum_y, sum_y_sq = (float(v) for v in sums)
+    if n == 0:
+        raise ValueError("Tập holdout rỗng, dataset quá nhỏ")
+
+    mse = sum_sq_err / n
+    ss_tot = sum_y_sq - sum_y * sum_y / n
+    return {
+        "rmse": float(np.sqrt(mse)),
+        "mae": sum_abs_err / n,
+        "r2_score": float(1 - sum_sq_err / ss_tot) if ss_tot > 0 else 0.0,
+        "mse": mse,
+    }
+
+
+def evaluate_holdout(
+    model, data_path, chunk_size, target_column, fill_values, transformer=None
+):
+    """Tính RMSE/MAE/R² trên tập holdout theo kiểu streaming"""
+    sums = np.zeros(5)
+    for X, y, is_test, _ in iter_processed_chunks(
+        data_path, chunk_size, target_column, fill_values, transformer
+    ):
+        if is_test.any():
+            sums += error_sums(y[is_test], model.predict(X[is_test]))
+    return metrics_from_sums(sums)
+
+
+def train_external_memory(
+    model,
+    data_path,
+    chunk_size=100_000,
+    max_bin=256,
+    target_column=None,
+    cache_dir=None,
+    params=None,
+    comps_index=True,
+):
+    """
+    Train HousePriceModel out-of-core từ file dữ liệu gốc
+
+    FeatureTransformer được fit trên mẫu đều của lượt quét (tối đa
+    MEDIAN_SAMPLE_ROWS dòng) và dùng cho mọi chunk, lưu cùng model như train
+    in-memory. Histogram tham chiếu cho drift monitoring và index comps cũng
+    tạo từ mẫu này, vì toàn bộ dataset không nằm vừa trong RAM.
+
+    Args:
+        model: HousePriceModel để lưu kết quả
+        data_path: File CSV hoặc Parquet chưa preprocess
+        chunk_size: Số dòng mỗi chunk
+        max_bin: Số bin tối đa cho mỗi feature (hist)
+        target_column: Cột target, None để tự động phát hiện
+        cache_dir: Thư mục chứa cache external memory, mặc định là thư mục tạm
+        params: Hyperparameters (tên theo XGBRegressor), mặc định XGB_PARAMS
+        comps_index: Tạo index comps trên mẫu của lượt quét
+    """
+    print(f"Đang quét dataset {data_path} (chunk_size={chunk_size:,})...")
+    with model._stage("scan") as stage:
+        target_column, fill_values, n_rows, sample = scan_dataset(
+            data_path, chunk_size, target_column, return_sample=True
+        )
+        stage["rows"] = n_rows
+    print(f"✓ {n_rows:,} dòng, target: {target_column}")
+    with model._stage("fit_transformer", rows=len(sample)):
+        X_sample, y_sample, transformer = fit_sample_transformer(
+            sample, target_column, fill_values
+        )
+    del sample
+
+    own_cache_dir = cache_dir is None
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix="xgb_extmem_")
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        data_iter = ChunkDataIter(
+            data_path, chunk_size, target_column, fill_values, cache_dir, transformer
+        )
+        with model._stage("load") as stage:
+            # Đọc, preprocess từng chunk và ghi cache external memory
+            dtrain = xgb.DMatrix(data_iter)
+            stage["rows"] = data_iter.n_rows
+        params = dict(params or XGB_PARAMS, tree_method="hist", max_bin=max_bin)
+        with model._stage("fit", rows=data_iter.n_rows) as stage:
+            callback = model.instrumentation.fit_callback()
+            model.model = model._fit_booster(dtrain, params, callbacks=[callback])
+            stage["rounds"] = callback.summary()
+        model.feature_names = data_iter.feature_names
+        model.transformer = transformer
+        training_samples = data_iter.n_rows
+        del dtrain
+    finally:
+        if own_cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    with model._stage("evaluate", rows=n_rows - training_samples):
+        metrics = evaluate_holdout(
+            model.model, data_path, chunk_size, target_column, fill_values, transformer
+        )
+    return model._finish_training(
+        metrics,
+        training_samples,
+        params,
+        reference_X=X_sample,
+        comps_data=(X_sample, y_sample) if comps_index else None,
+    )
@@ -0,0 +1,246 @@
+"""
+Preprocessing đã fit, dùng giống hệt nhau khi train, batch_score và /predict
+
+FeatureTransformer giữ lại những gì preprocess_generic_data /
+preprocess_ames_data học được trên dữ liệu train:
+- rule đã resolve của từng feature (cột nguồn + tên phép tính trong
+  DERIVATIONS, hoặc giá trị mặc định)
+- median điền missing của các cột nguồn số
+- bảng mã của các cột nguồn chuỗi (sorted, giống LabelEncoder)
+- median của từng feature đầu ra trên tập train
+
+Transformer chỉ gồm dict, số và chuỗi (phép tính tham chiếu theo tên) nên
+được pickle cùng model.
+
+transform() nhận DataFrame, dict hoặc list dict. Với mỗi tập cột đầu vào, kế
+hoạch tính được compile một lần rồi cache, mỗi lần gọi chỉ còn các phép NumPy
+trên cả cột:
+- Có đủ cột nguồn của rule lúc train (file dữ liệu gốc): tính như lúc train
+- Có cột trùng tên feature (form, file đã preprocess): lấy thẳng
+- Còn lại: median của feature trên tập train
+Giá trị thiếu ở đầu ra (None/NaN, category chưa gặp) được điền bằng median
+của feature đó trên tập train.
+"""
+
+import numpy as np
+import pandas as pd
+
+SQFT_TO_M2 = 0.0929
+
+
+def _identity(x):
+    return x
+
+
+def _full_half_bath(full, half):
+    return full + half * 0.5
+
+
+def _floors_from_2nd_floor(second_floor_sf):
+    return (second_floor_sf > 0).astype(int) + 1
+
+
+def _quality_to_score(quality):
+    return quality / 10.0  # Scale từ 1-10
+
+
+def _sqft_to_m2(sqft):
+    return sqft * SQFT_TO_M2
+
+
+def _sum_sqft_to_m2(*sqft):
+    return sum(sqft) * SQFT_TO_M2
+
+
+# Tên phép tính (dùng trong spec và lưu trong transformer) -> hàm vectorized
+DERIVATIONS = {
+    "identity": _identity,
+    "full_half_bath": _full_half_bath,
+    "floors_from_2nd_floor": _floors_from_2nd_floor,
+    "quality_to_score": _quality_to_score,
+    "sqft_to_m2": _sqft_to_m2,
+    "sum_sqft_to_m2": _sum_sqft_to_m2,
+}
+
+
+class FeatureTransformer:
+    """
+    Preprocessing đã fit: dữ liệu gốc hoặc dict từ form -> ma trận features
+
+    Args:
+        rules: Dict feature -> (tuple cột nguồn, tên phép tính) hoặc
+            ((), giá trị mặc định), theo thứ tự features đầu ra
+        source_fill: Dict cột nguồn số -> giá trị điền missing
+        category_maps: Dict cột nguồn chuỗi -> {giá trị: mã}
+        feature_fill: Dict feature -> giá trị điền khi đầu ra bị thiếu
+    """
+
+    def __init__(self, rules, source_fill, category_maps, feature_fill):
+        self.rules = dict(rules)
+        self.features = list(self.rules)
+        self.source_fill = source_fill
+        self.category_maps = category_maps
+        self.feature_fill = feature_fill
+        self._setup()
+
+    def _setup(self):
+        self._fill = np.array(
+            [self.feature_fill.get(f, np.nan) for f in self.features],
+            dtype=np.float64,
+        )
+        # Chỉ các cột này ảnh hưởng tới kế hoạch tính
+        self._relevant = set(self.features)
+        for source_cols, _ in self.rules.values():
+            self._relevant.update(source_cols)
+        # Tập cột đầu vào -> kế hoạch đã compile
+        self._plans = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ("_fill", "_relevant", "_plans"):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    @classmethod
+    def fit_transform(cls, df, resolved, fill_values=None):
+        """
+        Fit transformer trên dữ liệu train và trả về features đã tính
+
+        Args:
+            df: DataFrame dữ liệu gốc
+            resolved: Spec đã resolve (resolve_feature_spec), theo thứ tự
+                features đầu ra
+            fill_values: Giá trị điền missing cho các cột số (Series/dict
+                theo tên cột). None để dùng median của chính df
+
+        Returns:
+            (FeatureTransformer, numpy array features float64)
+        """
+        source_fill = {}
+        category_maps = {}
+        for source_cols, _ in resolved.values():
+            for col in source_cols:
+                if col in source_fill or col in category_maps:
+                    continue
+                series = df[col]
+                if pd.api.types.is_numeric_dtype(series):
+                    if fill_values is not None and col in fill_values:
+                        source_fill[col] = float(fill_values[col])
+                    else:
+                        source_fill[col] = float(np.nanmedian(series.to_numpy()))
+                else:
+                    categories = np.unique(series.astype(str).to_numpy())
+                    category_maps[col] = {
+                        value: code for code, value in enumerate(categories)
+                    }
+
+        # Feature không có cột nguồn nhận giá trị mặc định của spec
+        defaults = {
+            feature: float(default)
+            for feature, (source_cols, default) in resolved.items()
+            if not source_cols
+        }
+        transformer = cls(resolved, source_fill, category_maps, defaults)
+        X = transformer.transform(df)
+        transformer.feature_fill = {
+            feature: float(value)
+            for feature, value in zip(transformer.features, np.nanmedian(X, axis=0))
+        }
+        transformer._setup()
+        return transformer, X
+
+    def compile(self, columns):
+        """
+        Kế hoạch tính features cho một tập cột đầu vào (cache theo tập cột)
+
+        Returns:
+            List (vị trí feature, tuple cột đầu vào, hàm tính hoặc None) cho
+            các feature tính được; feature còn lại lấy median lúc train
+        """
+        key = frozenset(c for c in columns if c in self._relevant)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = []
+            for j, feature in enumerate(self.features):
+                source_cols, derivation = self.rules[feature]
+                if source_cols and all(c in key for c in source_cols):
+                    plan.append((j, source_cols, DERIVATIONS[derivation]))
+                elif feature in key:
+                    plan.append((j, (feature,), None))
+            self._plans[key] = plan
+        return plan
+
+    def _source(self, col, values):
+        """Cột nguồn đã encode (chuỗi) và điền missing (số), float64"""
+        mapping = self.category_maps.get(col)
+        if mapping is not None:
+            # Tra bảng mã trên các giá trị khác nhau rồi bung lại theo dòng
+            uniques, inverse = np.unique(
+                np.asarray(values).astype(str), return_inverse=True
+            )
+            codes = np.array([mapping.get(u, np.nan) for u in uniques])
+            return codes[inverse].astype(np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        fill = self.source_fill.get(col)
+        if fill is not None:
+            missing = np.isnan(values)
+            if missing.any():
+                values = np.where(missing, fill, values)
+        return values
+
+    def transform(self, data):
+        """
+        Tính ma trận features (cột theo self.features)
+
+        Args:
+            data: DataFrame, dict (một căn nhà) hoặc list dict
+
+        Returns:
+            numpy array float64, mỗi dòng một căn nhà
+        """
+        if isinstance(data, pd.DataFrame):
+            n_rows = len(data)
+            plan = self.compile(data.columns)
+
+            def column(col):
+                return data[col].to_numpy()
+
+        else:
+            records = [data] if isinstance(data, dict) else data
+            n_rows = len(records)
+            columns = records[0].keys() if n_rows == 1 else set().union(*records)
+            plan = self.compile(columns)
+
+            def column(col):
+                return [record.get(col) for record in records]
+
+        X = np.empty((n_rows, len(self.features)), dtype=np.float64)
+        computed = np.zeros(len(self.features), dtype=bool)
+        for j, source_cols, fn in plan:
+            if fn is None:
+                X[:, j] = np.asarray(column(source_cols[0]), dtype=np.float64)
+            else:
+                X[:, j] = fn(*(self._source(c, column(c)) for c in source_cols))
+            computed[j] = True
+        X[:, ~computed] = self._fill[~computed]
+
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self._fill, X)
+        return X
+
+    def summary(self):
+        """Rule và giá trị điền của từng feature (cho /model/info)"""
+        return {
+            feature: {
+                "source_columns": list(source_cols),
+                "derivation": derivation if source_cols else None,
+                "default": None if source_cols else derivation,
+                "fill_value": self.feature_fill.get(feature),
+            }
+            for feature, (source_cols, derivation) in self.rules.items()
+        }
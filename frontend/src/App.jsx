@@ -26,6 +26,7 @@ function App() {
   
   // State cho map
   const [mapPosition, setMapPosition] = useState([10.762622, 106.660172]); // Mặc định TP.HCM
+  const [mapPicked, setMapPicked] = useState(false); // User đã click chọn vị trí trên bản đồ
   
   // State cho model info
   const [modelInfo, setModelInfo] = useState(null);
@@ -80,6 +81,9 @@ function App() {
           ? parseFloat(formData.location_score)
           : null,
         location: formData.location || null,  // Gửi địa chỉ lên API
+        // Tọa độ được server tra quận trong gazetteer offline
+        lat: mapPicked ? mapPosition[0] : null,
+        lng: mapPicked ? mapPosition[1] : null,
       };
 
       const response = await predictPrice(houseData);
@@ -276,6 +280,7 @@ function App() {
                 position={mapPosition}
                 onPositionChange={(pos) => {
                   setMapPosition(pos);
+                  setMapPicked(true);
                 }}
                 onLocationNameChange={(name) => {
                   setFormData((prev) => ({
@@ -0,0 +1,188 @@
+"""
+Gazetteer offline: tra quận/huyện từ tọa độ (lat/lng) không cần dịch vụ ngoài
+
+File gazetteer (JSON) chứa tâm các quận/huyện kèm location_score và premium.
+Mỗi tọa độ thuộc quận có tâm gần nhất (trong max_distance_km). Để tra nhanh,
+vùng bao được chia thành lưới ô đều; mỗi ô lưu sẵn vài quận ứng viên (những
+quận có thể gần nhất với một điểm bất kỳ trong ô), nên mỗi lần tra chỉ tính
+khoảng cách tới vài ứng viên thay vì mọi quận.
+
+Ví dụ:
+    gazetteer = get_gazetteer()
+    gazetteer.resolve(10.7769, 106.7009)  # {"name": "Quận 1", ...}
+"""
+
+import json
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_GAZETTEER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "gazetteer_hcmc.json"
+)
+
+# Kích thước ô lưới (độ, ~550m) và số kết quả tra cứu được cache
+CELL_DEGREES = 0.005
+CACHE_SIZE = 4096
+
+# Km trên một độ vĩ độ
+KM_PER_DEGREE = 111.32
+
+
+class Gazetteer:
+    """
+    Chỉ mục không gian các quận/huyện
+
+    Args:
+        districts: List dict (name, lat, lng, location_score, premium)
+        max_distance_km: Xa tâm quận gần nhất hơn khoảng này thì coi như ngoài vùng
+        cell_degrees: Kích thước ô lưới chỉ mục
+    """
+
+    def __init__(self, districts, max_distance_km=15, cell_degrees=CELL_DEGREES):
+        self.districts = districts
+        self.max_distance_km = max_distance_km
+        self.cell_degrees = cell_degrees
+        self._names = [d["name"] for d in districts]
+        self._scores = np.array([d["location_score"] for d in districts], dtype=float)
+        self._premiums = np.array([d["premium"] for d in districts], dtype=float)
+
+        lats = np.array([d["lat"] for d in districts], dtype=float)
+        lngs = np.array([d["lng"] for d in districts], dtype=float)
+        # Chiếu phẳng (equirectangular) quanh vĩ độ trung bình, đủ chính xác
+        # trong phạm vi một thành phố
+        self._lng_scale = math.cos(math.radians(float(lats.mean()))) * KM_PER_DEGREE
+        self._x = lngs * self._lng_scale
+        self._y = lats * KM_PER_DEGREE
+
+        # Đệm vùng bao đủ max_distance_km theo cả hai chiều
+        pad = max_distance_km / self._lng_scale
+        self._lat0 = float(lats.min()) - pad
+        self._lng0 = float(lngs.min()) - pad
+        self._n_lat = int((lats.max() + pad - self._lat0) / cell_degrees) + 1
+        self._n_lng = int((lngs.max() + pad - self._lng0) / cell_degrees) + 1
+        self._candidates = self._build_candidates()
+        self._candidate_lists = [
+            [int(i) for i in row if i >= 0] for row in self._candidates
+        ]
+        self.resolve = lru_cache(maxsize=CACHE_SIZE)(self._resolve)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_GAZETTEER_PATH, **kwargs):
+        """Đọc gazetteer từ file JSON"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        kwargs.setdefault("max_distance_km", data.get("max_distance_km", 15))
+        return cls(data["districts"], **kwargs)
+
+    def _build_candidates(self):
+        """
+        Ứng viên của mỗi ô: các quận cách tâm ô không quá (khoảng cách tới quận
+        gần nhất + đường chéo ô), padding -1
+        """
+        rows, cols = np.meshgrid(
+            np.arange(self._n_lat), np.arange(self._n_lng), indexing="ij"
+        )
+        center_y = (
+            self._lat0 + (rows.ravel() + 0.5) * self.cell_degrees
+        ) * KM_PER_DEGREE
+        center_x = (self._lng0 + (cols.ravel() + 0.5) * self.cell_degrees) * (
+            self._lng_scale
+        )
+        distances = np.hypot(
+            center_x[:, None] - self._x[None, :], center_y[:, None] - self._y[None, :]
+        )
+        diagonal = math.hypot(
+            self.cell_degrees * KM_PER_DEGREE, self.cell_degrees * self._lng_scale
+        )
+        nearest = distances.min(axis=1, keepdims=True)
+        is_candidate = distances <= nearest + diagonal
+        # Ô nằm hẳn ngoài vùng thì không có ứng viên
+        is_candidate &= nearest <= self.max_distance_km + diagonal
+
+        width = max(1, int(is_candidate.sum(axis=1).max()))
+        order = np.argsort(np.where(is_candidate, distances, np.inf), axis=1)
+        candidates = order[:, :width]
+        valid = np.take_along_axis(is_candidate, candidates, axis=1)
+        return np.where(valid, candidates, -1).astype(np.int16)
+
+    def _cell(self, lat, lng):
+        row = math.floor((lat - self._lat0) / self.cell_degrees)
+        col = math.floor((lng - self._lng0) / self.cell_degrees)
+        if 0 <= row < self._n_lat and 0 <= col < self._n_lng:
+            return row * self._n_lng + col
+        return None
+
+    def _resolve(self, lat, lng):
+        """
+        Quận chứa tọa độ
+
+        Returns:
+            Dict (name, location_score, premium, distance_km) hoặc None nếu
+            ngoài vùng của gazetteer
+        """
+        cell = self._cell(lat, lng)
+        if cell is None:
+            return None
+        x = lng * self._lng_scale
+        y = lat * KM_PER_DEGREE
+        best, best_distance = None, self.max_distance_km
+        for i in self._candidate_lists[cell]:
+            distance = math.hypot(x - self._x[i], y - self._y[i])
+            if distance <= best_distance:
+                best, best_distance = i, distance
+        if best is None:
+            return None
+        return {
+            "name": self._names[best],
+            "location_score": float(self._scores[best]),
+            "premium": float(self._premiums[best]),
+            "distance_km": round(best_distance, 3),
+        }
+
+    def resolve_batch(self, lats, lngs):
+        """
+        Tra nhiều tọa độ cùng lúc (vectorized)
+
+        Returns:
+            Dict các mảng: index (-1 nếu ngoài vùng), location_score, premium
+            (NaN nếu ngoài vùng)
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        rows = np.floor((lats - self._lat0) / self.cell_degrees)
+        cols = np.floor((lngs - self._lng0) / self.cell_degrees)
+        inside = (rows >= 0) & (rows < self._n_lat) & (cols >= 0) & (cols < self._n_lng)
+        cells = np.where(inside, rows * self._n_lng + cols, 0).astype(np.int64)
+
+        candidates = self._candidates[cells].astype(np.int64)
+        safe = np.maximum(candidates, 0)
+        distances = np.hypot(
+            lngs[:, None] * self._lng_scale - self._x[safe],
+            lats[:, None] * KM_PER_DEGREE - self._y[safe],
+        )
+        distances[candidates < 0] = np.inf
+        best = distances.argmin(axis=1)
+        best_distance = distances[np.arange(len(best)), best]
+        index = candidates[np.arange(len(best)), best]
+        found = inside & (best_distance <= self.max_distance_km)
+        index = np.where(found, index, -1)
+        return {
+            "index": index,
+            "location_score": np.where(found, self._scores[index], np.nan),
+            "premium": np.where(found, self._premiums[index], np.nan),
+        }
+
+    def name(self, index):
+        """Tên quận theo index trả về từ resolve_batch"""
+        return self._names[index]
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer(path=None):
+    """Gazetteer dùng chung (file từ GAZETTEER_PATH hoặc gazetteer_hcmc.json)"""
+    return Gazetteer.from_file(
+        path or os.environ.get("GAZETTEER_PATH", DEFAULT_GAZETTEER_PATH)
+    )
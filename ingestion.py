@@ -0,0 +1,252 @@
+"""
+Đọc và preprocess dataset có cache
+
+- Chỉ đọc các cột cần cho preprocessing, với dtype gọn (float32 cho cột số)
+  và parser nhanh (pyarrow nếu có)
+- Kết quả sau preprocess được cache dạng Parquet (hoặc pickle nếu không có
+  pyarrow), key theo hash nội dung file gốc, loại dataset và
+  PREPROCESSING_VERSION. Train lại trên cùng file sẽ bỏ qua bước parse
+- DataFrame trả về được đưa thẳng vào HousePriceModel.train, không ghi ra
+  CSV rồi đọc lại
+- FeatureTransformer đã fit (dataset ames/generic) được cache cùng dữ liệu
+  để truyền cho HousePriceModel.train và lưu cùng model
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import TrainingInstrumentation
+from train_with_real_data import (
+    AMES_FEATURE_SPEC,
+    GENERIC_FEATURE_SPEC,
+    detect_target_column,
+    preprocess_ames_data,
+    preprocess_california_housing,
+    preprocess_full_features,
+    preprocess_generic_data,
+    resolve_feature_spec,
+    spec_source_columns,
+)
+
+# Tăng khi thay đổi logic preprocessing để cache cũ tự hết hiệu lực
+PREPROCESSING_VERSION = 3
+
+DEFAULT_CACHE_DIR = "data/cache"
+
+# Số dòng đọc thử để đoán kiểu dữ liệu của các cột
+_SCHEMA_SAMPLE_ROWS = 1000
+
+
+def file_hash(path, block_size=1 << 20):
+    """Hash nội dung file (blake2b), đọc theo block để không tốn bộ nhớ"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def detect_dataset_type(data_path, dataset_type="auto"):
+    """Xác định loại dataset theo tên file, giống train_with_dataset"""
+    if dataset_type != "auto":
+        return dataset_type
+    lower = data_path.lower()
+    if "train.csv" in lower or "ames" in lower:
+        return "ames"
+    if "california" in lower:
+        return "california"
+    return "generic"
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_typed_csv(data_path, dataset_type="generic", target_column=None):
+    """
+    Đọc CSV chỉ với các cột cần dùng và dtype gọn
+
+    Returns:
+        (DataFrame, target_column)
+    """
+    sample = pd.read_csv(data_path, nrows=_SCHEMA_SAMPLE_ROWS)
+    columns = list(sample.columns)
+
+    if dataset_type == "ames":
+        if "SalePrice" not in columns:
+            raise ValueError("Không tìm thấy cột SalePrice trong dataset")
+        target_column = "SalePrice"
+        feature_columns = [c for c in columns if c != target_column]
+        resolved = resolve_feature_spec(AMES_FEATURE_SPEC, feature_columns)
+        usecols = spec_source_columns(resolved) + [target_column]
+    elif dataset_type == "california":
+        # preprocess_california_housing dùng toàn bộ các cột
+        usecols = columns
+    elif dataset_type == "full":
+        if target_column is None:
+            if "SalePrice" in columns:
+                target_column = "SalePrice"
+            else:
+                target_column = detect_target_column(columns)
+        usecols = columns
+    else:
+        target_column = target_column or detect_target_column(columns)
+        feature_columns = [c for c in columns if c != target_column]
+        resolved = resolve_feature_spec(GENERIC_FEATURE_SPEC, feature_columns)
+        usecols = spec_source_columns(resolved) + [target_column]
+
+    # Cột chuỗi giữ kiểu object để preprocessing label encode như cũ, riêng
+    # chế độ full đọc thẳng thành category (native categorical)
+    dtypes = {}
+    for col in usecols:
+        if col == target_column:
+            dtypes[col] = np.float64
+        elif pd.api.types.is_numeric_dtype(sample[col]):
+            dtypes[col] = np.float32
+        elif dataset_type == "full":
+            dtypes[col] = "category"
+
+    engine = "pyarrow" if _has_pyarrow() else "c"
+    df = pd.read_csv(data_path, usecols=usecols, dtype=dtypes, engine=engine)
+    return df, target_column
+
+
+def _cache_paths(cache_dir, key):
+    extension = "parquet" if _has_pyarrow() else "pkl"
+    return os.path.join(cache_dir, f"{key}.{extension}")
+
+
+def _read_cache(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _transformer_cache_path(cache_path):
+    return os.path.splitext(cache_path)[0] + "_transformer.pkl"
+
+
+def _temp_path(path):
+    """
+    File tạm riêng cho mỗi lần ghi, cùng thư mục với path để os.replace là
+    atomic (nhiều worker API có thể ingest cùng một file cùng lúc)
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    os.close(fd)
+    return tmp_path
+
+
+def _replace_atomic(path, write):
+    """Ghi bằng write(tmp_path) vào file tạm rồi rename thành path"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = _temp_path(path)
+    try:
+        write(tmp_path)
+        # Rename để process khác không đọc phải cache dở dang
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_cache(df, path):
+    if path.endswith(".parquet"):
+        _replace_atomic(path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+    else:
+        _replace_atomic(path, df.to_pickle)
+
+
+def _write_transformer(transformer, path):
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            pickle.dump(transformer, f)
+
+    _replace_atomic(path, write)
+
+
+def load_processed(
+    data_path,
+    dataset_type="auto",
+    target_column=None,
+    cache_dir=DEFAULT_CACHE_DIR,
+    use_cache=True,
+    instrumentation=None,
+    return_transformer=False,
+):
+    """
+    Đọc dataset gốc và trả về DataFrame đã preprocess (cột cuối là target)
+
+    Args:
+        data_path: File CSV gốc
+        dataset_type: "auto", "ames", "california", "generic" hoặc "full"
+        target_column: Cột target cho dataset generic, None để tự phát hiện
+        cache_dir: Thư mục lưu cache
+        use_cache: Đọc/ghi cache
+        instrumentation: TrainingInstrumentation để đo các bước load,
+            preprocess, cache_write (None để bỏ qua)
+        return_transformer: Trả về thêm FeatureTransformer đã fit (None với
+            dataset california/full)
+
+    Returns:
+        DataFrame đã preprocess, hoặc (DataFrame, FeatureTransformer) nếu
+        return_transformer=True
+    """
+    instrumentation = instrumentation or TrainingInstrumentation()
+    dataset_type = detect_dataset_type(data_path, dataset_type)
+    key = (
+        f"{file_hash(data_path)}_{dataset_type}_{target_column or 'auto'}"
+        f"_v{PREPROCESSING_VERSION}"
+    )
+    cache_path = _cache_paths(cache_dir, key)
+    transformer_path = _transformer_cache_path(cache_path)
+
+    if use_cache and os.path.exists(cache_path):
+        with instrumentation.stage("load_cache") as stage:
+            df_processed = _read_cache(cache_path)
+            transformer = None
+            if os.path.exists(transformer_path):
+                with open(transformer_path, "rb") as f:
+                    transformer = pickle.load(f)
+            stage["rows"] = len(df_processed)
+        print(f"✓ Dùng dữ liệu đã xử lý từ cache: {cache_path}")
+        return (df_processed, transformer) if return_transformer else df_processed
+
+    with instrumentation.stage("load") as stage:
+        df, target_column = read_typed_csv(data_path, dataset_type, target_column)
+        stage["rows"] = len(df)
+    print(f"✓ Đọc thành công: {len(df)} mẫu, {df.shape[1]} cột cần dùng")
+
+    transformer = None
+    with instrumentation.stage("preprocess", rows=len(df)):
+        if dataset_type == "ames":
+            df_processed, transformer = preprocess_ames_data(df)
+        elif dataset_type == "california":
+            df_processed = preprocess_california_housing(df)
+        elif dataset_type == "full":
+            df_processed = preprocess_full_features(df, target_column=target_column)
+        else:
+            df_processed, transformer = preprocess_generic_data(
+                df, target_column=target_column, return_transformer=True
+            )
+
+    if use_cache:
+        with instrumentation.stage("cache_write", rows=len(df_processed)):
+            if transformer is not None:
+                # Ghi transformer trước: cache dữ liệu có nghĩa là đã đủ cả hai
+                _write_transformer(transformer, transformer_path)
+            _write_cache(df_processed, cache_path)
+        print(f"✓ Đã cache dữ liệu đã xử lý tại: {cache_path}")
+
+    return (df_processed, transformer) if return_transformer else df_processed
@@ -0,0 +1,198 @@
+"""
+Đo thời gian, bộ nhớ và số dòng của từng bước train
+
+Mỗi bước (load, preprocess, cache_write, split, fit, evaluate, save, ...) được
+ghi lại thành một dict và log ra một dòng JSON (logger "house_price.training"),
+để thấy bước nào chậm khi chạy production. Bước fit có thêm thời gian từng
+boosting round qua callback của XGBoost.
+
+Ví dụ:
+    instrumentation = TrainingInstrumentation()
+    with instrumentation.stage("load") as stage:
+        df = pd.read_csv(path)
+        stage["rows"] = len(df)
+    instrumentation.report()
+"""
+
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import xgboost as xgb
+
+logger = logging.getLogger("house_price.training")
+
+# Log tiến độ fit mỗi LOG_EVERY_ROUNDS round
+LOG_EVERY_ROUNDS = 50
+
+
+def _read_status_mb(field):
+    """Đọc VmRSS/VmHWM trong /proc/self/status (MB), None nếu không có /proc"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Reset VmHWM (Linux >= 4.0) để đo peak riêng cho từng bước"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def configure_logging(stream=None):
+    """
+    In log train ra stream (mặc định stdout), mỗi record một dòng JSON
+
+    Gọi từ entry point (app, các CLI train); import module không đổi cấu hình
+    logging của ứng dụng. Gọi nhiều lần chỉ gắn một handler.
+    """
+    if logger.handlers:
+        return
+    # Không phụ thuộc cấu hình logging của uvicorn
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def log_event(event, **fields):
+    """Ghi một structured log (JSON một dòng)"""
+    logger.info(json.dumps({"event": event, **fields}, default=str))
+
+
+class RoundTimingCallback(xgb.callback.TrainingCallback):
+    """Callback XGBoost đo thời gian từng boosting round"""
+
+    def __init__(self, run_id=None, stage_name="fit"):
+        super().__init__()
+        self.run_id = run_id
+        self.stage_name = stage_name
+        self.round_times = []
+        self._round_start = None
+
+    def before_iteration(self, model, epoch, evals_log):
+        self._round_start = time.perf_counter()
+        return False
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.round_times.append(time.perf_counter() - self._round_start)
+        if (epoch + 1) % LOG_EVERY_ROUNDS == 0:
+            log_event(
+                "train_round",
+                run_id=self.run_id,
+                stage=self.stage_name,
+                round=epoch + 1,
+                round_s=round(self.round_times[-1], 4),
+                elapsed_s=round(sum(self.round_times), 3),
+            )
+        return False
+
+    def summary(self):
+        """Tóm tắt thời gian các round (tổng, trung bình, p50, p95, chậm nhất)"""
+        if not self.round_times:
+            return {"n_rounds": 0}
+        times = np.asarray(self.round_times)
+        return {
+            "n_rounds": len(times),
+            "total_s": round(float(times.sum()), 4),
+            "mean_s": round(float(times.mean()), 5),
+            "p50_s": round(float(np.percentile(times, 50)), 5),
+            "p95_s": round(float(np.percentile(times, 95)), 5),
+            "max_s": round(float(times.max()), 5),
+            "slowest_round": int(times.argmax()) + 1,
+        }
+
+
+class TrainingInstrumentation:
+    """
+    Ghi lại các bước của một lần train
+
+    Args:
+        run_id: Định danh lần train, gắn vào mọi log (mặc định theo thời gian)
+    """
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id or time.strftime("%Y%m%d_%H%M%S")
+        self.stages = []
+        # Peak đã thấy của từng bước đang mở (ngoài cùng trước), vì bước con
+        # reset VmHWM của cả process
+        self._open_peaks = []
+
+    def _fold_peak(self, peak_mb):
+        """Gộp peak vừa đo vào mọi bước đang mở"""
+        if peak_mb is None:
+            return
+        self._open_peaks = [
+            peak_mb if seen is None else max(seen, peak_mb) for seen in self._open_peaks
+        ]
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Đo một bước; có thể gán stage["rows"] hoặc thêm trường khác bên trong
+        khối with
+        """
+        record = {"stage": name, "rows": rows}
+        rss_before = _read_status_mb("VmRSS")
+        # Peak từ lần reset trước thuộc về các bước cha, gộp lại trước khi reset
+        self._fold_peak(_read_status_mb("VmHWM"))
+        peak_reset = _reset_peak_rss()
+        self._open_peaks.append(None)
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield record
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            record["duration_s"] = round(time.perf_counter() - start, 4)
+            rss_after = _read_status_mb("VmRSS")
+            inner_peak = self._open_peaks.pop()
+            # Không reset được peak thì VmHWM là peak từ lúc process khởi động
+            peak = _read_status_mb("VmHWM") if peak_reset else rss_after
+            if peak_reset and peak is not None:
+                # Bước con đã reset VmHWM giữa chừng: lấy max với peak của chúng
+                peak = max(peak, inner_peak or 0)
+                self._fold_peak(peak)
+            if rss_after is not None:
+                record["rss_mb"] = round(rss_after, 1)
+                record["rss_delta_mb"] = round(rss_after - rss_before, 1)
+                record["peak_rss_mb"] = round(peak, 1)
+            record["status"] = status
+            self.stages.append(record)
+            log_event("train_stage", run_id=self.run_id, **record)
+
+    def fit_callback(self):
+        """Callback đo thời gian từng round cho bước fit"""
+        return RoundTimingCallback(run_id=self.run_id)
+
+    def stage_times(self):
+        """Dict tên bước -> tổng thời gian (giây)"""
+        times = {}
+        for record in self.stages:
+            times[record["stage"]] = (
+                times.get(record["stage"], 0.0) + record["duration_s"]
+            )
+        return times
+
+    def report(self):
+        """Kết quả để trả về trong TrainResponse.performance"""
+        return {
+            "run_id": self.run_id,
+            "total_s": round(sum(r["duration_s"] for r in self.stages), 4),
+            "stages": self.stages,
+        }
@@ -8,6 +8,57 @@ import xgboost as xgb
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
 
+from comps import build_comps_index, load_comps_index
+from instrumentation import TrainingInstrumentation
+from monitoring import DriftMonitor, build_reference
+from prediction_grid import load_prediction_grid
+
+# Hyperparameters mặc định (tên theo XGBRegressor)
+XGB_PARAMS = {
+    "n_estimators": 300,  # Tăng số cây
+    "max_depth": 8,  # Tăng độ sâu
+    "learning_rate": 0.05,  # Giảm learning rate để học chậm hơn, chính xác hơn
+    "min_child_weight": 3,  # Regularization
+    "subsample": 0.8,  # Subsampling để tránh overfitting
+    "colsample_bytree": 0.8,  # Feature sampling
+    "gamma": 0.1,  # Minimum loss reduction
+    "reg_alpha": 0.1,  # L1 regularization
+    "reg_lambda": 1.0,  # L2 regularization
+    "random_state": 42,
+    "objective": "reg:squarederror",
+    "n_jobs": -1,  # Sử dụng tất cả CPU cores
+}
+
+# Tham số chỉ dùng khi dựng DMatrix, không truyền vào xgb.train
+_DMATRIX_PARAM_NAMES = {"enable_categorical", "feature_types"}
+
+# Tên tham số XGBRegressor -> tên tham số của xgb.train
+_NATIVE_PARAM_NAMES = {
+    "learning_rate": "eta",
+    "reg_alpha": "alpha",
+    "reg_lambda": "lambda",
+    "random_state": "seed",
+    "n_jobs": "nthread",
+}
+
+
+def booster_params(params):
+    """
+    Chuyển hyperparameters kiểu XGBRegressor sang params cho xgb.train
+
+    Returns:
+        (params cho xgb.train, num_boost_round)
+    """
+    native = {}
+    for key, value in params.items():
+        if key == "n_estimators" or key in _DMATRIX_PARAM_NAMES:
+            continue
+        if key == "n_jobs" and value is not None and value < 0:
+            # xgb.train dùng nthread=0 để lấy tất cả CPU cores
+            value = 0
+        native[_NATIVE_PARAM_NAMES.get(key, key)] = value
+    return native, params.get("n_estimators", 100)
+
 
 class HousePriceModel:
     def __init__(self, model_path="models/house_price_model.pkl"):
@@ -18,8 +69,48 @@ class HousePriceModel:
         self.version = None
         self.trained_at = None
         self.training_samples = None
-
-    def train(self, data_path=None, X=None, y=None):
+        self.hyperparameters = None
+        self.lineage = None
+        # Cột categorical -> {giá trị: mã} để encode O(1) khi serving
+        self.category_maps = None
+        # Thời gian, bộ nhớ, số dòng từng bước của lần train gần nhất
+        self.instrumentation = None
+        # Lưới dự đoán tính sẵn (prediction_grid.py), chỉ dùng khi đúng version
+        self.prediction_grid = None
+        # Histogram tham chiếu của dữ liệu train và histogram trực tuyến của
+        # các request (monitoring.py)
+        self.drift_reference = None
+        self.drift_monitor = None
+        # Kết quả hai giai đoạn preview/full khi train progressive
+        self.progressive = None
+        # Index các căn nhà train để tìm comps (comps.py)
+        self.comps_index = None
+        # Preprocessing đã fit lúc train (feature_transformer.py), dùng để
+        # tính features khi serving; None thì map bằng _map_features
+        self.transformer = None
+
+    def train(
+        self,
+        data_path=None,
+        X=None,
+        y=None,
+        quantile_dmatrix=False,
+        max_bin=256,
+        external_memory=False,
+        chunk_size=100_000,
+        params=None,
+        tune=None,
+        n_trials=20,
+        tune_workers=None,
+        incremental=None,
+        incremental_rounds=50,
+        instrumentation=None,
+        distributed_workers=None,
+        progressive=None,
+        preview_fraction=0.1,
+        comps_index=True,
+        transformer=None,
+    ):
         """
         Train XGBoost model cho dự đoán giá nhà
 
@@ -27,83 +118,483 @@ class HousePriceModel:
             data_path: Đường dẫn đến file CSV chứa dữ liệu
             X: Features (numpy array hoặc pandas DataFrame)
             y: Target values (numpy array hoặc pandas Series)
+            quantile_dmatrix: Train bằng QuantileDMatrix (float32, tree_method
+                "hist") thay vì đưa float64 dense vào XGBRegressor.fit.
+                Tiết kiệm bộ nhớ và thời gian với dataset lớn
+            max_bin: Số bin tối đa cho mỗi feature (hist)
+            external_memory: Train out-of-core cho dataset lớn hơn RAM.
+                data_path là file dữ liệu gốc (CSV/Parquet), được đọc và
+                preprocess theo từng chunk, xem external_memory.py
+            chunk_size: Số dòng mỗi chunk khi external_memory=True
+            params: Hyperparameters (tên theo XGBRegressor) ghi đè XGB_PARAMS
+            tune: Tìm hyperparameters song song trước khi train,
+                "random" hoặc "halving" (successive halving), xem tuning.py
+            n_trials: Số bộ hyperparameters thử khi tune
+            tune_workers: Số process chạy song song khi tune, None = số thread
+                n_jobs của params (ngân sách thread chia cho các process)
+            incremental: Train tiếp từ booster hiện tại trên dữ liệu mới thay vì
+                train lại từ đầu. "append" thêm incremental_rounds cây mới,
+                "refresh" giữ cấu trúc cây và cập nhật lại giá trị lá
+            incremental_rounds: Số cây thêm vào khi incremental="append"
+            instrumentation: TrainingInstrumentation dùng chung với các bước
+                trước khi train (đọc, preprocess), None để tạo mới
+            distributed_workers: Train data-parallel trên local cluster gồm
+                số worker process này (collective của XGBoost). data_path là
+                file hoặc thư mục shard dữ liệu gốc, xem distributed.py
+            progressive: Train hai giai đoạn, xem progressive.py. "preview"
+                fit nhanh trên mẫu phân tầng theo giá và lưu ngay, "full" fit
+                trên toàn bộ dữ liệu và chỉ thay preview nếu holdout tốt hơn
+            preview_fraction: Tỉ lệ tập train dùng cho preview
+            comps_index: Tạo index các căn nhà train để tìm comps (train
+                in-memory, hoặc mẫu của lượt quét với external_memory), lưu
+                cạnh file model, xem comps.py
+            transformer: FeatureTransformer đã tạo ra X (load_processed,
+                preprocess_*), lưu cùng model để predict/batch_score tính
+                features giống hệt lúc train
+
+        Nếu X là DataFrame có cột chuỗi/category, các cột đó được train bằng
+        native categorical của XGBoost; bảng mã category lưu cùng model.
+
+        Thời gian, peak memory và số dòng của từng bước (read, prepare, split,
+        fit, evaluate, save) được log dạng JSON và trả về trong
+        result["instrumentation"]; result["stage_times"] là thời gian từng bước.
         """
+        self.instrumentation = instrumentation or TrainingInstrumentation()
+
+        if incremental:
+            if self.model is None:
+                self.load()
+            return self._train_incremental(
+                data_path, X, y, incremental, incremental_rounds
+            )
+
+        params = dict(XGB_PARAMS, **(params or {}))
+        self.transformer = transformer
+        # Bảng mã category của lần train trước không áp dụng cho booster mới
+        # (external memory, distributed chỉ train trên cột số)
+        self.category_maps = None
+        if progressive != "full":
+            self.progressive = None
+
+        if distributed_workers:
+            from distributed import train_distributed
+
+            with self._stage("distributed_train") as stage:
+                result = train_distributed(
+                    self,
+                    data_path,
+                    n_workers=distributed_workers,
+                    chunk_size=chunk_size,
+                    max_bin=max_bin,
+                    params=params,
+                )
+                stage["rows"] = self.training_samples
+            result["instrumentation"] = self.instrumentation.report()
+            return result
+
+        if external_memory:
+            from external_memory import train_external_memory
+
+            return train_external_memory(
+                self,
+                data_path,
+                chunk_size=chunk_size,
+                max_bin=max_bin,
+                params=params,
+                comps_index=comps_index,
+            )
+
         if data_path:
-            df = pd.read_csv(data_path)
-            # Giả sử cột cuối cùng là target (giá nhà)
-            X = df.iloc[:, :-1]
-            y = df.iloc[:, -1]
+            with self._stage("read") as stage:
+                # Với quantile_dmatrix đọc thẳng float32 để tránh bản copy float64
+                df = pd.read_csv(
+                    data_path, dtype=np.float32 if quantile_dmatrix else None
+                )
+                stage["rows"] = len(df)
+                # Giả sử cột cuối cùng là target (giá nhà)
+                X = df.iloc[:, :-1]
+                y = df.iloc[:, -1]
+
+        with self._stage("prepare", rows=len(X)):
+            X, y, params = self._prepare_training_data(X, y, params, quantile_dmatrix)
+        if transformer is not None and transformer.features != self.feature_names:
+            raise ValueError(
+                f"Features của transformer {transformer.features} không khớp "
+                f"dữ liệu train {self.feature_names}"
+            )
+
+        if progressive:
+            from progressive import train_progressive
+
+            return train_progressive(
+                self,
+                X,
+                y,
+                progressive,
+                params,
+                fraction=preview_fraction,
+                comps_index=comps_index,
+            )
+
+        if tune:
+            if self.category_maps:
+                raise ValueError("tune chưa hỗ trợ dữ liệu có cột categorical")
+            from tuning import tune_hyperparameters
+
+            return tune_hyperparameters(
+                self,
+                X,
+                y,
+                strategy=tune,
+                n_trials=n_trials,
+                n_workers=tune_workers,
+                max_bin=max_bin,
+                params=params,
+            )
+
+        # Chia dữ liệu train/test
+        with self._stage("split", rows=len(X)):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42
+            )
+
+        with self._stage("fit", rows=len(X_train)) as stage:
+            callback = self.instrumentation.fit_callback()
+            if quantile_dmatrix:
+                # Lượng tử hoá trực tiếp từ float32, không qua DMatrix dense
+                dtrain = xgb.QuantileDMatrix(
+                    X_train,
+                    y_train,
+                    max_bin=max_bin,
+                    feature_types=params.get("feature_types"),
+                    enable_categorical=bool(self.category_maps),
+                )
+                params = dict(params, tree_method="hist", max_bin=max_bin)
+                self.model = self._fit_booster(dtrain, params, callbacks=[callback])
+                del dtrain
+            else:
+                # Tạo và train model với hyperparameters tốt hơn
+                self.model = xgb.XGBRegressor(**params, callbacks=[callback])
+                self.model.fit(X_train, y_train)
+                # Không pickle callback cùng model
+                self.model.set_params(callbacks=None)
+            stage["rounds"] = callback.summary()
+
+        # Đánh giá model
+        with self._stage("evaluate", rows=len(X_test)):
+            metrics = self._evaluate(self.model, X_test, y_test)
+
+        return self._finish_training(
+            metrics,
+            len(X_train),
+            params,
+            reference_X=X_train,
+            comps_data=(X_train, y_train) if comps_index else None,
+        )
+
+    def _prepare_training_data(self, X, y, params, quantile_dmatrix):
+        """
+        Encode cột categorical, lưu tên features và chuyển X, y sang numpy
+
+        Returns:
+            (X, y, params) với params đã thêm cấu hình native categorical nếu cần
+        """
+        # Cột chuỗi/category: encode bằng bảng mã và dùng native categorical
+        self.category_maps = None
+        if isinstance(X, pd.DataFrame):
+            categorical_cols = [
+                col for col in X.columns if not pd.api.types.is_numeric_dtype(X[col])
+            ]
+            if categorical_cols:
+                self.category_maps = self._build_category_maps(X[categorical_cols])
+                X = self._encode_categories(X)
+                params = dict(
+                    params,
+                    tree_method="hist",
+                    enable_categorical=True,
+                    feature_types=self._feature_types(X.columns),
+                )
 
         # Lưu tên các features
         if isinstance(X, pd.DataFrame):
             self.feature_names = X.columns.tolist()
-            X = X.values
+            X = X.to_numpy(dtype=np.float32) if quantile_dmatrix else X.values
         else:
             self.feature_names = [f"feature_{i}" for i in range(X.shape[1])]
+            if quantile_dmatrix:
+                X = np.asarray(X, dtype=np.float32)
 
         if isinstance(y, pd.Series):
             y = y.values
 
-        # Chia dữ liệu train/test
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+        return X, y, params
+
+    def _train_incremental(self, data_path, X, y, mode, incremental_rounds):
+        """
+        Train tiếp từ booster đã lưu trên dữ liệu mới
+
+        Dữ liệu mới được chia train/test giống train(); metrics tính trên phần
+        test của dữ liệu mới (ghi evaluated_on trong lineage), kèm RMSE của
+        model cũ trên cùng tập đó để so sánh. Nếu model cha có index comps,
+        index mới gồm các căn cũ và phần train của dữ liệu mới.
+        """
+        if mode not in ("append", "refresh"):
+            raise ValueError(f"incremental không hợp lệ: {mode}")
+
+        if data_path:
+            with self._stage("read") as stage:
+                df = pd.read_csv(data_path)
+                X = df.iloc[:, :-1]
+                y = df.iloc[:, -1]
+                stage["rows"] = len(df)
+
+        if isinstance(X, pd.DataFrame):
+            missing = set(self.feature_names) - set(X.columns)
+            if missing:
+                raise ValueError(f"Dữ liệu mới thiếu features: {sorted(missing)}")
+            X = self._encode_categories(X[self.feature_names]).values
+        elif X.shape[1] != len(self.feature_names):
+            raise ValueError(
+                f"Dữ liệu mới có {X.shape[1]} features, model cần "
+                f"{len(self.feature_names)}"
+            )
+
+        if isinstance(y, pd.Series):
+            y = y.values
+
+        with self._stage("split", rows=len(X)):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42
+            )
+
+        parent_model = self.model
+        with self._stage("evaluate_parent", rows=len(X_test)):
+            parent_metrics = self._evaluate(parent_model, X_test, y_test)
+        params = dict(self.hyperparameters or XGB_PARAMS)
+        booster = parent_model.get_booster()
+        dtrain = xgb.DMatrix(
+            X_train,
+            y_train,
+            feature_types=self._feature_types(self.feature_names),
+            enable_categorical=bool(self.category_maps),
         )
 
-        # Tạo và train model với hyperparameters tốt hơn
-        self.model = xgb.XGBRegressor(
-            n_estimators=300,  # Tăng số cây
-            max_depth=8,  # Tăng độ sâu
-            learning_rate=0.05,  # Giảm learning rate để học chậm hơn, chính xác hơn
-            min_child_weight=3,  # Regularization
-            subsample=0.8,  # Subsampling để tránh overfitting
-            colsample_bytree=0.8,  # Feature sampling
-            gamma=0.1,  # Minimum loss reduction
-            reg_alpha=0.1,  # L1 regularization
-            reg_lambda=1.0,  # L2 regularization
-            random_state=42,
-            objective="reg:squarederror",
-            n_jobs=-1,  # Sử dụng tất cả CPU cores
+        if mode == "append":
+            # Thêm cây mới, bắt đầu từ dự đoán của booster hiện tại
+            new_params = dict(params, n_estimators=incremental_rounds)
+            native_params, num_boost_round = booster_params(new_params)
+        else:
+            # Giữ nguyên cấu trúc cây, chỉ tính lại giá trị lá trên dữ liệu mới
+            native_params, _ = booster_params(params)
+            native_params.update(
+                process_type="update", updater="refresh", refresh_leaf=True
+            )
+            num_boost_round = booster.num_boosted_rounds()
+
+        with self._stage("fit", rows=len(X_train)) as stage:
+            callback = self.instrumentation.fit_callback()
+            booster = xgb.train(
+                native_params,
+                dtrain,
+                num_boost_round=num_boost_round,
+                xgb_model=booster,
+                verbose_eval=False,
+                callbacks=[callback],
+            )
+            params["n_estimators"] = booster.num_boosted_rounds()
+            self.model = self._wrap_booster(booster, params)
+            stage["rounds"] = callback.summary()
+
+        with self._stage("evaluate", rows=len(X_test)):
+            metrics = self._evaluate(self.model, X_test, y_test)
+        print(
+            f"Incremental ({mode}): RMSE trên dữ liệu mới "
+            f"{parent_metrics['rmse']:.2f} -> {metrics['rmse']:.2f}"
         )
 
-        self.model.fit(X_train, y_train)
+        # Index comps của model cha cộng thêm các căn mới, tạo lại cho version mới
+        comps_data = None
+        if self.comps_index is not None:
+            comps_data = (
+                np.concatenate(
+                    [self.comps_index.features, np.asarray(X_train, dtype=np.float32)]
+                ),
+                np.concatenate(
+                    [self.comps_index.prices, np.asarray(y_train, dtype=np.float32)]
+                ),
+            )
+        return self._finish_training(
+            metrics,
+            (self.training_samples or 0) + len(X_train),
+            params,
+            mode=f"incremental_{mode}",
+            lineage_extra={
+                "new_samples": len(X_train),
+                "parent_rmse_on_new_data": parent_metrics["rmse"],
+                # rmse của lần train này chỉ đo trên holdout của dữ liệu mới
+                "evaluated_on": "new_data_holdout",
+            },
+            comps_data=comps_data,
+        )
 
-        # Đánh giá model
-        y_pred = self.model.predict(X_test)
+    @staticmethod
+    def _build_category_maps(X_categorical):
+        """Bảng mã {giá trị: mã} cho từng cột categorical (category sorted)"""
+        category_maps = {}
+        for col in X_categorical.columns:
+            categories = X_categorical[col].astype("category").cat.categories
+            category_maps[col] = {value: code for code, value in enumerate(categories)}
+        return category_maps
+
+    def _encode_categories(self, X_df):
+        """
+        Đổi các cột categorical sang mã số bằng dict lookup
+
+        Giá trị không có trong bảng mã (chưa gặp khi train, thiếu) thành NaN,
+        XGBoost xử lý như missing.
+        """
+        if not self.category_maps:
+            return X_df
+        encoded = {
+            col: X_df[col].map(mapping).astype(np.float32)
+            for col, mapping in self.category_maps.items()
+            if col in X_df.columns
+        }
+        return X_df.assign(**encoded)
+
+    def _feature_types(self, columns):
+        """feature_types cho XGBoost: "c" cho cột categorical, "q" cho cột số"""
+        if not self.category_maps:
+            return None
+        return ["c" if col in self.category_maps else "q" for col in columns]
+
+    @staticmethod
+    def _evaluate(model, X_test, y_test):
+        """Tính RMSE/MAE/R²/MSE trên tập test"""
+        y_pred = model.predict(X_test)
         mse = mean_squared_error(y_test, y_pred)
-        rmse = np.sqrt(mse)
-        mae = mean_absolute_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
-
-        metrics = {
-            "rmse": float(rmse),
-            "mae": float(mae),
-            "r2_score": float(r2),
+        return {
+            "rmse": float(np.sqrt(mse)),
+            "mae": float(mean_absolute_error(y_test, y_pred)),
+            "r2_score": float(r2_score(y_test, y_pred)),
             "mse": float(mse),
         }
 
-        # Lưu thông tin training
+    def _finish_training(
+        self,
+        metrics,
+        training_samples,
+        params,
+        mode="full",
+        lineage_extra=None,
+        reference_X=None,
+        comps_data=None,
+    ):
+        """
+        Lưu thông tin training, in kết quả và lưu model
+
+        Lineage ghi lại chuỗi các lần train: train đầy đủ bắt đầu lineage mới,
+        train incremental nối thêm vào lineage của model cha. Nếu có
+        reference_X (dữ liệu train đã encode), histogram tham chiếu cho drift
+        monitoring được tính lại từ đó; train incremental giữ tham chiếu cũ.
+        comps_data (X, y đã encode) dùng để tạo index comps cho version mới.
+        """
+        parent_version = self.version if mode != "full" else None
         self.metrics = metrics
+        self.hyperparameters = params
         self.version = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.trained_at = datetime.now().isoformat()
-        self.training_samples = len(X_train)
+        self.training_samples = training_samples
+        # Lưới dự đoán và index comps của version cũ không còn đúng
+        self.prediction_grid = None
+        self.comps_index = None
+        if reference_X is not None:
+            with self._stage("drift_reference", rows=len(reference_X)):
+                self.drift_reference = build_reference(
+                    reference_X, self.model.predict, self.feature_names
+                )
+        elif mode == "full":
+            self.drift_reference = None
+        self._reset_drift_monitor()
+        if comps_data is not None:
+            with self._stage("comps_index", rows=len(comps_data[0])):
+                build_comps_index(self, *comps_data)
+
+        lineage_entry = {
+            "version": self.version,
+            "parent_version": parent_version,
+            "mode": mode,
+            "trained_at": self.trained_at,
+            "training_samples": training_samples,
+            "n_trees": self.model.get_booster().num_boosted_rounds(),
+            "rmse": metrics["rmse"],
+            **(lineage_extra or {}),
+        }
+        previous = (self.lineage or []) if mode != "full" else []
+        self.lineage = previous + [lineage_entry]
 
         print("Model Performance:")
-        print(f"RMSE: {rmse:.2f}")
-        print(f"MAE: {mae:.2f}")
-        print(f"R2 Score: {r2:.4f}")
+        print(f"RMSE: {metrics['rmse']:.2f}")
+        print(f"MAE: {metrics['mae']:.2f}")
+        print(f"R2 Score: {metrics['r2_score']:.4f}")
         print(f"Version: {self.version}")
 
         # Lưu model
-        self.save()
+        with self._stage("save"):
+            self.save()
+
+        return {
+            "model": self.model,
+            "metrics": metrics,
+            "stage_times": self.instrumentation.stage_times(),
+            "instrumentation": self.instrumentation.report(),
+        }
 
-        return {"model": self.model, "metrics": metrics}
+    def _reset_drift_monitor(self):
+        """Bắt đầu histogram trực tuyến mới cho version model hiện tại"""
+        self.drift_monitor = (
+            DriftMonitor(self.drift_reference, model_version=self.version)
+            if self.drift_reference
+            else None
+        )
+
+    def _stage(self, name, rows=None):
+        """Đo một bước train (thời gian, peak memory, số dòng)"""
+        if self.instrumentation is None:
+            self.instrumentation = TrainingInstrumentation()
+        return self.instrumentation.stage(name, rows=rows)
+
+    def _fit_booster(self, dtrain, params, evals=(), **train_kwargs):
+        """
+        Train booster bằng xgb.train và bọc lại thành XGBRegressor
+
+        Model lưu ra vẫn là XGBRegressor như khi train bằng .fit(), nên
+        predict/save/load không cần phân biệt hai cách train.
+        """
+        native_params, num_boost_round = booster_params(params)
+        booster = xgb.train(
+            native_params,
+            dtrain,
+            num_boost_round=num_boost_round,
+            evals=list(evals),
+            verbose_eval=False,
+            **train_kwargs,
+        )
+        return self._wrap_booster(booster, params)
+
+    @staticmethod
+    def _wrap_booster(booster, params):
+        """Bọc Booster thành XGBRegressor với hyperparameters tương ứng"""
+        regressor = xgb.XGBRegressor(**params)
+        regressor.load_model(booster.save_raw(raw_format="ubj"))
+        return regressor
 
     def predict(self, X):
         """
         Dự đoán giá nhà
 
         Args:
-            X: Features (numpy array, pandas DataFrame, hoặc dict)
+            X: Features (numpy array, pandas DataFrame, dict hoặc list các dict)
 
         Returns:
             Giá nhà dự đoán
@@ -113,13 +604,49 @@ class HousePriceModel:
 
         # Chuyển đổi input
         if isinstance(X, dict):
-            # Mapping features từ form sang features của model
-            X_mapped = self._map_features(X)
-            # Tạo DataFrame với đúng thứ tự features của model
-            X_df = pd.DataFrame([X_mapped])
-            # Đảm bảo có đủ features theo thứ tự của model
-            X_df = X_df.reindex(columns=self.feature_names, fill_value=0)
-            X = X_df.values
+            if self.transformer is not None:
+                # Preprocessing đã fit lúc train
+                X = self.transformer.transform(X)
+                X_mapped = dict(zip(self.feature_names, X[0].tolist()))
+            else:
+                # Mapping features từ form sang features của model
+                X_mapped = self._map_features(X)
+                X = None
+            if self.prediction_grid is not None:
+                # Tra lưới O(1), ngoài lưới thì dự đoán bằng model
+                value = self.prediction_grid.lookup(X_mapped)
+                if value is not None:
+                    if self.drift_monitor is not None:
+                        self.drift_monitor.update(
+                            [X_mapped.get(f) for f in self.feature_names], value
+                        )
+                    return value
+            if X is None:
+                # Tạo DataFrame với đúng thứ tự features của model
+                X_df = pd.DataFrame([X_mapped])
+                # Đảm bảo có đủ features theo thứ tự của model
+                X_df = X_df.reindex(columns=self.feature_names, fill_value=0)
+                X = self._encode_categories(X_df).values
+            value = float(self.model.predict(X)[0])
+            if self.drift_monitor is not None:
+                self.drift_monitor.update(X[0], value)
+            return value
+        elif isinstance(X, list) and not X:
+            # Batch rỗng (ví dụ /predict/batch không có căn nào)
+            return []
+        elif isinstance(X, list) and isinstance(X[0], dict):
+            # Batch các dict từ form: map từng dict rồi dự đoán trong một lần
+            X = self.encode_features(X)
+            if self.prediction_grid is not None:
+                prediction = self.prediction_grid.lookup_batch(X)
+                off_grid = np.isnan(prediction)
+                if off_grid.any():
+                    prediction[off_grid] = self.model.predict(X[off_grid])
+            else:
+                prediction = self.model.predict(X)
+            if self.drift_monitor is not None:
+                self.drift_monitor.update_batch(X, prediction)
+            return float(prediction[0]) if len(prediction) == 1 else prediction.tolist()
         elif isinstance(X, list):
             X = np.array(X)
             if len(X.shape) == 1:
@@ -127,11 +654,41 @@ class HousePriceModel:
         elif isinstance(X, pd.DataFrame):
             # Đảm bảo có đủ features
             X = X.reindex(columns=self.feature_names, fill_value=0)
-            X = X.values
+            X = self._encode_categories(X).values
 
         prediction = self.model.predict(X)
         return float(prediction[0]) if len(prediction) == 1 else prediction.tolist()
 
+    def record_prediction(self, features_dict, prediction):
+        """
+        Ghi nhận vào drift monitor một dự đoán không đi qua predict (ví dụ lấy
+        từ cache dùng chung), để histogram vẫn tính mọi request
+        """
+        if self.drift_monitor is None:
+            return
+        if self.transformer is not None:
+            row = self.transformer.transform(features_dict)[0]
+        else:
+            mapped = self._map_features(features_dict)
+            row = [mapped.get(f) for f in self.feature_names]
+        self.drift_monitor.update(row, prediction)
+
+    def encode_features(self, features_list):
+        """
+        Map và encode các dict từ form thành ma trận features của model
+        (bằng transformer lúc train nếu model có)
+
+        Returns:
+            numpy array, cột theo feature_names
+        """
+        if self.model is None:
+            self.load()
+        if self.transformer is not None:
+            return self.transformer.transform(features_list)
+        X_df = pd.DataFrame([self._map_features(x) for x in features_list])
+        X_df = X_df.reindex(columns=self.feature_names, fill_value=0)
+        return self._encode_categories(X_df).values
+
     def _map_features(self, features_dict):
         """
         Map features từ form (area, bedrooms, etc.) sang features của model đã train
@@ -212,6 +769,12 @@ class HousePriceModel:
                     "version": self.version,
                     "trained_at": self.trained_at,
                     "training_samples": self.training_samples,
+                    "hyperparameters": self.hyperparameters,
+                    "lineage": self.lineage,
+                    "category_maps": self.category_maps,
+                    "drift_reference": self.drift_reference,
+                    "progressive": self.progressive,
+                    "transformer": self.transformer,
                 },
                 f,
             )
@@ -230,7 +793,16 @@ class HousePriceModel:
             self.version = data.get("version")
             self.trained_at = data.get("trained_at")
             self.training_samples = data.get("training_samples")
+            self.hyperparameters = data.get("hyperparameters")
+            self.lineage = data.get("lineage")
+            self.category_maps = data.get("category_maps")
+            self.drift_reference = data.get("drift_reference")
+            self.progressive = data.get("progressive")
+            self.transformer = data.get("transformer")
         print(f"Model loaded from {self.model_path}")
+        self.prediction_grid = load_prediction_grid(self)
+        self.comps_index = load_comps_index(self)
+        self._reset_drift_monitor()
 
     def get_feature_names(self):
         """Lấy danh sách tên các features"""
@@ -253,5 +825,23 @@ class HousePriceModel:
             "feature_count": len(self.feature_names) if self.feature_names else 0,
             "features": self.feature_names,
             "training_samples": self.training_samples,
+            "hyperparameters": self.hyperparameters,
+            "lineage": self.lineage,
+            "categorical_features": (
+                list(self.category_maps) if self.category_maps else []
+            ),
+            "prediction_grid": (
+                self.prediction_grid.metadata if self.prediction_grid else None
+            ),
+            "progressive": self.progressive,
+            "comps_index": (
+                {
+                    key: self.comps_index.metadata[key]
+                    for key in ("rows", "clusters", "size_mb", "build_s")
+                }
+                if self.comps_index
+                else None
+            ),
+            "preprocessing": self.transformer.summary() if self.transformer else None,
             "model_path": self.model_path,
         }
@@ -0,0 +1,191 @@
+"""
+Theo dõi drift của input /predict và giá dự đoán so với dữ liệu train
+
+Lúc train, mỗi feature (và giá dự đoán trên tập train) được tóm tắt thành một
+histogram cố định: biên bin là các quantile của dữ liệu train, thêm một bin
+cho giá trị thiếu. Histogram tham chiếu này lưu cùng model. Khi serving, mỗi
+request chỉ tăng bộ đếm của bin tương ứng (bisect trên vài chục biên, mảng đếm
+cấp phát sẵn), không giữ lại request nào, nên bộ nhớ không đổi theo lưu lượng.
+/monitoring/drift so sánh hai histogram bằng PSI, Jensen-Shannon và KS.
+"""
+
+import math
+from bisect import bisect_right
+
+import numpy as np
+
+# Số bin quantile mỗi feature và số dòng tối đa dùng để tính tham chiếu
+N_BINS = 20
+REFERENCE_SAMPLE_ROWS = 100_000
+
+# Ngưỡng PSI thường dùng: < 0.1 ổn định, 0.1 - 0.25 lệch vừa, > 0.25 lệch mạnh
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+# Dưới số request này PSI còn nhiễu do mẫu nhỏ, chưa kết luận drift
+MIN_OBSERVATIONS = 1000
+
+# Tránh log(0) khi bin trống
+_EPSILON = 1e-6
+
+
+def _edges(values, n_bins):
+    """Biên bin theo quantile (bỏ các biên trùng với feature ít giá trị)"""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return []
+    quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+    return np.unique(quantiles).tolist()
+
+
+def _histogram(values, edges):
+    """Số lượng mỗi bin, bin cuối là giá trị thiếu"""
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    bins = np.searchsorted(edges, values[~missing], side="right")
+    counts = np.bincount(bins, minlength=len(edges) + 1)
+    return np.append(counts, missing.sum()).astype(np.int64)
+
+
+def build_reference(X, predict, feature_names, n_bins=N_BINS, seed=42):
+    """
+    Histogram tham chiếu từ dữ liệu train (tối đa REFERENCE_SAMPLE_ROWS dòng)
+
+    Args:
+        X: Features đã encode (numpy array, cột theo feature_names)
+        predict: Hàm dự đoán của model, gọi trên các dòng được lấy mẫu
+        feature_names: Tên features
+        n_bins: Số bin quantile mỗi feature
+
+    Returns:
+        Dict (feature_names, edges, counts, prediction_edges,
+        prediction_counts, rows) để lưu cùng model
+    """
+    if len(X) > REFERENCE_SAMPLE_ROWS:
+        rows = np.random.default_rng(seed).choice(
+            len(X), REFERENCE_SAMPLE_ROWS, replace=False
+        )
+        X = X[np.sort(rows)]
+    X = np.asarray(X, dtype=np.float64)
+    predictions = np.asarray(predict(X), dtype=np.float64)
+
+    edges = [_edges(X[:, i], n_bins) for i in range(X.shape[1])]
+    prediction_edges = _edges(predictions, n_bins)
+    return {
+        "feature_names": list(feature_names),
+        "edges": edges,
+        "counts": [_histogram(X[:, i], e).tolist() for i, e in enumerate(edges)],
+        "prediction_edges": prediction_edges,
+        "prediction_counts": _histogram(predictions, prediction_edges).tolist(),
+        "rows": len(X),
+    }
+
+
+def distribution_distances(reference_counts, live_counts):
+    """PSI, Jensen-Shannon distance và KS (trên CDF theo bin) giữa hai histogram"""
+    p = np.asarray(reference_counts, dtype=np.float64)
+    q = np.asarray(live_counts, dtype=np.float64)
+    p = p / max(p.sum(), 1)
+    q = q / max(q.sum(), 1)
+    p_smooth = np.maximum(p, _EPSILON)
+    q_smooth = np.maximum(q, _EPSILON)
+    psi = float(np.sum((q_smooth - p_smooth) * np.log(q_smooth / p_smooth)))
+
+    m = (p + q) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kl_pm = np.nansum(np.where(p > 0, p * np.log2(p / m), 0))
+        kl_qm = np.nansum(np.where(q > 0, q * np.log2(q / m), 0))
+    js = math.sqrt(max(0.0, (kl_pm + kl_qm) / 2))
+
+    # Bin giá trị thiếu không có thứ tự nên không tính vào KS
+    ks = float(np.max(np.abs(np.cumsum(p[:-1]) - np.cumsum(q[:-1]))))
+    return {"psi": round(psi, 4), "js_distance": round(js, 4), "ks": round(ks, 4)}
+
+
+def _status(psi, observations):
+    if observations < MIN_OBSERVATIONS:
+        return "insufficient_data"
+    if psi >= PSI_ALERT:
+        return "drift"
+    if psi >= PSI_WARNING:
+        return "warning"
+    return "ok"
+
+
+class DriftMonitor:
+    """
+    Histogram trực tuyến của input và giá dự đoán, cùng biên bin với tham chiếu
+
+    Args:
+        reference: Dict trả về từ build_reference (lưu trong model)
+        model_version: Version model của tham chiếu
+    """
+
+    def __init__(self, reference, model_version=None):
+        self.reference = reference
+        self.model_version = model_version
+        self.feature_names = reference["feature_names"]
+        self._edges = reference["edges"]
+        self._prediction_edges = reference["prediction_edges"]
+        # Mỗi feature có len(edges) + 1 bin giá trị và một bin giá trị thiếu
+        n_bins = [len(e) + 1 for e in self._edges]
+        # List Python thay vì numpy: tăng một phần tử list nhanh hơn nhiều so
+        # với truy cập từng phần tử numpy trong đường đi của mỗi request
+        self.counts = [[0] * (n + 1) for n in n_bins]
+        self.prediction_counts = [0] * (len(self._prediction_edges) + 2)
+        self.observations = 0
+
+    def update(self, row, prediction):
+        """
+        Ghi nhận một request
+
+        Args:
+            row: Giá trị features đã encode, theo thứ tự feature_names
+            prediction: Giá dự đoán (trước hậu xử lý)
+        """
+        for counts, edges, value in zip(self.counts, self._edges, row):
+            if value is None or value != value:  # None hoặc NaN
+                counts[-1] += 1
+            else:
+                counts[bisect_right(edges, value)] += 1
+        self.prediction_counts[bisect_right(self._prediction_edges, prediction)] += 1
+        self.observations += 1
+
+    def update_batch(self, X, predictions):
+        """
+        Ghi nhận nhiều request (X đã encode, cột theo feature_names)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        for i, edges in enumerate(self._edges):
+            for b, count in enumerate(_histogram(X[:, i], edges).tolist()):
+                self.counts[i][b] += count
+        histogram = _histogram(predictions, self._prediction_edges).tolist()
+        for b, count in enumerate(histogram):
+            self.prediction_counts[b] += count
+        self.observations += len(X)
+
+    def report(self):
+        """
+        Khoảng cách phân phối của từng feature và giá dự đoán so với tham chiếu
+        """
+        features = {}
+        for i, name in enumerate(self.feature_names):
+            distances = distribution_distances(
+                self.reference["counts"][i], self.counts[i]
+            )
+            distances["status"] = _status(distances["psi"], self.observations)
+            features[name] = distances
+
+        prediction = distribution_distances(
+            self.reference["prediction_counts"], self.prediction_counts
+        )
+        prediction["status"] = _status(prediction["psi"], self.observations)
+        drifted = [name for name, d in features.items() if d["status"] == "drift"]
+        return {
+            "model_version": self.model_version,
+            "observations": self.observations,
+            "reference_rows": self.reference["rows"],
+            "features": features,
+            "prediction": prediction,
+            "drifted_features": drifted,
+        }
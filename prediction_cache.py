@@ -0,0 +1,203 @@
+"""
+Cache kết quả /predict dùng chung giữa các worker uvicorn trên cùng máy
+
+Bảng băm kích thước cố định trong một file, mọi worker mở bằng mmap
+(MAP_SHARED) nên kết quả một worker tính xong thì worker khác đọc được ngay,
+và vẫn còn sau khi worker (hoặc cả server) khởi động lại.
+
+- Bảng gồm n_buckets bucket, mỗi bucket WAYS slot SLOT_SIZE byte. Key
+  (blake2b 16 byte của version model + input) chọn bucket, tìm trong WAYS
+  slot của bucket đó
+- Đọc không lock: mỗi slot có bộ đếm seq (seqlock), writer tăng lên số lẻ
+  trước khi ghi và số chẵn sau khi ghi xong; reader bỏ qua slot đang ghi
+  hoặc đã bị ghi đè trong lúc đọc, payload có thêm crc32
+- Ghi lock riêng từng bucket (fcntl byte-range lock, tự nhả nếu worker chết)
+- Bucket đầy thì thay slot lâu không dùng nhất (thời điểm ghi, được cập nhật
+  tối đa mỗi TOUCH_INTERVAL giây khi đọc trúng): bộ nhớ không vượt quá kích
+  thước file
+- Version model nằm trong key nên model mới không đọc nhầm kết quả cũ, các
+  entry cũ tự bị thay dần
+
+Mọi worker phải dùng cùng max_entries (tên file gồm số slot, nên cấu hình
+khác nhau dùng file khác nhau).
+"""
+
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+
+DEFAULT_CACHE_DIR = "data/cache"
+DEFAULT_MAX_ENTRIES = 65536
+# Số slot mỗi bucket và kích thước một slot
+WAYS = 8
+SLOT_SIZE = 256
+# Khoảng thời gian tối thiểu giữa hai lần cập nhật thời điểm dùng của một slot
+TOUCH_INTERVAL = 1.0
+
+_MAGIC = b"HPCACHE1"
+# magic, n_buckets, ways, slot_size
+_HEADER = struct.Struct("<8sIII")
+_HEADER_SIZE = 64
+# seq, key, thời điểm dùng, độ dài payload, crc32 payload
+_SLOT = struct.Struct("<Q16sdII")
+_SEQ = struct.Struct("<Q")
+_STAMP = struct.Struct("<d")
+_STAMP_OFFSET = 24
+MAX_PAYLOAD = SLOT_SIZE - _SLOT.size
+_EMPTY_KEY = bytes(16)
+
+
+class PredictionCache:
+    """
+    Cache dự đoán dùng chung giữa các process, lưu trong file mmap
+
+    Args:
+        directory: Thư mục chứa file cache
+        max_entries: Số kết quả tối đa (làm tròn xuống bội số của WAYS)
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        self.n_buckets = max(1, max_entries // WAYS)
+        self.capacity = self.n_buckets * WAYS
+        self.path = os.path.join(directory, f"predictions_{self.capacity}.cache")
+        self.size_bytes = _HEADER_SIZE + self.capacity * SLOT_SIZE
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.skipped = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        header = _HEADER.pack(_MAGIC, self.n_buckets, WAYS, SLOT_SIZE)
+        # Byte 0 của vùng lock dành cho khởi tạo, bucket b lock byte b + 1
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+        try:
+            current = os.pread(self._fd, _HEADER.size, 0)
+            if current != header or os.fstat(self._fd).st_size != self.size_bytes:
+                # File mới hoặc hỏng: tạo bảng rỗng
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size_bytes)
+                os.pwrite(self._fd, header, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+        self._mm = mmap.mmap(self._fd, self.size_bytes)
+
+    @staticmethod
+    def key(model_version, features):
+        """Key 16 byte của version model và input (dict JSON được)"""
+        data = json.dumps([model_version, features], sort_keys=True, default=str)
+        return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+    def _bucket(self, key):
+        return int.from_bytes(key[:8], "little") % self.n_buckets
+
+    def _slot_offsets(self, bucket):
+        base = _HEADER_SIZE + bucket * WAYS * SLOT_SIZE
+        return range(base, base + WAYS * SLOT_SIZE, SLOT_SIZE)
+
+    def get(self, key):
+        """
+        Giá trị đã lưu của key, None nếu không có (không lock)
+        """
+        mm = self._mm
+        for offset in self._slot_offsets(self._bucket(key)):
+            seq, slot_key, stamp, length, crc = _SLOT.unpack_from(mm, offset)
+            if slot_key != key or seq & 1:
+                continue
+            start = offset + _SLOT.size
+            payload = mm[start : start + length]
+            # Slot bị ghi đè trong lúc đọc thì coi như không có
+            if _SEQ.unpack_from(mm, offset)[0] != seq or zlib.crc32(payload) != crc:
+                break
+            now = time.time()
+            if now - stamp > TOUCH_INTERVAL:
+                _STAMP.pack_into(mm, offset + _STAMP_OFFSET, now)
+            self.hits += 1
+            return json.loads(payload)
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+        Lưu value (JSON được) cho key
+
+        Returns:
+            False nếu value quá lớn so với một slot (không lưu)
+        """
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        if len(payload) > MAX_PAYLOAD:
+            self.skipped += 1
+            return False
+
+        mm = self._mm
+        bucket = self._bucket(key)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, bucket + 1)
+        try:
+            target = None
+            oldest = None
+            for offset in self._slot_offsets(bucket):
+                _, slot_key, stamp, _, _ = _SLOT.unpack_from(mm, offset)
+                if slot_key == key or slot_key == _EMPTY_KEY:
+                    target = offset
+                    break
+                if oldest is None or stamp < oldest[0]:
+                    oldest = (stamp, offset)
+            if target is None:
+                target = oldest[1]
+                self.evictions += 1
+
+            # seq lẻ: reader bỏ qua slot trong lúc ghi (kể cả slot còn lẻ do
+            # writer trước chết giữa chừng)
+            seq = _SEQ.unpack_from(mm, target)[0]
+            seq = seq + 1 if seq % 2 == 0 else seq
+            _SEQ.pack_into(mm, target, seq)
+            start = target + _SLOT.size
+            mm[start : start + len(payload)] = payload
+            _SLOT.pack_into(
+                mm,
+                target,
+                seq,
+                key,
+                time.time(),
+                len(payload),
+                zlib.crc32(payload),
+            )
+            _SEQ.pack_into(mm, target, seq + 1)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, bucket + 1)
+        self.writes += 1
+        return True
+
+    def entries(self):
+        """Số slot đang có dữ liệu (quét toàn bảng)"""
+        return sum(
+            1
+            for offset in range(_HEADER_SIZE, self.size_bytes, SLOT_SIZE)
+            if self._mm[offset + 8 : offset + 24] != _EMPTY_KEY
+        )
+
+    def stats(self):
+        """Bộ đếm của worker này và số entry của bảng (cho /monitoring/cache)"""
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "capacity": self.capacity,
+            "entries": self.entries(),
+            "size_mb": round(self.size_bytes / 1024**2, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "skipped": self.skipped,
+        }
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
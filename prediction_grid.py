@@ -0,0 +1,363 @@
+"""
+Lưới dự đoán tính sẵn cho model 6 features của form
+
+Sau khi train, booster được đánh giá trên một lưới: bedrooms, bathrooms,
+floors là số nguyên; area, year_built và location_score được chia bin. Lưới
+lưu dạng .npy float32 (mở bằng memory map) kèm file .json mô tả các trục và
+version model. /predict tra lưới O(1): trục nguyên lấy đúng ô, trục liên tục
+nội suy tuyến tính giữa hai bin. Input nằm ngoài lưới (giá trị lẻ của trục
+nguyên, ngoài khoảng) hoặc lưới của model khác thì dùng model như cũ.
+
+Trước khi tính lưới, sai số nội suy được đo trên các điểm ngẫu nhiên (chỉ cần
+dự đoán tại các góc ô chứa mỗi điểm). Sai số vượt ngưỡng (max hoặc p99 tương
+đối) thì không tạo lưới và /predict tiếp tục dùng model.
+
+Chạy:
+    python prediction_grid.py --model-path models/house_price_model.pkl
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+# Thứ tự features của model 6 features (giống FEATURE_ORDER của form)
+GRID_FEATURES = [
+    "area",
+    "bedrooms",
+    "bathrooms",
+    "floors",
+    "year_built",
+    "location_score",
+]
+
+# Trục của lưới: feature -> (start, stop, step, nội suy hay không)
+DEFAULT_AXES = {
+    "area": (20.0, 500.0, 10.0, True),
+    "bedrooms": (1, 6, 1, False),
+    "bathrooms": (1, 4, 1, False),
+    "floors": (1, 4, 1, False),
+    "year_built": (1960, 2025, 5, True),
+    "location_score": (0.0, 10.0, 0.5, True),
+}
+
+# Số điểm ngẫu nhiên dùng để đo sai số nội suy so với dự đoán trực tiếp
+ERROR_SAMPLE_SIZE = 20_000
+# Sai số tương đối tối đa (max và p99) để lưới được dùng thay model
+MAX_REL_ERROR = 0.10
+MAX_P99_REL_ERROR = 0.05
+
+
+def grid_paths(model_path):
+    """Đường dẫn file lưới (.npy) và metadata (.json) cạnh file model"""
+    base = os.path.splitext(model_path)[0] + "_grid"
+    return base + ".npy", base + ".json"
+
+
+def _axis_values(start, stop, step):
+    n = int(round((stop - start) / step)) + 1
+    return start + step * np.arange(n)
+
+
+class PredictionGrid:
+    """
+    Lưới dự đoán đã tính sẵn (values là mảng memory-mapped)
+
+    Args:
+        values: Mảng float32, mỗi chiều là một trục theo GRID_FEATURES
+        axes: Dict feature -> (start, stop, step, interpolate)
+        metadata: Thông tin thêm (model_version, sai số, ...)
+    """
+
+    def __init__(self, values, axes, metadata=None):
+        self.values = values
+        self.axes = axes
+        self.metadata = metadata or {}
+        self._axes = [tuple(axes[f]) for f in GRID_FEATURES]
+
+    def lookup(self, features):
+        """
+        Dự đoán từ lưới cho một dict features (đã map theo model)
+
+        Returns:
+            Giá dự đoán, hoặc None nếu input nằm ngoài lưới
+        """
+        index = []
+        weights = []
+        for feature, (start, stop, step, interpolate) in zip(GRID_FEATURES, self._axes):
+            try:
+                value = float(features[feature])
+            except (KeyError, TypeError, ValueError):
+                return None
+            if not start <= value <= stop:
+                return None
+            position = (value - start) / step
+            if interpolate:
+                lower = min(int(position), self.values.shape[len(index)] - 2)
+                index.append(lower)
+                weights.append(position - lower)
+            else:
+                nearest = round(position)
+                if abs(position - nearest) > 1e-9:
+                    return None
+                index.append(nearest)
+                weights.append(None)
+
+        # Nội suy tuyến tính trên các trục liên tục (tối đa 4 ô với 2 trục)
+        result = 0.0
+        interp_axes = [i for i, w in enumerate(weights) if w is not None]
+        for corner in range(1 << len(interp_axes)):
+            cell = list(index)
+            weight = 1.0
+            for bit, axis in enumerate(interp_axes):
+                if corner >> bit & 1:
+                    cell[axis] += 1
+                    weight *= weights[axis]
+                else:
+                    weight *= 1 - weights[axis]
+            if weight:
+                result += weight * float(self.values[tuple(cell)])
+        return result
+
+    def lookup_batch(self, X):
+        """
+        Dự đoán từ lưới cho ma trận X (cột theo GRID_FEATURES)
+
+        Returns:
+            Mảng dự đoán, NaN ở các dòng nằm ngoài lưới
+        """
+        X = np.asarray(X, dtype=np.float64)
+        n = len(X)
+        valid = np.ones(n, dtype=bool)
+        lower = []
+        fractions = []
+        for column, (start, stop, step, interpolate) in enumerate(self._axes):
+            value = X[:, column]
+            valid &= (value >= start) & (value <= stop)
+            position = (np.nan_to_num(value, nan=start) - start) / step
+            size = self.values.shape[column]
+            if interpolate:
+                base = np.clip(np.floor(position).astype(np.int64), 0, size - 2)
+                lower.append(base)
+                fractions.append(position - base)
+            else:
+                nearest = np.rint(position)
+                valid &= np.abs(position - nearest) <= 1e-9
+                lower.append(np.clip(nearest.astype(np.int64), 0, size - 1))
+                fractions.append(None)
+
+        result = np.zeros(n)
+        interp_axes = [i for i, f in enumerate(fractions) if f is not None]
+        for corner in range(1 << len(interp_axes)):
+            cell = list(lower)
+            weight = np.ones(n)
+            for bit, axis in enumerate(interp_axes):
+                if corner >> bit & 1:
+                    cell[axis] = np.minimum(cell[axis] + 1, self.values.shape[axis] - 1)
+                    weight *= fractions[axis]
+                else:
+                    weight *= 1 - fractions[axis]
+            result += weight * self.values[tuple(cell)]
+        result[~valid] = np.nan
+        return result
+
+
+def build_prediction_grid(
+    model,
+    axes=None,
+    sample_size=ERROR_SAMPLE_SIZE,
+    seed=42,
+    max_rel_error=MAX_REL_ERROR,
+    max_p99_rel_error=MAX_P99_REL_ERROR,
+):
+    """
+    Tính lưới dự đoán cho model 6 features và lưu cạnh file model
+
+    Sai số nội suy được đo trước; vượt max_rel_error (max) hoặc
+    max_p99_rel_error (p99) thì không tạo lưới, xoá lưới cũ của model nếu có
+    và model tiếp tục dự đoán bằng booster. Lưới được tính theo từng khối (mỗi
+    tổ hợp bedrooms/bathrooms/floors) và ghi thẳng vào file .npy
+    memory-mapped nên bộ nhớ không phụ thuộc kích thước lưới.
+
+    Returns:
+        Metadata của lưới (kích thước, thời gian, sai số nội suy, installed)
+    """
+    if model.model is None:
+        model.load()
+    if model.feature_names != GRID_FEATURES:
+        raise ValueError(
+            f"Lưới dự đoán chỉ dùng cho model {GRID_FEATURES}, "
+            f"model hiện tại có {model.feature_names}"
+        )
+
+    axes = dict(DEFAULT_AXES, **(axes or {}))
+    axis_values = [_axis_values(*axes[f][:3]) for f in GRID_FEATURES]
+    shape = tuple(len(v) for v in axis_values)
+    values_path, metadata_path = grid_paths(model.model_path)
+    metadata = {
+        "model_version": model.version,
+        "features": GRID_FEATURES,
+        "axes": {f: list(axes[f]) for f in GRID_FEATURES},
+        "shape": list(shape),
+        "cells": int(np.prod(shape)),
+        "max_rel_error": max_rel_error,
+        "max_p99_rel_error": max_p99_rel_error,
+    }
+
+    error = interpolation_error(model, axes, sample_size=sample_size, seed=seed)
+    metadata["interpolation_error"] = error
+    print(
+        f"Sai số nội suy: max {error['max_abs']:,.0f} "
+        f"({error['max_rel'] * 100:.2f}%), p99 {error['p99_abs']:,.0f} "
+        f"({error['p99_rel'] * 100:.2f}%)"
+    )
+    if error["max_rel"] > max_rel_error or error["p99_rel"] > max_p99_rel_error:
+        print(
+            f"⚠ Sai số vượt ngưỡng (max {max_rel_error * 100:g}%, p99 "
+            f"{max_p99_rel_error * 100:g}%), không dùng lưới dự đoán"
+        )
+        for path in (values_path, metadata_path):
+            if os.path.exists(path):
+                os.remove(path)
+        model.prediction_grid = None
+        metadata["installed"] = False
+        return metadata
+
+    start = time.perf_counter()
+    tmp_path = values_path + ".tmp.npy"
+    values = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.float32, shape=shape
+    )
+    area, bedrooms, bathrooms, floors, year_built, location_score = axis_values
+    # Khối area x year_built x location_score cho mỗi tổ hợp trục nguyên nhỏ
+    block = np.stack(
+        [
+            a.ravel()
+            for a in np.meshgrid(area, year_built, location_score, indexing="ij")
+        ],
+        axis=1,
+    )
+    X_block = np.empty((len(block), len(GRID_FEATURES)), dtype=np.float32)
+    X_block[:, 0] = block[:, 0]
+    X_block[:, 4] = block[:, 1]
+    X_block[:, 5] = block[:, 2]
+    for i, bed in enumerate(bedrooms):
+        for j, bath in enumerate(bathrooms):
+            for k, floor in enumerate(floors):
+                X_block[:, 1] = bed
+                X_block[:, 2] = bath
+                X_block[:, 3] = floor
+                predictions = model.model.predict(X_block)
+                values[:, i, j, k, :, :] = predictions.reshape(
+                    len(area), len(year_built), len(location_score)
+                )
+    values.flush()
+    del values
+    os.replace(tmp_path, values_path)
+    build_seconds = time.perf_counter() - start
+
+    metadata["size_mb"] = round(os.path.getsize(values_path) / 1024**2, 1)
+    metadata["build_s"] = round(build_seconds, 2)
+    metadata["installed"] = True
+    with open(metadata_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+    model.prediction_grid = PredictionGrid(
+        np.load(values_path, mmap_mode="r"), axes, metadata
+    )
+
+    print(
+        f"✓ Đã tạo lưới dự đoán {shape} ({metadata['size_mb']} MB) trong "
+        f"{build_seconds:.1f}s tại {values_path}"
+    )
+    return metadata
+
+
+def interpolation_error(model, axes, sample_size=ERROR_SAMPLE_SIZE, seed=42):
+    """
+    So sánh dự đoán từ lưới với dự đoán trực tiếp của model trên các điểm
+    ngẫu nhiên trong lưới (trục liên tục lấy giá trị bất kỳ, không chỉ điểm bin)
+
+    Giá trị nội suy được tính từ dự đoán của model tại các góc ô chứa mỗi
+    điểm (như lookup_batch trên lưới đầy đủ), nên đo được trước khi tính lưới.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.empty((sample_size, len(GRID_FEATURES)))
+    for column, feature in enumerate(GRID_FEATURES):
+        start, stop, step, interpolate = axes[feature]
+        if interpolate:
+            X[:, column] = rng.uniform(start, stop, sample_size)
+        else:
+            X[:, column] = rng.choice(_axis_values(start, stop, step), sample_size)
+
+    direct = model.model.predict(X.astype(np.float32)).astype(np.float64)
+    lower = {}
+    fractions = {}
+    for column, feature in enumerate(GRID_FEATURES):
+        start, stop, step, interpolate = axes[feature]
+        if interpolate:
+            size = len(_axis_values(start, stop, step))
+            position = (X[:, column] - start) / step
+            lower[column] = np.clip(np.floor(position), 0, size - 2)
+            fractions[column] = position - lower[column]
+
+    from_grid = np.zeros(sample_size)
+    for corner in range(1 << len(lower)):
+        X_corner = X.copy()
+        weight = np.ones(sample_size)
+        for bit, column in enumerate(lower):
+            start, _, step, _ = axes[GRID_FEATURES[column]]
+            upper = corner >> bit & 1
+            X_corner[:, column] = start + step * (lower[column] + upper)
+            weight *= fractions[column] if upper else 1 - fractions[column]
+        from_grid += weight * model.model.predict(X_corner.astype(np.float32))
+
+    abs_error = np.abs(from_grid - direct)
+    rel_error = abs_error / np.maximum(np.abs(direct), 1e-9)
+    return {
+        "samples": sample_size,
+        "max_abs": float(abs_error.max()),
+        "mean_abs": float(abs_error.mean()),
+        "p99_abs": float(np.percentile(abs_error, 99)),
+        "max_rel": float(rel_error.max()),
+        "mean_rel": float(rel_error.mean()),
+        "p99_rel": float(np.percentile(rel_error, 99)),
+    }
+
+
+def load_prediction_grid(model):
+    """
+    Mở lưới dự đoán của model nếu có và đúng version model, không thì None
+    """
+    if model.feature_names != GRID_FEATURES:
+        return None
+    values_path, metadata_path = grid_paths(model.model_path)
+    if not (os.path.exists(values_path) and os.path.exists(metadata_path)):
+        return None
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    if metadata.get("model_version") != model.version:
+        print("⚠ Lưới dự đoán không khớp version model, bỏ qua")
+        return None
+    axes = {f: tuple(axis) for f, axis in metadata["axes"].items()}
+    return PredictionGrid(np.load(values_path, mmap_mode="r"), axes, metadata)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from model import HousePriceModel
+
+    parser = argparse.ArgumentParser(description="Tính lưới dự đoán cho model")
+    parser.add_argument("--model-path", default="models/house_price_model.pkl")
+    parser.add_argument("--sample-size", type=int, default=ERROR_SAMPLE_SIZE)
+    parser.add_argument("--max-rel-error", type=float, default=MAX_REL_ERROR)
+    parser.add_argument("--max-p99-rel-error", type=float, default=MAX_P99_REL_ERROR)
+    args = parser.parse_args()
+
+    build_prediction_grid(
+        HousePriceModel(model_path=args.model_path),
+        sample_size=args.sample_size,
+        max_rel_error=args.max_rel_error,
+        max_p99_rel_error=args.max_p99_rel_error,
+    )
@@ -0,0 +1,166 @@
+"""
+Hậu xử lý giá dự đoán: location premium theo tọa độ/địa chỉ và quy đổi USD -> VND
+
+Dùng chung cho /predict, /predict/batch và các công cụ chạy ngoài API.
+"""
+
+import hashlib
+
+import numpy as np
+
+from gazetteer import get_gazetteer
+
+# Tỷ giá hiện tại
+USD_TO_VND = 24500
+
+# Tăng khi đổi cách tính giá từ địa chỉ để cache dự đoán cũ hết hiệu lực
+PRICING_VERSION = 2
+
+# Điều chỉnh premium dựa trên keywords trong địa chỉ
+PREMIUM_KEYWORDS = {
+    "quận 1": 0.3,
+    "quận 2": 0.25,
+    "quận 3": 0.2,
+    "quận 7": 0.2,
+    "quận bình thạnh": 0.15,
+    "quận phú nhuận": 0.15,
+    "quận tân bình": 0.1,
+    "quận gò vấp": 0.1,
+    "quận 12": -0.1,
+    "quận bình tân": -0.1,
+    "huyện": -0.15,
+}
+
+
+def _stable_hash(text):
+    """
+    Hash số nguyên của chuỗi, giống nhau ở mọi process
+
+    hash() của Python được seed ngẫu nhiên theo từng process, nên cùng một
+    địa chỉ sẽ có giá khác nhau giữa các worker (và cache dùng chung).
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+def _apply_district(features_dict, district):
+    """Ghi quận tra được từ gazetteer vào features_dict, trả về premium"""
+    features_dict["district"] = district["name"]
+    if not features_dict.get("location_score"):
+        features_dict["location_score"] = district["location_score"]
+    return district["premium"]
+
+
+def apply_location(features_dict):
+    """
+    Tính location_score và location premium từ tọa độ hoặc địa chỉ
+
+    Có lat/lng trong vùng của gazetteer thì dùng quận tương ứng; không thì
+    dùng địa chỉ. Cập nhật features_dict tại chỗ (điền location_score nếu user
+    không nhập, bỏ các key location/lat/lng vì model không cần).
+
+    Returns:
+        Phần trăm tăng/giảm giá dựa trên vị trí
+    """
+    location = features_dict.pop("location", None)
+    lat = features_dict.pop("lat", None)
+    lng = features_dict.pop("lng", None)
+    location_premium = 0
+
+    if lat is not None and lng is not None:
+        district = get_gazetteer().resolve(lat, lng)
+        if district is not None:
+            return _apply_district(features_dict, district)
+
+    if location:
+        location_lower = location.lower().strip()
+
+        # Tạo location_score từ 3-9 (không quá cực đoan)
+        location_hash = _stable_hash(location_lower)
+        location_score = 3 + (abs(location_hash % 60) / 10.0)  # 3.0 - 9.0
+
+        # Hash địa chỉ để tạo premium từ -0.4 đến +0.4
+        premium_hash = _stable_hash(location_lower + "premium")
+        location_premium = (abs(premium_hash % 80) - 40) / 100.0
+
+        # Nếu user đã nhập location_score thì giữ nguyên, chỉ dùng điểm từ
+        # địa chỉ khi thiếu
+        if not features_dict.get("location_score"):
+            features_dict["location_score"] = location_score
+
+        for keyword, bonus in PREMIUM_KEYWORDS.items():
+            if keyword in location_lower:
+                location_premium += bonus
+                break
+
+        # Giới hạn premium trong khoảng hợp lý
+        location_premium = max(-0.3, min(0.5, location_premium))
+
+    return location_premium
+
+
+def apply_location_batch(features_list):
+    """
+    apply_location cho cả batch: tọa độ của mọi dòng được tra trong một lần
+    gọi gazetteer vectorized, các dòng còn lại dùng địa chỉ như apply_location
+
+    Returns:
+        List location premium theo thứ tự features_list
+    """
+    with_coords = [
+        i
+        for i, f in enumerate(features_list)
+        if f.get("lat") is not None and f.get("lng") is not None
+    ]
+    premiums = [None] * len(features_list)
+    if with_coords:
+        gazetteer = get_gazetteer()
+        resolved = gazetteer.resolve_batch(
+            [features_list[i]["lat"] for i in with_coords],
+            [features_list[i]["lng"] for i in with_coords],
+        )
+        for i, index, score, premium in zip(
+            with_coords,
+            resolved["index"],
+            resolved["location_score"],
+            resolved["premium"],
+        ):
+            if index < 0:
+                continue
+            features_dict = features_list[i]
+            features_dict.pop("location", None)
+            features_dict.pop("lat")
+            features_dict.pop("lng")
+            premiums[i] = _apply_district(
+                features_dict,
+                {
+                    "name": gazetteer.name(index),
+                    "location_score": float(score),
+                    "premium": float(premium),
+                },
+            )
+    return [
+        premium if premium is not None else apply_location(features_dict)
+        for premium, features_dict in zip(premiums, features_list)
+    ]
+
+
+def to_vnd(predicted_price_raw):
+    """
+    Convert giá từ USD sang VND (scalar hoặc numpy array)
+
+    Ames Housing dataset có giá từ $34,900 - $755,000 USD, nên giá trong
+    khoảng $10,000 - $1,000,000 hoặc < 1,000 được coi là USD; các khoảng còn
+    lại được coi là đã là VND.
+    """
+    raw = np.asarray(predicted_price_raw, dtype=np.float64)
+    is_usd = (raw < 1000) | ((raw >= 10000) & (raw <= 1000000))
+    converted = np.where(is_usd, raw * USD_TO_VND, raw)
+    return float(converted) if converted.ndim == 0 else converted
+
+
+def postprocess_price(predicted_price_raw, location_premium=0):
+    """Áp dụng location premium rồi convert sang VND"""
+    raw = np.asarray(predicted_price_raw, dtype=np.float64) * (
+        1 + np.asarray(location_premium, dtype=np.float64)
+    )
+    return to_vnd(raw)
@@ -0,0 +1,226 @@
+"""
+Train hai giai đoạn: preview nhanh trên mẫu phân tầng, rồi model đầy đủ
+
+Giai đoạn "preview" lấy mẫu phân tầng theo quantile của giá (mỗi tầng giữ
+đúng tỉ lệ dòng) từ tập train, fit ít cây hơn (learning rate tăng tương ứng)
+và lưu ngay để API phục vụ. Giai đoạn "full" (chạy nền) fit trên toàn bộ tập
+train và chỉ thay preview khi RMSE trên cùng tập holdout tốt hơn. Tập holdout
+chia giống HousePriceModel.train (test_size=0.2, random_state=42) nên metrics
+của hai giai đoạn so sánh được với nhau.
+
+Kết quả từng giai đoạn (số dòng, thời gian, metrics, trạng thái) lưu trong
+model.progressive và trong lineage.
+"""
+
+import time
+
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+
+# Kích thước mẫu preview: PREVIEW_FRACTION tập train, giới hạn trong
+# [PREVIEW_MIN_ROWS, PREVIEW_MAX_ROWS]
+PREVIEW_FRACTION = 0.1
+PREVIEW_MIN_ROWS = 10_000
+PREVIEW_MAX_ROWS = 200_000
+PREVIEW_TREES = 100
+# Số tầng quantile của giá khi lấy mẫu
+N_STRATA = 10
+
+
+def stratified_sample(y, n_rows, n_strata=N_STRATA, seed=42):
+    """
+    Chỉ số các dòng của mẫu phân tầng theo quantile của y
+
+    Returns:
+        Mảng chỉ số (đã sắp xếp) gồm khoảng n_rows dòng
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if n_rows >= len(y):
+        return np.arange(len(y))
+    edges = np.quantile(y, np.linspace(0, 1, n_strata + 1)[1:-1])
+    strata = np.searchsorted(edges, y, side="right")
+    rng = np.random.default_rng(seed)
+    fraction = n_rows / len(y)
+    rows = []
+    for stratum in np.unique(strata):
+        members = np.flatnonzero(strata == stratum)
+        n_pick = max(1, int(round(len(members) * fraction)))
+        rows.append(rng.choice(members, min(n_pick, len(members)), replace=False))
+    return np.sort(np.concatenate(rows))
+
+
+def preview_rows(n_train, fraction=PREVIEW_FRACTION):
+    """Số dòng của mẫu preview cho tập train n_train dòng"""
+    n_rows = int(n_train * fraction)
+    return min(n_train, max(PREVIEW_MIN_ROWS, min(n_rows, PREVIEW_MAX_ROWS)))
+
+
+def _fit(model, X, y, params):
+    callback = model.instrumentation.fit_callback()
+    regressor = xgb.XGBRegressor(**params, callbacks=[callback])
+    regressor.fit(X, y)
+    regressor.set_params(callbacks=None)
+    return regressor, callback.summary()
+
+
+def train_progressive(
+    model, X, y, stage, params, fraction=PREVIEW_FRACTION, comps_index=True
+):
+    """
+    Chạy một giai đoạn của train progressive
+
+    Args:
+        model: HousePriceModel (X, y đã qua _prepare_training_data)
+        X: Features (numpy array)
+        y: Target
+        stage: "preview" hoặc "full"
+        params: Hyperparameters (tên theo XGBRegressor)
+        fraction: Tỉ lệ tập train dùng cho preview
+        comps_index: Tạo index comps (trên mẫu preview, rồi trên toàn bộ tập
+            train nếu model full được dùng)
+
+    Returns:
+        Kết quả như HousePriceModel.train, thêm result["progressive"]
+    """
+    if stage not in ("preview", "full"):
+        raise ValueError(f"progressive phải là preview hoặc full: {stage}")
+
+    with model._stage("split", rows=len(X)):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42
+        )
+
+    if stage == "preview":
+        return _train_preview(
+            model, X_train, X_test, y_train, y_test, params, fraction, comps_index
+        )
+    return _train_full(model, X_train, X_test, y_train, y_test, params, comps_index)
+
+
+def _train_preview(
+    model, X_train, X_test, y_train, y_test, params, fraction, comps_index
+):
+    start = time.perf_counter()
+    with model._stage("sample", rows=len(X_train)) as stage:
+        rows = stratified_sample(y_train, preview_rows(len(X_train), fraction))
+        X_sample, y_sample = X_train[rows], y_train[rows]
+        stage["rows"] = len(rows)
+
+    # Ít cây hơn, tăng learning rate để tổng mức học tương đương
+    n_trees = min(PREVIEW_TREES, params.get("n_estimators", PREVIEW_TREES))
+    scale = params.get("n_estimators", n_trees) / n_trees
+    preview_params = dict(
+        params,
+        n_estimators=n_trees,
+        learning_rate=min(0.3, params.get("learning_rate", 0.3) * scale),
+    )
+    with model._stage("fit", rows=len(X_sample)) as stage:
+        model.model, stage["rounds"] = _fit(model, X_sample, y_sample, preview_params)
+    with model._stage("evaluate", rows=len(X_test)):
+        metrics = model._evaluate(model.model, X_test, y_test)
+
+    wall_time = round(time.perf_counter() - start, 3)
+    model.progressive = {
+        "preview": {
+            "rows": len(X_sample),
+            "n_estimators": n_trees,
+            "wall_time_s": wall_time,
+            "metrics": metrics,
+        },
+        # Giai đoạn full chạy nền, API cập nhật trạng thái khi xong
+        "full": {"status": "running", "rows": len(X_train)},
+    }
+    result = model._finish_training(
+        metrics,
+        len(X_sample),
+        preview_params,
+        lineage_extra={"stage": "preview", "wall_time_s": wall_time},
+        reference_X=X_sample,
+        comps_data=(X_sample, y_sample) if comps_index else None,
+    )
+    result["progressive"] = model.progressive
+    return result
+
+
+def _train_full(model, X_train, X_test, y_train, y_test, params, comps_index):
+    from model import HousePriceModel
+
+    # Model preview đang phục vụ ở cùng model_path
+    preview = HousePriceModel(model_path=model.model_path)
+    preview.load()
+    if (preview.progressive or {}).get("full", {}).get("status") != "running":
+        # Model ở model_path đã bị thay bởi lần train khác sau preview
+        raise RuntimeError("Model preview đã bị thay thế, bỏ giai đoạn full")
+    progressive = dict(preview.progressive)
+
+    start = time.perf_counter()
+    with model._stage("fit", rows=len(X_train)) as stage:
+        regressor, stage["rounds"] = _fit(model, X_train, y_train, params)
+    with model._stage("evaluate", rows=len(X_test)):
+        metrics = model._evaluate(regressor, X_test, y_test)
+    wall_time = round(time.perf_counter() - start, 3)
+
+    improved = metrics["rmse"] < preview.metrics["rmse"]
+    progressive["full"] = {
+        "status": "published" if improved else "rejected",
+        "rows": len(X_train),
+        "wall_time_s": wall_time,
+        "metrics": metrics,
+    }
+
+    if not improved:
+        # Giữ preview, chỉ ghi lại kết quả của giai đoạn full
+        print(
+            f"Model full (RMSE {metrics['rmse']:.2f}) không tốt hơn preview "
+            f"(RMSE {preview.metrics['rmse']:.2f}), giữ preview"
+        )
+        preview.progressive = progressive
+        preview.save()
+        model.load()
+        result = {
+            "model": model.model,
+            "metrics": model.metrics,
+            "instrumentation": model.instrumentation.report(),
+        }
+    else:
+        model.model = regressor
+        # Nối lineage vào sau preview
+        model.version = preview.version
+        model.lineage = preview.lineage
+        model.progressive = progressive
+        result = model._finish_training(
+            metrics,
+            len(X_train),
+            params,
+            mode="progressive",
+            lineage_extra={"stage": "full", "wall_time_s": wall_time},
+            reference_X=X_train,
+            comps_data=(X_train, y_train) if comps_index else None,
+        )
+    result["progressive"] = progressive
+    return result
+
+
+def mark_full_failed(model_path, error):
+    """
+    Ghi trạng thái "failed" của giai đoạn full vào model preview đã lưu, để
+    các worker khác và lần khởi động sau không thấy "running" mãi
+
+    Returns:
+        model.progressive đã cập nhật, None nếu model ở model_path không còn
+        là preview đang chờ giai đoạn full
+    """
+    from model import HousePriceModel
+
+    preview = HousePriceModel(model_path=model_path)
+    preview.load()
+    full = (preview.progressive or {}).get("full", {})
+    if full.get("status") != "running":
+        return None
+    preview.progressive = dict(
+        preview.progressive,
+        full={"status": "failed", "rows": full.get("rows"), "error": error},
+    )
+    preview.save()
+    return preview.progressive
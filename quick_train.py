@@ -71,5 +71,8 @@ def main():
         print("Vui lòng kiểm tra lại dataset và thử lại.")
 
 if __name__ == "__main__":
+    from instrumentation import configure_logging
+
+    configure_logging()
     main()
 
@@ -0,0 +1,150 @@
+"""
+Chia CPU giữa serving (/predict) và training (/train) trong cùng một deployment
+
+XGBoost mặc định dùng mọi core (n_jobs=-1), nên /train chạy trong process API
+làm /predict chậm hẳn đi. ResourcePolicy quy định:
+- số thread XGBoost cho inference và cho training (ngân sách riêng)
+- training chạy trong process con (spawn) với độ ưu tiên thấp (nice), để
+  scheduler của OS luôn ưu tiên process API
+- tuỳ chọn chia core cố định (CPU affinity): inference dùng các core đầu,
+  training dùng phần còn lại
+
+Cấu hình bằng biến môi trường:
+    INFERENCE_THREADS   Số thread XGBoost khi dự đoán (mặc định 1/4 số core)
+    TRAINING_THREADS    Số thread XGBoost khi train (mặc định phần còn lại)
+    TRAINING_ISOLATION  "0" để train ngay trong process API như trước
+    TRAINING_NICE       Độ nice của process train (mặc định 10)
+    CPU_AFFINITY        "1" để chia core cố định giữa inference và training
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+TRAINING_NICE = 10
+
+
+def available_cpus():
+    """Các core process được phép chạy (theo affinity hiện tại nếu có)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _init_training_process(threads, nice, cpus):
+    """
+    Initializer của process train: chạy trước khi import XGBoost trong job,
+    nên OMP_NUM_THREADS có hiệu lực với thread pool OpenMP của XGBoost
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError as e:
+            print(f"⚠ Không đặt được nice cho process train: {e}")
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+class ResourcePolicy:
+    """
+    Ngân sách CPU cho inference và training
+
+    Args:
+        inference_threads: Số thread XGBoost khi dự đoán, None = 1/4 số core
+        training_threads: Số thread XGBoost khi train, None = số core còn lại
+        isolate_training: Train trong process con có độ ưu tiên thấp
+        training_nice: Độ nice cộng thêm cho process train
+        cpu_affinity: Chia core cố định giữa process API và process train
+    """
+
+    def __init__(
+        self,
+        inference_threads=None,
+        training_threads=None,
+        isolate_training=True,
+        training_nice=TRAINING_NICE,
+        cpu_affinity=False,
+    ):
+        self.cpus = available_cpus()
+        n_cpus = len(self.cpus)
+        self.inference_threads = max(1, min(inference_threads or n_cpus // 4, n_cpus))
+        self.isolate_training = isolate_training
+        self.training_nice = training_nice if isolate_training else 0
+        # Affinity chỉ có nghĩa khi training ở process riêng và còn core cho nó
+        self.cpu_affinity = (
+            cpu_affinity
+            and isolate_training
+            and hasattr(os, "sched_setaffinity")
+            and n_cpus > self.inference_threads
+        )
+        if self.cpu_affinity:
+            self.inference_cpus = self.cpus[: self.inference_threads]
+            self.training_cpus = self.cpus[self.inference_threads :]
+        else:
+            self.inference_cpus = self.cpus
+            self.training_cpus = self.cpus
+        default_training = max(
+            1,
+            len(self.training_cpus)
+            - (0 if self.cpu_affinity else self.inference_threads),
+        )
+        self.training_threads = max(1, training_threads or default_training)
+
+    @classmethod
+    def from_env(cls):
+        """Đọc cấu hình từ biến môi trường (xem docstring của module)"""
+        return cls(
+            inference_threads=int(os.environ.get("INFERENCE_THREADS", 0)) or None,
+            training_threads=int(os.environ.get("TRAINING_THREADS", 0)) or None,
+            isolate_training=os.environ.get("TRAINING_ISOLATION", "1") != "0",
+            training_nice=int(os.environ.get("TRAINING_NICE", TRAINING_NICE)),
+            cpu_affinity=os.environ.get("CPU_AFFINITY", "0") == "1",
+        )
+
+    def apply_serving(self):
+        """Giới hạn process API vào các core inference (khi bật affinity)"""
+        if self.cpu_affinity:
+            os.sched_setaffinity(0, self.inference_cpus)
+
+    def apply_inference(self, model):
+        """Đặt số thread XGBoost của model đang phục vụ theo ngân sách inference"""
+        if model.model is not None:
+            model.model.set_params(n_jobs=self.inference_threads)
+
+    def run_training(self, fn, *args):
+        """
+        Chạy fn(*args) trong một process train riêng và trả về kết quả
+
+        fn phải là hàm top-level, kết quả phải picklable. Process mới (spawn)
+        cho mỗi lần train nên bộ nhớ của lần train được trả lại cho OS ngay.
+        """
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=ctx,
+            initializer=_init_training_process,
+            initargs=(
+                self.training_threads,
+                self.training_nice,
+                self.training_cpus if self.cpu_affinity else None,
+            ),
+        ) as executor:
+            return executor.submit(fn, *args).result()
+
+    def allocation(self):
+        """Phân bổ core hiện tại (cho /resources)"""
+        return {
+            "cpu_count": len(self.cpus),
+            "inference": {
+                "threads": self.inference_threads,
+                "cpus": self.inference_cpus,
+            },
+            "training": {
+                "threads": self.training_threads,
+                "cpus": self.training_cpus,
+                "isolated_process": self.isolate_training,
+                "nice": self.training_nice,
+            },
+            "cpu_affinity": self.cpu_affinity,
+        }
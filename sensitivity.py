@@ -0,0 +1,138 @@
+"""
+Đường cong what-if (sensitivity) của giá theo từng feature cho một căn nhà
+
+Thay vì gọi /predict cho mỗi lần đổi một giá trị, toàn bộ các dòng biến thể
+(mỗi feature quét một dãy giá trị, các feature khác giữ như căn nhà gốc) được
+ghép thành một ma trận và dự đoán trong một lần gọi booster. Kết quả được
+cache theo căn nhà gốc + dãy giá trị + version model.
+"""
+
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from pricing import postprocess_price
+
+# Số điểm tối đa trên mỗi đường cong và số kết quả giữ trong cache
+MAX_POINTS = 200
+CACHE_SIZE = 256
+
+
+def sweep_values(start=None, stop=None, num=20, values=None):
+    """Dãy giá trị cần quét: values nếu có, không thì num điểm đều từ start đến stop"""
+    if values is not None:
+        values = np.asarray(values, dtype=np.float64)
+    else:
+        if start is None or stop is None:
+            raise ValueError("Cần start và stop (hoặc values) cho mỗi feature")
+        values = np.linspace(start, stop, num)
+    if len(values) == 0 or len(values) > MAX_POINTS:
+        raise ValueError(f"Mỗi feature cần từ 1 đến {MAX_POINTS} giá trị")
+    return values
+
+
+def _perturbed_frame(model, base_features, feature, values):
+    """
+    Các dòng biến thể (theo features của model) khi feature nhận từng giá trị
+
+    Dict gốc được map một lần với feature là cả mảng giá trị; nếu mapping
+    không chạy được trên mảng thì map từng giá trị.
+    """
+    try:
+        mapped = model._map_features(dict(base_features, **{feature: values}))
+        columns = {
+            name: np.broadcast_to(value, len(values)) for name, value in mapped.items()
+        }
+    except (TypeError, ValueError):
+        rows = [
+            model._map_features(dict(base_features, **{feature: v})) for v in values
+        ]
+        columns = {name: [row[name] for row in rows] for name in rows[0]}
+    return pd.DataFrame(columns).reindex(columns=model.feature_names, fill_value=0)
+
+
+def sensitivity_curves(model, base_features, sweeps, location_premium=0):
+    """
+    Dự đoán giá của căn nhà gốc và các đường cong what-if
+
+    Args:
+        model: HousePriceModel đã load
+        base_features: Dict features từ form (đã qua apply_location)
+        sweeps: Dict feature -> dãy giá trị cần quét
+        location_premium: Premium theo địa chỉ, áp dụng như /predict
+
+    Returns:
+        Dict với base_price và curves (feature -> values, predicted_prices)
+    """
+    if model.transformer is not None:
+        # Preprocessing lúc train, tính cho mọi dòng trong một lần
+        X = model.transformer.transform(
+            [base_features]
+            + [
+                dict(base_features, **{feature: value})
+                for feature, values in sweeps.items()
+                for value in values.tolist()
+            ]
+        )
+    else:
+        frames = [pd.DataFrame([model._map_features(base_features)])]
+        frames[0] = frames[0].reindex(columns=model.feature_names, fill_value=0)
+        for feature, values in sweeps.items():
+            frames.append(_perturbed_frame(model, base_features, feature, values))
+        X = model._encode_categories(pd.concat(frames, ignore_index=True)).values
+
+    # Một lần gọi booster cho căn gốc và mọi dòng biến thể
+    prices = np.atleast_1d(postprocess_price(model.model.predict(X), location_premium))
+
+    curves = {}
+    offset = 1
+    for feature, values in sweeps.items():
+        curves[feature] = {
+            "values": values.tolist(),
+            "predicted_prices": prices[offset : offset + len(values)].tolist(),
+        }
+        offset += len(values)
+    return {"base_price": float(prices[0]), "curves": curves}
+
+
+class SensitivityCache:
+    """
+    Cache LRU kết quả sensitivity theo (version model, căn nhà gốc, dãy giá trị)
+
+    Args:
+        max_entries: Số kết quả tối đa được giữ
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_version, base_features, sweeps):
+        return json.dumps(
+            [
+                model_version,
+                base_features,
+                {f: np.asarray(v).tolist() for f, v in sweeps.items()},
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,71 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Không ghi audit log / cache dự đoán vào thư mục của repo khi chạy test
+os.environ.setdefault("AUDIT_LOG", "0")
+os.environ.setdefault("PREDICTION_CACHE", "0")
+
+# Căn nhà từ form thiếu vài trường: transformer điền median lúc train
+PARTIAL_HOUSE = {"area": 150, "bedrooms": 3, "bathrooms": 2}
+
+# Lưới dự đoán nhỏ để test nhanh
+SMALL_AXES = {
+    "area": (50.0, 300.0, 50.0, True),
+    "year_built": (1980, 2020, 10, True),
+    "location_score": (0.0, 10.0, 2.5, True),
+}
+
+
+@pytest.fixture(scope="session")
+def form_data():
+    """Dữ liệu tổng hợp cố định kiểu form (có cột price)"""
+    from create_large_dataset import generate_chunk
+
+    return generate_chunk(3000, np.random.default_rng(42))
+
+
+@pytest.fixture(scope="session")
+def processed(form_data):
+    """(DataFrame đã preprocess, FeatureTransformer) của form_data"""
+    from train_with_real_data import preprocess_generic_data
+
+    return preprocess_generic_data(
+        form_data, target_column="price", verbose=False, return_transformer=True
+    )
+
+
+@pytest.fixture(scope="session")
+def trained_model(processed, tmp_path_factory):
+    """HousePriceModel nhỏ đã train kèm transformer và lưu ra file"""
+    from model import HousePriceModel
+
+    df, transformer = processed
+    model_path = tmp_path_factory.mktemp("model") / "model.pkl"
+    model = HousePriceModel(model_path=str(model_path))
+    model.train(
+        X=df.iloc[:, :-1],
+        y=df.iloc[:, -1],
+        params={"n_estimators": 50, "n_jobs": 1},
+        transformer=transformer,
+        comps_index=False,
+    )
+    return model
+
+
+@pytest.fixture
+def model_copy(trained_model, tmp_path):
+    """Bản copy của trained_model (lưới, index comps ghi cạnh file copy)"""
+    from model import HousePriceModel
+
+    model_path = str(tmp_path / "model.pkl")
+    shutil.copy(trained_model.model_path, model_path)
+    model = HousePriceModel(model_path=model_path)
+    model.load()
+    return model
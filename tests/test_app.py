@@ -0,0 +1,182 @@
+import glob
+import json
+import os
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from audit import AuditLog
+from comps import build_comps_index
+from conftest import PARTIAL_HOUSE, SMALL_AXES
+from prediction_cache import PredictionCache
+from prediction_grid import build_prediction_grid
+
+
+@pytest.fixture
+def client(trained_model, monkeypatch):
+    """TestClient của API với model nhỏ đã train (không chạy startup)"""
+    monkeypatch.setattr(app_module, "model", trained_model)
+    return TestClient(app_module.app)
+
+
+def test_predict_batch_empty(client):
+    response = client.post("/predict/batch", json={"houses": []})
+    assert response.status_code == 200
+    assert response.json() == {"predictions": []}
+
+
+def test_predict_batch_matches_predict(client):
+    houses = [PARTIAL_HOUSE, dict(PARTIAL_HOUSE, area=80, floors=2)]
+    response = client.post("/predict/batch", json={"houses": houses})
+    assert response.status_code == 200
+    batch = [p["predicted_price"] for p in response.json()["predictions"]]
+
+    single = [
+        client.post("/predict", json=house).json()["predicted_price"]
+        for house in houses
+    ]
+    assert batch == pytest.approx(single)
+
+
+def test_predict_through_cache(client, tmp_path, monkeypatch):
+    cache = PredictionCache(directory=str(tmp_path), max_entries=64)
+    monkeypatch.setattr(app_module, "prediction_cache", cache)
+
+    first = client.post("/predict", json=PARTIAL_HOUSE)
+    second = client.post("/predict", json=PARTIAL_HOUSE)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert (cache.misses, cache.hits, cache.writes) == (1, 1, 1)
+
+    # Worker khác mở cùng file cache thấy ngay kết quả
+    other = PredictionCache(directory=str(tmp_path), max_entries=64)
+    monkeypatch.setattr(app_module, "prediction_cache", other)
+    assert client.post("/predict", json=PARTIAL_HOUSE).json() == first.json()
+    assert (other.misses, other.hits) == (0, 1)
+    cache.close()
+    other.close()
+
+
+def test_predict_through_grid(model_copy, monkeypatch):
+    monkeypatch.setattr(app_module, "model", model_copy)
+    client = TestClient(app_module.app)
+    on_grid = {"area": 100, "bedrooms": 2, "bathrooms": 2, "year_built": 2000}
+    on_grid["location_score"] = 5.0
+    houses = [on_grid, dict(on_grid, area=400)]
+    booster = [
+        client.post("/predict", json=house).json()["predicted_price"]
+        for house in houses
+    ]
+
+    build_prediction_grid(
+        model_copy,
+        axes=SMALL_AXES,
+        sample_size=2000,
+        max_rel_error=1,
+        max_p99_rel_error=1,
+    )
+    grid = model_copy.prediction_grid
+    lookup = grid.lookup
+    lookups = []
+    monkeypatch.setattr(
+        grid, "lookup", lambda f: lookups.append(lookup(f)) or lookups[-1]
+    )
+
+    # Điểm lưới lấy giá từ lưới (bằng booster), ngoài lưới thì dự đoán bằng model
+    single = [
+        client.post("/predict", json=house).json()["predicted_price"]
+        for house in houses
+    ]
+    assert lookups[0] is not None and lookups[1] is None
+    assert single == pytest.approx(booster, rel=1e-6)
+
+    response = client.post("/predict/batch", json={"houses": houses})
+    batch = [p["predicted_price"] for p in response.json()["predictions"]]
+    assert batch == pytest.approx(single, rel=1e-6)
+
+
+def test_predict_comps(model_copy, form_data, monkeypatch):
+    monkeypatch.setattr(app_module, "model", model_copy)
+    client = TestClient(app_module.app)
+    response = client.post("/predict/comps", json={"house": PARTIAL_HOUSE})
+    assert response.status_code == 503
+
+    # Index từ các căn của form: căn đã có trong index là comp gần nhất của nó
+    rows = form_data.iloc[:500]
+    houses = rows.drop(columns="price").to_dict("records")
+    build_comps_index(model_copy, model_copy.encode_features(houses), rows["price"])
+    response = client.post("/predict/comps", json={"house": houses[7], "k": 3})
+    assert response.status_code == 200
+    comps = response.json()["comps"]
+    assert len(comps) == 3
+    assert comps[0]["distance"] == 0
+    assert comps[0]["price_raw"] == pytest.approx(rows["price"].iloc[7], rel=1e-6)
+    assert [c["distance"] for c in comps] == sorted(c["distance"] for c in comps)
+
+    response = client.post(
+        "/predict/comps/batch", json={"houses": [houses[7], PARTIAL_HOUSE], "k": 3}
+    )
+    assert response.json()["results"][0] == comps
+
+
+def test_audit_log_keeps_raw_input(client, tmp_path, monkeypatch):
+    audit_log = AuditLog(str(tmp_path)).start()
+    monkeypatch.setattr(app_module, "audit_log", audit_log)
+    house = dict(PARTIAL_HOUSE, location="12 Nguyễn Huệ, Quận 1", lat=1.0, lng=2.0)
+    assert client.post("/predict", json=house).status_code == 200
+    response = client.post("/predict/batch", json={"houses": [house, PARTIAL_HOUSE]})
+    assert response.status_code == 200
+    audit_log.close()
+
+    (path,) = glob.glob(os.path.join(tmp_path, "audit_*"))
+    if path.endswith(".parquet"):
+        records = pd.read_parquet(path)
+    else:
+        records = pd.read_json(path, lines=True, compression="gzip")
+    features = [json.loads(f) for f in records["features"]]
+    assert list(records["endpoint"]) == ["/predict"] + ["/predict/batch"] * 2
+    for logged in features[:2]:
+        assert logged["location"] == house["location"]
+        assert (logged["lat"], logged["lng"]) == (1.0, 2.0)
+    assert features[2]["location"] is None
+
+
+def test_predict_sensitivity_matches_predict(client):
+    request = {
+        "house": PARTIAL_HOUSE,
+        "features": {
+            "area": {"start": 50, "stop": 250, "num": 5},
+            "year_built": {"values": [1990, 2020]},
+        },
+    }
+    response = client.post("/predict/sensitivity", json=request)
+    assert response.status_code == 200
+    result = response.json()
+    assert not result["cached"]
+
+    def price(**changes):
+        house = dict(PARTIAL_HOUSE, **changes)
+        return client.post("/predict", json=house).json()["predicted_price"]
+
+    assert result["base_price"] == pytest.approx(price())
+    area = result["curves"]["area"]
+    assert area["values"] == [50, 100, 150, 200, 250]
+    # Mỗi điểm trên đường cong bằng /predict với đúng giá trị đó
+    assert area["predicted_prices"][2] == pytest.approx(price())
+    assert area["predicted_prices"][0] == pytest.approx(price(area=50))
+    year_built = result["curves"]["year_built"]["predicted_prices"]
+    assert year_built == pytest.approx([price(year_built=1990), price(year_built=2020)])
+
+    assert client.post("/predict/sensitivity", json=request).json()["cached"]
+
+
+def test_predict_sensitivity_rejects_bad_sweeps(client):
+    def sweep(features):
+        request = {"house": PARTIAL_HOUSE, "features": features}
+        return client.post("/predict/sensitivity", json=request).status_code
+
+    assert sweep({"location": {"values": [1]}}) == 400
+    assert sweep({"area": {"start": 50}}) == 400
+    assert sweep({"area": {"start": 50, "stop": 300, "num": 1000}}) == 400
@@ -0,0 +1,72 @@
+import glob
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+
+from audit import AuditLog
+
+
+def _write_records(directory, n_records):
+    audit_log = AuditLog(directory).start()
+    for i in range(n_records):
+        audit_log.log("/predict", "v1", {"area": i}, 1.0, 2.0)
+    audit_log.close()
+
+
+def _read_rows(path):
+    if path.endswith(".parquet"):
+        return len(pd.read_parquet(path))
+    return len(pd.read_json(path, lines=True, compression="gzip"))
+
+
+def test_workers_sharing_directory_do_not_overwrite(tmp_path):
+    # Như nhiều worker uvicorn: cùng thư mục, cùng giây, mỗi process một file
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=_write_records, args=(str(tmp_path), 10)) for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    files = glob.glob(os.path.join(tmp_path, "audit_*"))
+    assert len(files) == 3
+    assert not any(path.endswith(".inprogress") for path in files)
+    assert sum(_read_rows(path) for path in files) == 30
+
+
+def test_full_queue_blocks_by_default_then_counts_drops(tmp_path, capsys):
+    # Thread ghi không chạy: hàng đợi đầy, block hết thời gian chờ rồi bỏ
+    audit_log = AuditLog(str(tmp_path), max_queue=2, block_timeout=0.01)
+    assert audit_log.policy == "block"
+    results = [audit_log.log("/predict", "v1", {}, 1.0, 2.0) for _ in range(4)]
+
+    assert results == [True, True, False, False]
+    assert audit_log.stats()["dropped"] == 2
+    assert "Audit log đã bỏ 1 record" in capsys.readouterr().out
+
+
+def test_stats_counts_closed_files(tmp_path):
+    audit_log = AuditLog(str(tmp_path), rotate_rows=5, batch_size=5).start()
+    for i in range(12):
+        audit_log.log("/predict", "v1", {"area": i}, 1.0, 2.0)
+    audit_log.close()
+
+    assert audit_log.stats()["files"] == len(glob.glob(os.path.join(tmp_path, "*")))
+    assert audit_log.stats()["written"] == 12
+
+
+def test_log_many_waits_once_and_drops_overflow(tmp_path):
+    audit_log = AuditLog(str(tmp_path), max_queue=5, block_timeout=0.05)
+    records = [({"area": i}, 1.0, 2.0) for i in range(8)]
+
+    start = time.perf_counter()
+    assert audit_log.log_many("/predict/batch", "v1", records) == 5
+    # Một lần chờ cho cả batch, không phải một lần cho mỗi record bị bỏ
+    assert time.perf_counter() - start < 0.1
+    assert audit_log.stats()["dropped"] == 3
+    assert audit_log.stats()["queue_size"] == 5
+    assert audit_log.log_many("/predict/batch", "v1", []) == 0
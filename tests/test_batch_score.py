@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_score import batch_score, score_frame
+from gazetteer import get_gazetteer
+from pricing import apply_location, postprocess_price
+
+
+@pytest.fixture
+def model(model_copy):
+    # Như worker của batch_score: dự đoán luôn bằng model, không qua lưới
+    model_copy.prediction_grid = None
+    model_copy.drift_monitor = None
+    return model_copy
+
+
+@pytest.fixture
+def listings(form_data):
+    """40 căn từ form_data, một nửa có tọa độ tâm quận và không nhập location_score"""
+    frame = form_data.drop(columns=["price"]).iloc[:40].reset_index(drop=True)
+    districts = get_gazetteer().districts
+    # Nửa sau ở Hà Nội: ngoài vùng gazetteer nên không có premium
+    lats = [districts[i % len(districts)]["lat"] for i in range(20)] + [21.0285] * 20
+    lngs = [districts[i % len(districts)]["lng"] for i in range(20)] + [105.8542] * 20
+    frame = frame.assign(lat=lats, lng=lngs)
+    frame.loc[::2, "location_score"] = np.nan
+    return frame
+
+
+def test_score_frame_matches_predict_endpoint_pipeline(model, listings):
+    scored = score_frame(model, listings)
+
+    assert list(scored.columns[: len(listings.columns)]) == list(listings.columns)
+    for i, row in enumerate(listings.to_dict("records")):
+        # Cùng các bước như /predict: apply_location, predict, hậu xử lý
+        features = {k: (None if pd.isna(v) else v) for k, v in row.items()}
+        premium = apply_location(features)
+        raw = model.predict(features)
+        assert scored["predicted_price_raw"][i] == pytest.approx(raw, rel=1e-5)
+        assert scored["predicted_price_vnd"][i] == pytest.approx(
+            postprocess_price(raw, premium), rel=1e-5
+        )
+
+
+def test_score_frame_legacy_model_requires_feature_columns(model, listings):
+    model.transformer = None
+    with pytest.raises(ValueError, match="location_score"):
+        score_frame(model, listings.drop(columns=["location_score"]))
+
+
+def test_batch_score_writes_ordered_shards(model, listings, tmp_path):
+    data_path = tmp_path / "listings.csv"
+    listings.to_csv(data_path, index=False)
+    output_dir = tmp_path / "scored"
+
+    summary = batch_score(
+        str(data_path),
+        str(output_dir),
+        model_path=model.model_path,
+        n_workers=1,
+        chunk_size=15,
+    )
+
+    assert summary["rows"] == 40 and summary["shards"] == 3
+    assert summary["files"] == ["part-00000.csv", "part-00001.csv", "part-00002.csv"]
+    with open(output_dir / "_manifest.json") as f:
+        assert json.load(f)["model_version"] == model.version
+    scored = pd.concat(
+        [pd.read_csv(output_dir / name) for name in summary["files"]],
+        ignore_index=True,
+    )
+    expected = score_frame(model, listings)
+    np.testing.assert_allclose(
+        scored["predicted_price_vnd"], expected["predicted_price_vnd"], rtol=1e-6
+    )
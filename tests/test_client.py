@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from client import AsyncHousePriceClient, HousePriceAPIError, HousePriceClient
+
+
+@pytest.fixture
+def busy_server():
+    """Server luôn trả về 503, đếm số request theo path"""
+    counts = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            counts[self.path] = counts.get(self.path, 0) + 1
+            body = json.dumps({"detail": "busy"}).encode()
+            self.send_response(503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", counts
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api_server():
+    """Server giả: giá = area * 10, ghi lại path và số nhà mỗi request"""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            requests_seen.append((self.path, None))
+            self._reply({"features": ["area"]})
+
+        def do_POST(self):
+            data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path == "/predict/batch":
+                requests_seen.append((self.path, len(data["houses"])))
+                predictions = [
+                    {"predicted_price": house["area"] * 10} for house in data["houses"]
+                ]
+                self._reply({"predictions": predictions})
+            elif self.path == "/predict":
+                requests_seen.append((self.path, 1))
+                self._reply({"predicted_price": data["area"] * 10})
+            else:
+                requests_seen.append((self.path, None))
+                self._reply({"status": "success"})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def test_sync_client_retries_predict_but_not_train(busy_server):
+    base_url, counts = busy_server
+    with HousePriceClient(base_url, max_retries=2, backoff_factor=0) as client:
+        with pytest.raises(HousePriceAPIError):
+            client.predict({"area": 100, "bedrooms": 2, "bathrooms": 1})
+        with pytest.raises(HousePriceAPIError):
+            client.train(data_path="data/house_data.csv")
+
+    assert counts == {"/predict": 3, "/train": 1}
+
+
+def test_async_client_retries_predict_but_not_train(busy_server):
+    base_url, counts = busy_server
+
+    async def run():
+        async with AsyncHousePriceClient(
+            base_url, max_retries=2, backoff_factor=0, batch_window=0
+        ) as client:
+            with pytest.raises(HousePriceAPIError):
+                await client.predict({"area": 100, "bedrooms": 2, "bathrooms": 1})
+            with pytest.raises(HousePriceAPIError):
+                await client.train(data_path="data/house_data.csv")
+
+    asyncio.run(run())
+    assert counts == {"/predict": 3, "/train": 1}
+
+
+def test_sync_client_coalesces_concurrent_predicts(api_server):
+    base_url, requests_seen = api_server
+    houses = [{"area": area, "bedrooms": 2, "bathrooms": 1} for area in range(1, 17)]
+    with HousePriceClient(base_url, batch_window=0.2) as client:
+        with ThreadPoolExecutor(len(houses)) as pool:
+            prices = list(pool.map(client.predict, houses))
+
+    assert prices == [house["area"] * 10 for house in houses]
+    batches = [n for path, n in requests_seen if path == "/predict/batch"]
+    assert sum(batches) == len(houses) and len(batches) < len(houses)
+    assert all(path == "/predict/batch" for path, _ in requests_seen)
+
+
+def test_async_client_flushes_batch_window(api_server):
+    base_url, requests_seen = api_server
+    houses = [{"area": area, "bedrooms": 2, "bathrooms": 1} for area in range(1, 11)]
+
+    async def run():
+        async with AsyncHousePriceClient(
+            base_url, batch_window=0.01, max_batch_size=4
+        ) as client:
+            # Gom theo max_batch_size, phần dư gửi khi hết batch_window
+            prices = await asyncio.gather(*(client.predict(h) for h in houses))
+            single = await client.predict({"area": 7, "bedrooms": 1, "bathrooms": 1})
+            return prices, single
+
+    prices, single = asyncio.run(run())
+    assert prices == [house["area"] * 10 for house in houses]
+    assert single == 70
+    assert requests_seen == [("/predict/batch", n) for n in (4, 4, 2, 1)]
+
+
+def test_clients_cache_features_until_train(api_server):
+    base_url, requests_seen = api_server
+    with HousePriceClient(base_url, cache_ttl=60) as client:
+        assert client.features() == client.features() == {"features": ["area"]}
+        client.model_info()
+        client.train(n_estimators=10)
+        client.features()
+
+    async def run():
+        async with AsyncHousePriceClient(base_url, cache_ttl=60) as client:
+            await client.features()
+            await client.features()
+
+    asyncio.run(run())
+    assert [path for path, _ in requests_seen] == [
+        "/features",
+        "/model/info",
+        "/train",
+        "/features",
+        "/features",
+    ]
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compaction import compact_model
+from conftest import PARTIAL_HOUSE
+from model import HousePriceModel
+from train_with_real_data import preprocess_ames_data
+
+
+def test_compact_model_keeps_transformer(trained_model, processed, tmp_path):
+    df, _ = processed
+    report = compact_model(
+        trained_model,
+        X=df.iloc[:, :-1],
+        y=df.iloc[:, -1],
+        max_trees=10,
+        strategies=("truncate",),
+        output_path=str(tmp_path / "compact.pkl"),
+    )
+
+    compact = HousePriceModel(model_path=report["model_path"])
+    compact.load()
+    assert compact.transformer is not None
+    X = trained_model.transformer.transform(PARTIAL_HOUSE)
+    assert compact.predict(PARTIAL_HOUSE) == float(compact.model.predict(X)[0])
+
+
+def test_compact_model_preprocesses_raw_data_file(tmp_path):
+    # File gốc kiểu Ames: cột khác tên features, target là SalePrice
+    rng = np.random.default_rng(0)
+    n_rows = 2000
+    raw = pd.DataFrame(
+        {
+            "GrLivArea": rng.uniform(600, 3000, n_rows),
+            "BedroomAbvGr": rng.integers(1, 5, n_rows),
+            "FullBath": rng.integers(1, 4, n_rows),
+            "HalfBath": rng.integers(0, 2, n_rows),
+            "2ndFlrSF": rng.choice([0, 0, 500, 900], n_rows),
+            "YearBuilt": rng.integers(1950, 2010, n_rows),
+            "OverallQual": rng.integers(1, 11, n_rows),
+        }
+    )
+    raw["SalePrice"] = raw["GrLivArea"] * 80 + raw["OverallQual"] * 10_000
+    data_path = tmp_path / "train.csv"
+    raw.to_csv(data_path, index=False)
+
+    processed, transformer = preprocess_ames_data(raw)
+    model = HousePriceModel(model_path=str(tmp_path / "model.pkl"))
+    model.train(
+        X=processed.iloc[:, :-1],
+        y=processed.iloc[:, -1],
+        params={"n_estimators": 40, "n_jobs": 1},
+        transformer=transformer,
+        comps_index=False,
+    )
+
+    report = compact_model(model, data_path=str(data_path), strategies=("truncate",))
+    # Cùng features và cách chia với lúc train nên RMSE teacher giống hệt
+    assert report["teacher"]["rmse"] == pytest.approx(model.metrics["rmse"], rel=1e-4)
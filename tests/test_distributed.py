@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from distributed import collect_results, worker_threads
+
+
+def _post_result(result_queue, rank):
+    result_queue.put(("ok", rank, {"rank": rank}))
+
+
+def test_worker_threads_split_training_budget():
+    # Ngân sách n_jobs của ResourcePolicy chia cho các worker, không lấy mọi core
+    assert worker_threads({"n_jobs": 4}, 2) == 2
+    assert worker_threads({"n_jobs": 1}, 4) == 1
+    assert worker_threads({"n_jobs": -1}, 1) == (os.cpu_count() or 1)
+    assert worker_threads(None, 1) == (os.cpu_count() or 1)
+
+
+def test_collect_results_fails_fast_when_worker_dies():
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(target=_post_result, args=(result_queue, 0)),
+        # Như bị OOM kill: thoát mà không gửi gì
+        ctx.Process(target=os._exit, args=(3,)),
+    ]
+    for process in processes:
+        process.start()
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="Worker 1 dừng"):
+        collect_results(result_queue, processes, timeout=60)
+    assert time.perf_counter() - start < 10
+    for process in processes:
+        process.join()
+
+
+def test_collect_results_returns_every_rank():
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(target=_post_result, args=(result_queue, rank)) for rank in range(2)
+    ]
+    for process in processes:
+        process.start()
+    results = collect_results(result_queue, processes, timeout=60)
+    assert results == {0: {"rank": 0}, 1: {"rank": 1}}
+    for process in processes:
+        process.join()
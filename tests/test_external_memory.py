@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import PARTIAL_HOUSE
+from model import HousePriceModel
+
+
+@pytest.fixture
+def form_csv(form_data, tmp_path):
+    path = tmp_path / "house_data.csv"
+    form_data.to_csv(path, index=False)
+    return str(path)
+
+
+def test_external_memory_drops_stale_category_maps(form_csv, tmp_path):
+    # Model dùng lâu (như model global của API) lần trước train có cột categorical
+    model = HousePriceModel(model_path=str(tmp_path / "model.pkl"))
+    model.category_maps = {"district": {"Quận 1": 0, "Quận 3": 1}}
+
+    model.train(
+        data_path=form_csv,
+        external_memory=True,
+        chunk_size=1000,
+        params={"n_estimators": 20, "n_jobs": 1},
+    )
+    assert model.category_maps is None
+    assert model.predict(PARTIAL_HOUSE) > 0
+
+
+def test_external_memory_model_serves_like_in_memory(form_csv, tmp_path):
+    model = HousePriceModel(model_path=str(tmp_path / "model.pkl"))
+    model.train(
+        data_path=form_csv,
+        external_memory=True,
+        chunk_size=500,
+        params={"n_estimators": 20, "n_jobs": 1},
+    )
+    # Preprocessing, drift và comps có như train in-memory
+    assert model.transformer is not None
+    assert model.drift_reference is not None
+    assert model.comps_index is not None
+
+    reloaded = HousePriceModel(model_path=model.model_path)
+    reloaded.load()
+    X = reloaded.transformer.transform(PARTIAL_HOUSE)
+    assert reloaded.predict(PARTIAL_HOUSE) == float(reloaded.model.predict(X)[0])
+    assert reloaded.predict(PARTIAL_HOUSE) == model.predict(PARTIAL_HOUSE)
+    assert len(reloaded.comps_index.comps(X[0], k=3)) == 3
@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+
+from gazetteer import KM_PER_DEGREE, get_gazetteer
+from pricing import apply_location, apply_location_batch
+
+
+def _nearest_brute_force(gazetteer, lat, lng):
+    """Quận gần nhất tính trên mọi quận (không qua lưới ứng viên)"""
+    best, best_distance = None, gazetteer.max_distance_km
+    for district in gazetteer.districts:
+        distance = math.hypot(
+            (lng - district["lng"]) * gazetteer._lng_scale,
+            (lat - district["lat"]) * KM_PER_DEGREE,
+        )
+        if distance <= best_distance:
+            best, best_distance = district["name"], distance
+    return best
+
+
+def test_resolve_district_centers():
+    gazetteer = get_gazetteer()
+    for district in gazetteer.districts:
+        resolved = gazetteer.resolve(district["lat"], district["lng"])
+        assert resolved["name"] == district["name"]
+        assert resolved["premium"] == district["premium"]
+        assert resolved["distance_km"] == 0
+    # Hà Nội nằm ngoài vùng của gazetteer TP.HCM
+    assert gazetteer.resolve(21.0285, 105.8542) is None
+
+
+def test_resolve_batch_matches_brute_force():
+    gazetteer = get_gazetteer()
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(10.3, 11.3, 2000)
+    lngs = rng.uniform(106.2, 107.2, 2000)
+    batch = gazetteer.resolve_batch(lats, lngs)
+
+    for i, (lat, lng) in enumerate(zip(lats.tolist(), lngs.tolist())):
+        expected = _nearest_brute_force(gazetteer, lat, lng)
+        single = gazetteer.resolve(lat, lng)
+        if expected is None:
+            assert single is None and batch["index"][i] == -1
+            assert np.isnan(batch["premium"][i])
+        else:
+            assert single["name"] == expected
+            assert gazetteer.name(batch["index"][i]) == expected
+            assert batch["premium"][i] == single["premium"]
+    # Mẫu phủ cả điểm trong và ngoài vùng
+    assert 0 < (batch["index"] >= 0).sum() < len(lats)
+
+
+def test_apply_location_batch_matches_single():
+    houses = [
+        {"lat": 10.7769, "lng": 106.7009},
+        {"lat": 21.0285, "lng": 105.8542, "location": "Quận 7"},
+        {"location": "Huyện Củ Chi", "location_score": 4.0},
+        {},
+    ]
+    singles = [dict(house) for house in houses]
+    batch = [dict(house) for house in houses]
+    premiums = [apply_location(house) for house in singles]
+    assert apply_location_batch(batch) == premiums
+    assert batch == singles
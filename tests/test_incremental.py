@@ -0,0 +1,26 @@
+from comps import build_comps_index
+from model import HousePriceModel
+
+
+def test_incremental_keeps_comps_index(model_copy, processed):
+    df, _ = processed
+    old, new = df.iloc[:2000], df.iloc[2000:]
+    build_comps_index(model_copy, old.iloc[:, :-1].values, old.iloc[:, -1].values)
+
+    model_copy.train(
+        X=new.iloc[:, :-1],
+        y=new.iloc[:, -1],
+        incremental="append",
+        incremental_rounds=5,
+    )
+    # Căn cũ cộng phần train (80%) của dữ liệu mới, đúng version mới
+    index = model_copy.comps_index
+    assert index is not None
+    assert index.metadata["rows"] == 2000 + int(len(new) * 0.8)
+    assert index.metadata["model_version"] == model_copy.version
+    assert model_copy.lineage[-1]["evaluated_on"] == "new_data_holdout"
+
+    reloaded = HousePriceModel(model_path=model_copy.model_path)
+    reloaded.load()
+    assert reloaded.comps_index is not None
+    assert len(reloaded.comps_index.comps(old.iloc[0, :-1].values, k=1)) == 1
@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+
+import pandas as pd
+
+from ingestion import load_processed
+
+
+def _ingest(data_path, cache_dir):
+    load_processed(data_path, dataset_type="generic", cache_dir=cache_dir)
+
+
+def test_workers_ingesting_same_file_share_one_cache(form_data, tmp_path):
+    data_path = str(tmp_path / "house_data.csv")
+    form_data.to_csv(data_path, index=False)
+    cache_dir = str(tmp_path / "cache")
+
+    # Như nhiều worker API cùng train trên một file: mỗi lần ghi một file tạm riêng
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=_ingest, args=(data_path, cache_dir)) for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0, 0, 0]
+    assert not [name for name in os.listdir(cache_dir) if name.endswith(".tmp")]
+
+    expected, transformer = load_processed(
+        data_path, dataset_type="generic", use_cache=False, return_transformer=True
+    )
+    cached, cached_transformer = load_processed(
+        data_path, dataset_type="generic", cache_dir=cache_dir, return_transformer=True
+    )
+    pd.testing.assert_frame_equal(cached, expected, check_dtype=False)
+    assert cached_transformer.features == transformer.features
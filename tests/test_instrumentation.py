@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT_DIR
+from instrumentation import TrainingInstrumentation, _reset_peak_rss
+
+
+def _training_logger_handlers(code):
+    """Số handler của logger train sau khi chạy code trong process mới"""
+    script = (
+        f"{code}\n"
+        "import logging\n"
+        "print(len(logging.getLogger('house_price.training').handlers))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return int(output.split()[-1])
+
+
+def test_import_does_not_configure_logging():
+    assert _training_logger_handlers("import model, ingestion, tuning") == 0
+
+
+def test_configure_logging_adds_one_handler():
+    code = (
+        "from instrumentation import configure_logging\n"
+        "configure_logging()\n"
+        "configure_logging()"
+    )
+    assert _training_logger_handlers(code) == 1
+
+
+def test_stage_times_sums_repeated_stages():
+    instrumentation = TrainingInstrumentation()
+    for _ in range(2):
+        with instrumentation.stage("fit"):
+            pass
+    times = instrumentation.stage_times()
+    assert list(times) == ["fit"]
+    assert times["fit"] == sum(r["duration_s"] for r in instrumentation.stages)
+
+
+@pytest.mark.skipif(not _reset_peak_rss(), reason="cần /proc/self/clear_refs")
+def test_outer_stage_peak_includes_nested_stages():
+    instrumentation = TrainingInstrumentation()
+    with instrumentation.stage("distributed_train"):
+        with instrumentation.stage("comps_index"):
+            block = np.ones(50_000_000)  # ~400 MB
+            del block
+        with instrumentation.stage("save"):
+            pass
+    comps, save, outer = instrumentation.stages
+    assert comps["peak_rss_mb"] > save["peak_rss_mb"] + 300
+    # Bước save reset VmHWM nhưng peak của bước ngoài vẫn gồm comps_index
+    assert outer["peak_rss_mb"] >= comps["peak_rss_mb"]
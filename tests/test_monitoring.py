@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pytest
+
+from monitoring import (
+    MIN_OBSERVATIONS,
+    DriftMonitor,
+    build_reference,
+    distribution_distances,
+)
+
+
+def _predict(X):
+    return X[:, 0] * 2
+
+
+@pytest.fixture
+def reference():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.normal(100, 20, 5000), rng.integers(1, 6, 5000)])
+    X[:50, 1] = np.nan
+    return build_reference(X, _predict, ["area", "bedrooms"], n_bins=10)
+
+
+def test_reference_histograms_use_train_quantiles(reference):
+    area, bedrooms = reference["counts"]
+    assert len(reference["edges"][0]) == 9
+    # Bin quantile gần đều, bin cuối là giá trị thiếu
+    assert sum(area) == 5000 and area[-1] == 0
+    assert max(area[:-1]) - min(area[:-1]) <= 1
+    assert bedrooms[-1] == 50
+    # Feature ít giá trị: bỏ biên trùng nhau
+    assert len(reference["edges"][1]) < 9
+
+
+def test_distribution_distances_known_values():
+    same = distribution_distances([10, 30, 60, 0], [1, 3, 6, 0])
+    assert same == {"psi": 0.0, "js_distance": 0.0, "ks": 0.0}
+
+    distances = distribution_distances([50, 50, 0], [25, 75, 0])
+    psi = (0.25 - 0.5) * math.log(0.25 / 0.5) + (0.75 - 0.5) * math.log(0.75 / 0.5)
+    assert distances["psi"] == pytest.approx(psi, abs=1e-4)
+    assert distances["ks"] == 0.25
+
+
+def test_update_and_update_batch_agree(reference):
+    rng = np.random.default_rng(1)
+    X = np.column_stack([rng.normal(100, 20, 300), rng.integers(1, 6, 300)])
+    X[::7, 1] = np.nan
+    one_by_one = DriftMonitor(reference)
+    for row, prediction in zip(X.tolist(), _predict(X).tolist()):
+        one_by_one.update([None if np.isnan(v) else v for v in row], prediction)
+    batched = DriftMonitor(reference)
+    batched.update_batch(X, _predict(X))
+
+    assert one_by_one.counts == batched.counts
+    assert one_by_one.prediction_counts == batched.prediction_counts
+    assert one_by_one.observations == batched.observations == 300
+
+
+def test_report_flags_shifted_feature(reference):
+    rng = np.random.default_rng(2)
+    n = MIN_OBSERVATIONS * 2
+    X = np.column_stack([rng.normal(140, 20, n), rng.integers(1, 6, n)])
+    monitor = DriftMonitor(reference, model_version="v1")
+    monitor.update_batch(X[:10], _predict(X[:10]))
+    assert monitor.report()["features"]["area"]["status"] == "insufficient_data"
+
+    monitor.update_batch(X[10:], _predict(X[10:]))
+    report = monitor.report()
+    assert report["drifted_features"] == ["area"]
+    assert report["features"]["bedrooms"]["status"] == "ok"
+    assert report["prediction"]["status"] == "drift"
+    assert report["observations"] == n and report["reference_rows"] == 5000
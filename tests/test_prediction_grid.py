@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import SMALL_AXES
+from prediction_grid import GRID_FEATURES, build_prediction_grid, grid_paths
+
+
+@pytest.fixture
+def model(model_copy):
+    """Lưới ghi cạnh file model copy, không đụng tới trained_model"""
+    return model_copy
+
+
+def test_grid_matches_booster(model):
+    metadata = build_prediction_grid(
+        model, axes=SMALL_AXES, sample_size=2000, max_rel_error=1, max_p99_rel_error=1
+    )
+    assert metadata["installed"]
+    grid = model.prediction_grid
+
+    # Tại điểm lưới, tra lưới cho đúng dự đoán của booster
+    rng = np.random.default_rng(0)
+    X = np.empty((500, len(GRID_FEATURES)), dtype=np.float32)
+    for column, feature in enumerate(GRID_FEATURES):
+        start, stop, step, _ = grid.axes[feature]
+        n = int(round((stop - start) / step)) + 1
+        X[:, column] = start + step * rng.integers(0, n, len(X))
+    np.testing.assert_allclose(grid.lookup_batch(X), model.model.predict(X), rtol=1e-6)
+
+    # Dict trong lưới đi qua lưới, khớp lookup
+    house = {"area": 100.0, "bedrooms": 2, "bathrooms": 2, "floors": 1}
+    house.update(year_built=2000, location_score=5.0)
+    assert model.predict(house) == pytest.approx(grid.lookup(house))
+
+
+def test_grid_rejected_above_error_threshold(model):
+    values_path, metadata_path = grid_paths(model.model_path)
+    build_prediction_grid(
+        model, axes=SMALL_AXES, sample_size=2000, max_rel_error=1, max_p99_rel_error=1
+    )
+    assert os.path.exists(values_path)
+
+    metadata = build_prediction_grid(
+        model, axes=SMALL_AXES, sample_size=2000, max_rel_error=0
+    )
+    assert not metadata["installed"]
+    assert model.prediction_grid is None
+    assert not os.path.exists(values_path) and not os.path.exists(metadata_path)
+
+    house = {"area": 125.0, "bedrooms": 2, "bathrooms": 2, "floors": 1}
+    house.update(year_built=2003, location_score=6.0)
+    X = model.transformer.transform(house)
+    assert model.predict(house) == float(model.model.predict(X)[0])
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT_DIR
+
+
+def _location_in_new_process(hash_seed):
+    """(location_score, premium) của một địa chỉ trong process có PYTHONHASHSEED khác"""
+    script = (
+        "from pricing import apply_location\n"
+        "features = {'location': '45 Lê Lợi, Quận 1'}\n"
+        "premium = apply_location(features)\n"
+        "print(features['location_score'], premium)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT_DIR,
+        env=dict(os.environ, PYTHONHASHSEED=str(hash_seed)),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return output.split()[-2:]
+
+
+def test_address_premium_is_the_same_in_every_worker():
+    # Cache dự đoán dùng chung giữa các worker: giá phải không phụ thuộc process
+    assert _location_in_new_process(1) == _location_in_new_process(2)
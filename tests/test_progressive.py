@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import app as app_module
+import progressive
+from model import HousePriceModel
+
+PARAMS = {"n_estimators": 50, "n_jobs": 1}
+
+
+@pytest.fixture
+def preview(processed, tmp_path):
+    """Train giai đoạn preview trên dữ liệu nhỏ, trả về hàm train giai đoạn"""
+    df, transformer = processed
+    model_path = str(tmp_path / "model.pkl")
+
+    def train(stage):
+        model = HousePriceModel(model_path=model_path)
+        return model, model.train(
+            X=df.iloc[:, :-1],
+            y=df.iloc[:, -1],
+            params=PARAMS,
+            progressive=stage,
+            transformer=transformer,
+            comps_index=False,
+        )
+
+    return train
+
+
+def test_full_stage_published_when_better(preview, monkeypatch):
+    # Preview chỉ dùng 10% tập train nên model full tốt hơn
+    monkeypatch.setattr(progressive, "PREVIEW_MIN_ROWS", 100)
+    preview_model, _ = preview("preview")
+    assert preview_model.progressive["full"]["status"] == "running"
+
+    full_model, result = preview("full")
+    assert result["progressive"]["full"]["status"] == "published"
+    saved = HousePriceModel(model_path=full_model.model_path)
+    saved.load()
+    assert saved.metrics["rmse"] < preview_model.metrics["rmse"]
+    assert [entry.get("stage") for entry in saved.lineage] == ["preview", "full"]
+
+
+def test_full_stage_rejected_keeps_preview(preview):
+    # Tập train nhỏ hơn PREVIEW_MIN_ROWS: preview đã dùng toàn bộ dữ liệu
+    preview_model, _ = preview("preview")
+    _, result = preview("full")
+    assert result["progressive"]["full"]["status"] == "rejected"
+
+    saved = HousePriceModel(model_path=preview_model.model_path)
+    saved.load()
+    assert saved.version == preview_model.version
+    assert saved.progressive["full"]["status"] == "rejected"
+
+
+def test_failed_full_stage_is_persisted(preview, monkeypatch):
+    preview_model, _ = preview("preview")
+
+    async def fail(*args):
+        raise MemoryError("full stage")
+
+    monkeypatch.setattr(app_module, "model", preview_model)
+    monkeypatch.setattr(app_module, "_train_in_background", fail)
+    asyncio.run(app_module._progressive_full_stage({}, "data.csv"))
+
+    # Worker khác / lần khởi động sau đọc trạng thái từ file model
+    saved = HousePriceModel(model_path=preview_model.model_path)
+    saved.load()
+    assert saved.progressive["full"]["status"] == "failed"
+    assert "full stage" in saved.progressive["full"]["error"]
+    assert preview_model.progressive["full"]["status"] == "failed"
+    with pytest.raises(RuntimeError, match="bị thay thế"):
+        preview("full")
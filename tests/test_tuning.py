@@ -0,0 +1,47 @@
+import json
+
+from conftest import PARTIAL_HOUSE
+from model import HousePriceModel
+
+
+def test_tuned_model_keeps_transformer(processed, tmp_path):
+    df, transformer = processed
+    model = HousePriceModel(model_path=str(tmp_path / "model.pkl"))
+    model.train(
+        X=df.iloc[:, :-1],
+        y=df.iloc[:, -1],
+        tune="random",
+        n_trials=2,
+        tune_workers=1,
+        transformer=transformer,
+    )
+
+    loaded = HousePriceModel(model_path=model.model_path)
+    loaded.load()
+    assert loaded.transformer is not None
+    assert loaded.transformer.features == loaded.feature_names
+    # Trường thiếu được điền median lúc train, không phải 0
+    X = loaded.transformer.transform(PARTIAL_HOUSE)
+    assert loaded.predict(PARTIAL_HOUSE) == float(loaded.model.predict(X)[0])
+
+
+def test_tuning_respects_thread_budget(processed, tmp_path):
+    df, transformer = processed
+    model = HousePriceModel(model_path=str(tmp_path / "model.pkl"))
+    result = model.train(
+        X=df.iloc[:, :-1],
+        y=df.iloc[:, -1],
+        tune="random",
+        n_trials=2,
+        tune_workers=4,
+        params={"n_jobs": 1},
+        transformer=transformer,
+    )
+
+    assert result["tuning"]["best_params"]["n_jobs"] == 1
+    assert model.hyperparameters["n_jobs"] == 1
+    assert model.model.get_params()["n_jobs"] == 1
+    with open(result["tuning"]["leaderboard_path"]) as f:
+        trials = json.load(f)["trials"]
+    # Ngân sách 1 thread: chỉ một worker dù tune_workers=4
+    assert len({trial["worker_pid"] for trial in trials}) == 1
@@ -49,6 +49,9 @@ def generate_sample_data(n_samples=1000, save_path='data/house_data.csv'):
 
 
 if __name__ == "__main__":
+    from instrumentation import configure_logging
+
+    configure_logging()
     # Kiểm tra xem có dữ liệu chưa
     data_path = 'data/house_data.csv'
     
@@ -7,12 +7,162 @@ import warnings
 
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-
+from feature_transformer import FeatureTransformer
 from model import HousePriceModel
 
 warnings.filterwarnings("ignore")
 
+# Thứ tự features mà form có thể cung cấp
+FEATURE_ORDER = [
+    "area",
+    "bedrooms",
+    "bathrooms",
+    "floors",
+    "year_built",
+    "location_score",
+]
+
+# Cột nguồn đặc biệt: cột feature đầu tiên của dataset
+FIRST_COLUMN = "__first_column__"
+
+# Cột định danh, không dùng làm feature khi train full features
+ID_COLUMNS = ["Id", "id", "PID"]
+
+
+# Spec map dữ liệu về features của form:
+#   feature -> (danh sách (cột nguồn, tên phép tính) thử theo thứ tự, giá trị mặc định)
+# Rule đầu tiên mà dataset có đủ cột nguồn sẽ được dùng. Phép tính tham chiếu
+# theo tên trong feature_transformer.DERIVATIONS để lưu được cùng model
+GENERIC_FEATURE_SPEC = {
+    "area": (
+        [
+            (("area",), "identity"),
+            (("LotArea",), "identity"),
+            (("GrLivArea",), "identity"),
+            (("TotalBsmtSF",), "identity"),
+            (("1stFlrSF",), "identity"),
+            (("LotFrontage",), "identity"),
+            ((FIRST_COLUMN,), "identity"),
+        ],
+        100,
+    ),
+    "bedrooms": (
+        [
+            (("bedrooms",), "identity"),
+            (("BedroomAbvGr",), "identity"),
+            (("Bedrooms",), "identity"),
+            (("BR",), "identity"),
+        ],
+        3,
+    ),
+    "bathrooms": (
+        [
+            (("bathrooms",), "identity"),
+            (("FullBath", "HalfBath"), "full_half_bath"),
+            (("FullBath",), "identity"),
+            (("BsmtFullBath", "BsmtHalfBath"), "full_half_bath"),
+            (("BsmtFullBath",), "identity"),
+        ],
+        2,
+    ),
+    "floors": (
+        [
+            (("floors",), "identity"),
+            (("2ndFlrSF",), "floors_from_2nd_floor"),
+        ],
+        1,
+    ),
+    "year_built": (
+        [
+            (("year_built",), "identity"),
+            (("YearBuilt",), "identity"),
+            (("YearRemodAdd",), "identity"),
+            (("YrBuilt",), "identity"),
+        ],
+        2000,
+    ),
+    "location_score": (
+        [
+            (("location_score",), "identity"),
+            (("OverallQual",), "quality_to_score"),
+            (("OverallCond",), "quality_to_score"),
+        ],
+        5.0,
+    ),
+}
+
+# Ames dùng sqft, convert sang m²
+AMES_FEATURE_SPEC = {
+    "area": (
+        [
+            (("GrLivArea",), "sqft_to_m2"),
+            (("LotArea",), "sqft_to_m2"),
+            (("TotalBsmtSF", "1stFlrSF"), "sum_sqft_to_m2"),
+        ],
+        100,
+    ),
+    "bedrooms": ([(("BedroomAbvGr",), "identity")], 3),
+    "bathrooms": (
+        [
+            (("FullBath", "HalfBath"), "full_half_bath"),
+            (("FullBath",), "identity"),
+        ],
+        2,
+    ),
+    "floors": ([(("2ndFlrSF",), "floors_from_2nd_floor")], 1),
+    "year_built": ([(("YearBuilt",), "identity")], 2000),
+    "location_score": ([(("OverallQual",), "quality_to_score")], 5.0),
+}
+
+
+def resolve_feature_spec(spec, columns):
+    """
+    Chọn rule cho từng feature dựa trên schema (danh sách cột feature)
+
+    Returns:
+        Dict feature -> (tuple cột nguồn, tên phép tính) hoặc ((), giá trị mặc định)
+    """
+    available = set(columns)
+    resolved = {}
+    for feature, (rules, default) in spec.items():
+        resolved[feature] = ((), default)
+        for source_cols, fn in rules:
+            if source_cols == (FIRST_COLUMN,):
+                if columns:
+                    resolved[feature] = ((columns[0],), fn)
+                    break
+            elif all(col in available for col in source_cols):
+                resolved[feature] = (source_cols, fn)
+                break
+    return resolved
+
+
+def spec_source_columns(resolved):
+    """Danh sách cột nguồn (không trùng, giữ thứ tự) mà spec đã resolve cần đọc"""
+    columns = []
+    for source_cols, _ in resolved.values():
+        for col in source_cols:
+            if col not in columns:
+                columns.append(col)
+    return columns
+
+
+def apply_feature_spec(df, resolved, fill_values=None):
+    """
+    Fit preprocessing theo spec đã resolve và tính các features
+
+    Cột số: điền missing bằng median (hoặc fill_values nếu có). Cột chuỗi:
+    label encode (thứ tự sorted như LabelEncoder). Những gì đã fit được giữ
+    trong FeatureTransformer để serving tính features giống hệt lúc train.
+
+    Returns:
+        (DataFrame features theo FEATURE_ORDER, FeatureTransformer)
+    """
+    transformer, X = FeatureTransformer.fit_transform(
+        df, {feature: resolved[feature] for feature in FEATURE_ORDER}, fill_values
+    )
+    return pd.DataFrame(X, columns=FEATURE_ORDER, index=df.index), transformer
+
 
 def preprocess_ames_data(df):
     """
@@ -21,95 +171,24 @@ def preprocess_ames_data(df):
     print("Đang xử lý dữ liệu Ames Housing...")
 
     # Lấy target (SalePrice)
-    if "SalePrice" in df.columns:
-        y = df["SalePrice"]
-        X = df.drop("SalePrice", axis=1)
-    else:
+    if "SalePrice" not in df.columns:
         raise ValueError("Không tìm thấy cột SalePrice trong dataset")
+    y = df["SalePrice"]
+    feature_columns = [col for col in df.columns if col != "SalePrice"]
 
-    # Xử lý missing values cho numerical columns
-    numerical_cols = X.select_dtypes(include=[np.number]).columns
-    X[numerical_cols] = X[numerical_cols].fillna(X[numerical_cols].median())
-
-    # Xử lý missing values cho categorical columns
-    categorical_cols = X.select_dtypes(include=["object"]).columns
-    X[categorical_cols] = X[categorical_cols].fillna("Unknown")
-
-    # Label encoding cho categorical columns
-    label_encoders = {}
-    for col in categorical_cols:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col].astype(str))
-        label_encoders[col] = le
-
-    # Map về các features mà form có thể cung cấp
-    # Form có: area, bedrooms, bathrooms, floors, year_built, location_score
-    X_mapped = pd.DataFrame()
-
-    # Mapping area (diện tích) - Ames dùng sqft, cần convert sang m²
-    # 1 sqft ≈ 0.0929 m², nhưng để đơn giản ta dùng trực tiếp sqft
-    if "GrLivArea" in X.columns:
-        # GrLivArea là diện tích sống chính (sqft)
-        X_mapped["area"] = X["GrLivArea"] * 0.0929  # Convert sqft to m²
-    elif "LotArea" in X.columns:
-        X_mapped["area"] = X["LotArea"] * 0.0929
-    elif "TotalBsmtSF" in X.columns and "1stFlrSF" in X.columns:
-        X_mapped["area"] = (X["TotalBsmtSF"] + X["1stFlrSF"]) * 0.0929
-    else:
-        X_mapped["area"] = 100  # Default
-
-    # Mapping bedrooms
-    if "BedroomAbvGr" in X.columns:
-        X_mapped["bedrooms"] = X["BedroomAbvGr"]
-    else:
-        X_mapped["bedrooms"] = 3
-
-    # Mapping bathrooms
-    if "FullBath" in X.columns:
-        X_mapped["bathrooms"] = X["FullBath"] + (
-            X["HalfBath"] * 0.5 if "HalfBath" in X.columns else 0
-        )
-    else:
-        X_mapped["bathrooms"] = 2
-
-    # Mapping floors
-    if "2ndFlrSF" in X.columns:
-        X_mapped["floors"] = (X["2ndFlrSF"] > 0).astype(int) + 1
-    else:
-        X_mapped["floors"] = 1
-
-    # Mapping year_built
-    if "YearBuilt" in X.columns:
-        X_mapped["year_built"] = X["YearBuilt"]
-    else:
-        X_mapped["year_built"] = 2000
-
-    # Mapping location_score (từ OverallQual)
-    if "OverallQual" in X.columns:
-        X_mapped["location_score"] = X["OverallQual"] / 10.0  # Scale từ 1-10
-    else:
-        X_mapped["location_score"] = 5.0
-
-    # Đảm bảo thứ tự features
-    feature_order = [
-        "area",
-        "bedrooms",
-        "bathrooms",
-        "floors",
-        "year_built",
-        "location_score",
-    ]
-    X_mapped = X_mapped[feature_order]
+    # Chỉ xử lý các cột nguồn thật sự dùng cho 6 features của form
+    resolved = resolve_feature_spec(AMES_FEATURE_SPEC, feature_columns)
+    X_mapped, transformer = apply_feature_spec(df, resolved)
 
     # Thêm target
     X_mapped["Price"] = y
 
-    print(f"✓ Đã map Ames Housing về {len(feature_order)} features: {feature_order}")
+    print(f"✓ Đã map Ames Housing về {len(FEATURE_ORDER)} features: {FEATURE_ORDER}")
     print(
         f"✓ Diện tích range: {X_mapped['area'].min():.1f} - {X_mapped['area'].max():.1f} m²"
     )
 
-    return X_mapped, label_encoders
+    return X_mapped, transformer
 
 
 def preprocess_california_housing(df):
@@ -133,150 +212,139 @@ def preprocess_california_housing(df):
     return df
 
 
-def preprocess_generic_data(df, target_column=None):
+def detect_target_column(columns, log=print):
+    """
+    Tự động tìm cột target (ưu tiên 'price', 'value', 'target', 'y'),
+    nếu không có thì dùng cột cuối cùng
+    """
+    keywords = ["price", "value", "target", "y"]
+
+    for keyword in keywords:
+        matches = [col for col in columns if keyword in col.lower()]
+        if matches:
+            log(f"✓ Tự động phát hiện cột target: {matches[0]}")
+            return matches[0]
+
+    log(f"⚠ Sử dụng cột cuối cùng làm target: {columns[-1]}")
+    return columns[-1]
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def preprocess_generic_data(
+    df, target_column=None, fill_values=None, verbose=True, return_transformer=False
+):
     """
     Xử lý dataset tổng quát và map về các features mà form có thể cung cấp
+
+    Args:
+        df: DataFrame dữ liệu gốc
+        target_column: Tên cột target, None để tự động phát hiện
+        fill_values: Giá trị điền missing cho các cột số (Series/dict theo tên
+            cột). None để dùng median của chính df. Truyền vào khi xử lý theo
+            từng chunk để mọi chunk được điền giống nhau
+        verbose: In log quá trình xử lý
+        return_transformer: Trả về thêm FeatureTransformer đã fit
+
+    Returns:
+        DataFrame features (cột cuối là Price), hoặc (DataFrame,
+        FeatureTransformer) nếu return_transformer=True
     """
-    print("Đang xử lý dữ liệu...")
+    log = print if verbose else _silent
+    log("Đang xử lý dữ liệu...")
 
     # Tìm cột target
     if target_column:
         if target_column not in df.columns:
             raise ValueError(f"Không tìm thấy cột {target_column}")
-        y = df[target_column]
-        X = df.drop(target_column, axis=1)
     else:
-        # Tự động tìm cột target (ưu tiên 'price', 'value', 'target', 'y')
-        keywords = ["price", "value", "target", "y"]
-        target_column = None
-
-        for keyword in keywords:
-            matches = [col for col in df.columns if keyword in col.lower()]
-            if matches:
-                target_column = matches[0]
-                print(f"✓ Tự động phát hiện cột target: {target_column}")
-                break
+        target_column = detect_target_column(list(df.columns), log=log)
 
-        if not target_column:
-            target_column = df.columns[-1]
-            print(f"⚠ Sử dụng cột cuối cùng làm target: {target_column}")
-
-        y = df[target_column]
-        X = df.drop(target_column, axis=1)
-
-    # Xử lý missing values
-    numerical_cols = X.select_dtypes(include=[np.number]).columns
-    X[numerical_cols] = X[numerical_cols].fillna(X[numerical_cols].median())
-
-    categorical_cols = X.select_dtypes(include=["object"]).columns
-    if len(categorical_cols) > 0:
-        for col in categorical_cols:
-            le = LabelEncoder()
-            X[col] = le.fit_transform(X[col].astype(str))
-
-    # Map features về các features mà form có thể cung cấp
-    # Form có: area, bedrooms, bathrooms, floors, year_built, location_score
-    X_mapped = pd.DataFrame()
-
-    # Mapping area (diện tích)
-    area_cols = [
-        "area",
-        "LotArea",
-        "GrLivArea",
-        "TotalBsmtSF",
-        "1stFlrSF",
-        "LotFrontage",
-        "LotArea",
-    ]
-    for col in area_cols:
-        if col in X.columns:
-            X_mapped["area"] = X[col]
-            print(f"✓ Map {col} -> area")
-            break
-    if "area" not in X_mapped.columns:
-        # Nếu không tìm thấy, tính từ các cột liên quan
-        if "GrLivArea" in X.columns:
-            X_mapped["area"] = X["GrLivArea"]
-        elif "TotalBsmtSF" in X.columns and "1stFlrSF" in X.columns:
-            X_mapped["area"] = X["TotalBsmtSF"] + X["1stFlrSF"]
-        else:
-            X_mapped["area"] = X.iloc[:, 0] if len(X.columns) > 0 else 100
-            print("⚠ Không tìm thấy cột area, sử dụng cột đầu tiên")
-
-    # Mapping bedrooms
-    bedroom_cols = ["bedrooms", "BedroomAbvGr", "Bedrooms", "BR"]
-    for col in bedroom_cols:
-        if col in X.columns:
-            X_mapped["bedrooms"] = X[col]
-            print(f"✓ Map {col} -> bedrooms")
-            break
-    if "bedrooms" not in X_mapped.columns:
-        X_mapped["bedrooms"] = 3  # Default
-
-    # Mapping bathrooms
-    if "bathrooms" in X.columns:
-        X_mapped["bathrooms"] = X["bathrooms"]
-    elif "FullBath" in X.columns:
-        X_mapped["bathrooms"] = X["FullBath"] + (
-            X["HalfBath"] * 0.5 if "HalfBath" in X.columns else 0
-        )
-    elif "BsmtFullBath" in X.columns:
-        X_mapped["bathrooms"] = X["BsmtFullBath"] + (
-            X["BsmtHalfBath"] * 0.5 if "BsmtHalfBath" in X.columns else 0
-        )
-    else:
-        X_mapped["bathrooms"] = 2  # Default
+    y = df[target_column]
 
-    # Mapping floors
-    if "floors" in X.columns:
-        X_mapped["floors"] = X["floors"]
-    elif "2ndFlrSF" in X.columns:
-        X_mapped["floors"] = (X["2ndFlrSF"] > 0).astype(int) + 1
-    else:
-        X_mapped["floors"] = 1  # Default
-
-    # Mapping year_built
-    year_cols = ["year_built", "YearBuilt", "YearRemodAdd", "YrBuilt"]
-    for col in year_cols:
-        if col in X.columns:
-            X_mapped["year_built"] = X[col]
-            print(f"✓ Map {col} -> year_built")
-            break
-    if "year_built" not in X_mapped.columns:
-        X_mapped["year_built"] = 2000  # Default
-
-    # Mapping location_score (từ OverallQual hoặc OverallCond)
-    if "location_score" in X.columns:
-        X_mapped["location_score"] = X["location_score"]
-    elif "OverallQual" in X.columns:
-        X_mapped["location_score"] = X["OverallQual"] / 10.0  # Scale từ 1-10
-    elif "OverallCond" in X.columns:
-        X_mapped["location_score"] = X["OverallCond"] / 10.0
-    else:
-        X_mapped["location_score"] = 5.0  # Default
-
-    # Đảm bảo thứ tự features: area, bedrooms, bathrooms, floors, year_built, location_score
-    feature_order = [
-        "area",
-        "bedrooms",
-        "bathrooms",
-        "floors",
-        "year_built",
-        "location_score",
-    ]
-    X_mapped = X_mapped[feature_order]
+    # Chỉ xử lý các cột nguồn thật sự dùng cho 6 features của form
+    feature_columns = [col for col in df.columns if col != target_column]
+    resolved = resolve_feature_spec(GENERIC_FEATURE_SPEC, feature_columns)
+    for feature, (source_cols, _) in resolved.items():
+        if source_cols:
+            log(f"✓ Map {' + '.join(source_cols)} -> {feature}")
+    X_mapped, transformer = apply_feature_spec(df, resolved, fill_values=fill_values)
 
     # Thêm target
     X_mapped["Price"] = y
 
-    print(f"✓ Đã map về {len(feature_order)} features: {feature_order}")
+    log(f"✓ Đã map về {len(FEATURE_ORDER)} features: {FEATURE_ORDER}")
 
+    if return_transformer:
+        return X_mapped, transformer
     return X_mapped
 
 
-def train_with_dataset(data_path, dataset_type="auto"):
+def preprocess_full_features(df, target_column=None, verbose=True):
+    """
+    Giữ toàn bộ các cột của dataset (ví dụ 79 cột của Ames) thay vì chỉ 6
+    features của form
+
+    6 features của form vẫn được tính theo spec (để /predict từ form dùng
+    được), các cột còn lại giữ nguyên: cột số chuyển float32 (missing để NaN,
+    XGBoost tự xử lý), cột chuỗi chuyển pandas category để train bằng native
+    categorical của XGBoost, không label encode từng cột.
+
+    Returns:
+        DataFrame features (cột cuối là Price)
+    """
+    log = print if verbose else _silent
+    log("Đang xử lý dữ liệu (full features)...")
+
+    if target_column is None:
+        if "SalePrice" in df.columns:
+            target_column = "SalePrice"
+        else:
+            target_column = detect_target_column(list(df.columns), log=log)
+    elif target_column not in df.columns:
+        raise ValueError(f"Không tìm thấy cột {target_column}")
+
+    y = df[target_column]
+    feature_columns = [
+        col for col in df.columns if col != target_column and col not in ID_COLUMNS
+    ]
+
+    spec = AMES_FEATURE_SPEC if target_column == "SalePrice" else GENERIC_FEATURE_SPEC
+    resolved = resolve_feature_spec(spec, feature_columns)
+    X_form, _ = apply_feature_spec(df, resolved)
+
+    raw_columns = {}
+    for col in feature_columns:
+        if col in X_form.columns:
+            continue
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            raw_columns[col] = series.astype(np.float32)
+        else:
+            raw_columns[col] = series.astype("category")
+
+    X = pd.concat([X_form, pd.DataFrame(raw_columns, index=df.index)], axis=1)
+    X["Price"] = y
+
+    n_categorical = sum(1 for s in raw_columns.values() if s.dtype == "category")
+    log(
+        f"✓ Giữ {X.shape[1] - 1} features ({n_categorical} categorical, "
+        f"{X.shape[1] - 1 - n_categorical} số)"
+    )
+    return X
+
+
+def train_with_dataset(data_path, dataset_type="auto", **train_options):
     """
     Train model với dataset thật
+
+    Args:
+        dataset_type: "auto", "ames", "california", "generic" hoặc "full"
+            (giữ toàn bộ cột, cột chuỗi train bằng native categorical)
+        train_options: Tham số thêm cho HousePriceModel.train
+            (ví dụ quantile_dmatrix=True, max_bin=128)
     """
     if not os.path.exists(data_path):
         print(f"❌ Không tìm thấy file: {data_path}")
@@ -286,28 +354,28 @@ def train_with_dataset(data_path, dataset_type="auto"):
     print(f"Đang đọc dataset: {data_path}")
     print(f"{'=' * 60}\n")
 
-    try:
-        df = pd.read_csv(data_path)
-        print(f"✓ Đọc thành công: {len(df)} mẫu, {df.shape[1]} cột")
-        print(f"Columns: {list(df.columns[:10])}...")
-    except Exception as e:
-        print(f"❌ Lỗi khi đọc file: {e}")
-        return None
+    if dataset_type == "full":
+        pass
+    elif dataset_type == "ames" or "train.csv" in data_path.lower():
+        dataset_type = "ames"
+    elif dataset_type == "california" or "california" in data_path.lower():
+        dataset_type = "california"
+    else:
+        dataset_type = "generic"
 
-    # Xử lý dữ liệu
+    # Đọc và xử lý dữ liệu (chỉ các cột cần dùng, có cache theo hash file gốc)
     try:
-        if dataset_type == "ames" or "train.csv" in data_path.lower():
-            df_processed, _ = preprocess_ames_data(df)
-        elif dataset_type == "california" or "california" in data_path.lower():
-            df_processed = preprocess_california_housing(df)
-        else:
-            df_processed = preprocess_generic_data(df)
+        from ingestion import load_processed
 
-        # Lưu dữ liệu đã xử lý
-        processed_path = "data/processed_data.csv"
-        os.makedirs("data", exist_ok=True)
-        df_processed.to_csv(processed_path, index=False)
-        print(f"\n✓ Đã lưu dữ liệu đã xử lý tại: {processed_path}")
+        from instrumentation import TrainingInstrumentation
+
+        instrumentation = TrainingInstrumentation()
+        df_processed, transformer = load_processed(
+            data_path,
+            dataset_type=dataset_type,
+            instrumentation=instrumentation,
+            return_transformer=True,
+        )
 
         # Train model
         print(f"\n{'=' * 60}")
@@ -315,7 +383,13 @@ def train_with_dataset(data_path, dataset_type="auto"):
         print(f"{'=' * 60}\n")
 
         model = HousePriceModel(model_path="models/house_price_model.pkl")
-        result = model.train(data_path=processed_path)
+        result = model.train(
+            X=df_processed.iloc[:, :-1],
+            y=df_processed.iloc[:, -1],
+            instrumentation=instrumentation,
+            transformer=transformer,
+            **train_options,
+        )
 
         print(f"\n{'=' * 60}")
         print("✓ Train model thành công!")
@@ -343,6 +417,10 @@ def train_with_dataset(data_path, dataset_type="auto"):
 if __name__ == "__main__":
     import sys
 
+    from instrumentation import configure_logging
+
+    configure_logging()
+
     print("=" * 60)
     print("Train Model với Dataset Thật")
     print("=" * 60)
@@ -373,9 +451,13 @@ if __name__ == "__main__":
     for i, f in enumerate(available_files, 1):
         print(f"  {i}. {f}")
 
+    # --full-features: train trên toàn bộ cột với native categorical
+    full_features = "--full-features" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--full-features"]
+
     # Sử dụng file đầu tiên hoặc file được chỉ định
-    if len(sys.argv) > 1:
-        data_path = sys.argv[1]
+    if args:
+        data_path = args[0]
     else:
         data_path = available_files[0]
         print(f"\nSử dụng: {data_path}")
@@ -386,6 +468,8 @@ if __name__ == "__main__":
         dataset_type = "ames"
     elif "california" in data_path.lower():
         dataset_type = "california"
+    if full_features:
+        dataset_type = "full"
 
     # Train
     train_with_dataset(data_path, dataset_type)
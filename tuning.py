@@ -0,0 +1,331 @@
+"""
+Tìm hyperparameters song song (random search hoặc successive halving)
+
+Feature matrix đã preprocess được ghi một lần ra file .npy; các worker mở
+bằng memory map (read-only) nên dùng chung page cache, không phải đọc và
+parse lại CSV. Mỗi trial dùng early stopping trên tập validation. Model tốt
+nhất được train lại trên toàn bộ tập train (cùng cách chia với
+HousePriceModel.train) và lưu như bình thường, kèm leaderboard JSON.
+
+Chạy:
+    python tuning.py data/large_house_data.csv --strategy halving --n-trials 32
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+
+from model import XGB_PARAMS, booster_params
+
+# Số cây tối đa mỗi trial (early stopping sẽ dừng sớm hơn)
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 30
+# Successive halving: giữ 1/HALVING_ETA số trial tốt nhất sau mỗi vòng
+HALVING_ETA = 3
+HALVING_MIN_ROUNDS = 50
+
+# Không gian tìm kiếm: (kiểu phân phối, min, max)
+SEARCH_SPACE = {
+    "max_depth": ("int", 3, 10),
+    "learning_rate": ("log", 0.01, 0.3),
+    "min_child_weight": ("log", 1, 20),
+    "subsample": ("uniform", 0.5, 1.0),
+    "colsample_bytree": ("uniform", 0.5, 1.0),
+    "reg_alpha": ("log", 1e-3, 10),
+    "reg_lambda": ("log", 1e-3, 10),
+}
+
+# Dữ liệu dùng chung trong mỗi worker process (mở một lần khi khởi động)
+_shared = {}
+
+
+def sample_params(rng):
+    """Lấy ngẫu nhiên một bộ hyperparameters từ SEARCH_SPACE"""
+    params = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if kind == "int":
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def _init_worker(matrix_dir, max_bin, nthread):
+    """Mở feature matrix bằng memmap và dựng DMatrix một lần cho mỗi worker"""
+    X_fit = np.load(os.path.join(matrix_dir, "X_fit.npy"), mmap_mode="r")
+    y_fit = np.load(os.path.join(matrix_dir, "y_fit.npy"), mmap_mode="r")
+    X_val = np.load(os.path.join(matrix_dir, "X_val.npy"), mmap_mode="r")
+    y_val = np.load(os.path.join(matrix_dir, "y_val.npy"), mmap_mode="r")
+
+    dfit = xgb.QuantileDMatrix(X_fit, y_fit, max_bin=max_bin, nthread=nthread)
+    dval = xgb.QuantileDMatrix(X_val, y_val, ref=dfit, nthread=nthread)
+    _shared.update(dfit=dfit, dval=dval, max_bin=max_bin, nthread=nthread)
+
+
+def _run_trial(trial_id, params, n_rounds):
+    """Train một trial với early stopping, trả về một dòng leaderboard"""
+    trial_params = dict(
+        XGB_PARAMS,
+        **params,
+        n_estimators=n_rounds,
+        n_jobs=_shared["nthread"],
+        tree_method="hist",
+        max_bin=_shared["max_bin"],
+    )
+    native_params, num_boost_round = booster_params(trial_params)
+    native_params["eval_metric"] = "rmse"
+
+    start = time.perf_counter()
+    booster = xgb.train(
+        native_params,
+        _shared["dfit"],
+        num_boost_round=num_boost_round,
+        evals=[(_shared["dval"], "val")],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        verbose_eval=False,
+    )
+    return {
+        "trial": trial_id,
+        "params": params,
+        "n_rounds": n_rounds,
+        "best_iteration": int(booster.best_iteration),
+        "val_rmse": float(booster.best_score),
+        "wall_time_s": round(time.perf_counter() - start, 3),
+        "worker_pid": os.getpid(),
+    }
+
+
+def _halving_rungs(n_trials, max_rounds):
+    """Số trial và số cây cho mỗi vòng successive halving"""
+    n_rungs = max(1, int(math.log(max_rounds / HALVING_MIN_ROUNDS, HALVING_ETA)) + 1)
+    n_rungs = min(n_rungs, max(1, int(math.log(n_trials, HALVING_ETA)) + 1))
+    rungs = []
+    for rung in range(n_rungs):
+        n_keep = max(1, n_trials // HALVING_ETA**rung)
+        n_rounds = max_rounds // HALVING_ETA ** (n_rungs - 1 - rung)
+        rungs.append((n_keep, n_rounds))
+    return rungs
+
+
+def prepare_shared_matrix(X, y, matrix_dir):
+    """
+    Chia train/test giống HousePriceModel.train, chia tiếp phần train thành
+    fit/val cho các trial và ghi ra .npy float32 để worker memmap
+    """
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=42
+    )
+    for name, array in (
+        ("X_fit", X_fit),
+        ("y_fit", y_fit),
+        ("X_val", X_val),
+        ("y_val", y_val),
+    ):
+        np.save(
+            os.path.join(matrix_dir, f"{name}.npy"),
+            np.ascontiguousarray(array, dtype=np.float32),
+        )
+    return len(X_fit), len(X_val)
+
+
+def thread_budget(n_jobs=None):
+    """Tổng số thread được dùng: n_jobs nếu dương, ngược lại số CPU"""
+    if n_jobs is not None and n_jobs > 0:
+        return n_jobs
+    return os.cpu_count() or 1
+
+
+def run_search(
+    matrix_dir,
+    strategy="random",
+    n_trials=20,
+    n_workers=None,
+    max_bin=256,
+    seed=42,
+    n_jobs=None,
+):
+    """
+    Chạy search song song trên matrix đã chuẩn bị
+
+    Args:
+        n_jobs: Tổng số thread của cả search (ngân sách training), chia đều
+            cho các worker; None hoặc -1 = số CPU
+
+    Returns:
+        Leaderboard (list các trial, tốt nhất trước)
+    """
+    if strategy not in ("random", "halving"):
+        raise ValueError(f"strategy không hợp lệ: {strategy}")
+
+    threads = thread_budget(n_jobs)
+    # Không chạy nhiều worker hơn số thread được cấp
+    n_workers = min(n_workers or threads, threads)
+    nthread = max(1, threads // n_workers)
+    rng = np.random.default_rng(seed)
+    candidates = [(trial_id, sample_params(rng)) for trial_id in range(n_trials)]
+
+    if strategy == "random":
+        rungs = [(n_trials, MAX_ROUNDS)]
+    else:
+        rungs = _halving_rungs(n_trials, MAX_ROUNDS)
+
+    leaderboard = []
+    # spawn thay vì fork để không kế thừa thread pool của XGBoost/uvicorn
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(matrix_dir, max_bin, nthread),
+    ) as executor:
+        for rung, (n_keep, n_rounds) in enumerate(rungs):
+            candidates = candidates[:n_keep]
+            print(
+                f"Vòng {rung + 1}/{len(rungs)}: {len(candidates)} trial x {n_rounds} cây"
+            )
+            futures = [
+                executor.submit(_run_trial, trial_id, params, n_rounds)
+                for trial_id, params in candidates
+            ]
+            results = [future.result() for future in futures]
+            for result in results:
+                result["rung"] = rung
+            leaderboard.extend(results)
+
+            results.sort(key=lambda r: r["val_rmse"])
+            best_ids = [r["trial"] for r in results]
+            params_by_id = dict(candidates)
+            candidates = [(trial_id, params_by_id[trial_id]) for trial_id in best_ids]
+
+    # Xếp hạng theo vòng cao nhất rồi theo val_rmse
+    leaderboard.sort(key=lambda r: (-r["rung"], r["val_rmse"]))
+    return leaderboard
+
+
+def tune_hyperparameters(
+    model,
+    X,
+    y,
+    strategy="random",
+    n_trials=20,
+    n_workers=None,
+    max_bin=256,
+    params=None,
+):
+    """
+    Tìm hyperparameters tốt nhất rồi train và lưu model cuối cùng
+
+    Args:
+        model: HousePriceModel (đã có feature_names)
+        X, y: Dữ liệu đã preprocess (numpy)
+        strategy: "random" hoặc "halving"
+        n_trials: Số bộ hyperparameters thử
+        n_workers: Số process song song, None = số thread được cấp
+        max_bin: Số bin tối đa cho mỗi feature (hist)
+        params: Hyperparameters của lần train (XGB_PARAMS đã ghi đè). n_jobs
+            là ngân sách thread cho cả search và lần train lại cuối cùng
+    """
+    params = params or {}
+    threads = thread_budget(params.get("n_jobs"))
+    feature_names = model.feature_names
+    matrix_dir = tempfile.mkdtemp(prefix="house_price_tuning_")
+    search_start = time.perf_counter()
+    with model._stage("search", rows=len(X)):
+        try:
+            n_fit, n_val = prepare_shared_matrix(X, y, matrix_dir)
+            print(
+                f"✓ Đã ghi feature matrix ({n_fit:,} fit / {n_val:,} val) "
+                f"tại {matrix_dir}"
+            )
+            leaderboard = run_search(
+                matrix_dir,
+                strategy=strategy,
+                n_trials=n_trials,
+                n_workers=n_workers,
+                max_bin=max_bin,
+                n_jobs=threads,
+            )
+        finally:
+            shutil.rmtree(matrix_dir, ignore_errors=True)
+    search_time = time.perf_counter() - search_start
+
+    best = leaderboard[0]
+    best_params = dict(
+        best["params"], n_estimators=best["best_iteration"] + 1, n_jobs=threads
+    )
+    print(f"✓ Trial tốt nhất #{best['trial']}: val RMSE {best['val_rmse']:.2f}")
+    print(f"  {best_params}")
+
+    # Train lại với hyperparameters tốt nhất trên toàn bộ tập train
+    result = model.train(
+        X=pd.DataFrame(X, columns=feature_names),
+        y=y,
+        params=dict(params, **best_params),
+        quantile_dmatrix=True,
+        max_bin=max_bin,
+        instrumentation=model.instrumentation,
+        transformer=model.transformer,
+    )
+
+    leaderboard_path = os.path.splitext(model.model_path)[0] + "_leaderboard.json"
+    with open(leaderboard_path, "w") as f:
+        json.dump(
+            {
+                "strategy": strategy,
+                "n_trials": n_trials,
+                "search_time_s": round(search_time, 3),
+                "best_params": best_params,
+                "model_version": model.version,
+                "trials": leaderboard,
+            },
+            f,
+            indent=2,
+        )
+    print(f"✓ Đã lưu leaderboard tại {leaderboard_path}")
+
+    result["tuning"] = {
+        "strategy": strategy,
+        "n_trials": n_trials,
+        "search_time_s": round(search_time, 3),
+        "best_params": best_params,
+        "leaderboard_path": leaderboard_path,
+    }
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from instrumentation import configure_logging
+    from model import HousePriceModel
+
+    parser = argparse.ArgumentParser(description="Tìm hyperparameters song song")
+    parser.add_argument("data_path", help="CSV đã preprocess (cột cuối là target)")
+    parser.add_argument("--strategy", choices=["random", "halving"], default="random")
+    parser.add_argument("--n-trials", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-bin", type=int, default=256)
+    parser.add_argument("--model-path", default="models/house_price_model.pkl")
+    args = parser.parse_args()
+    configure_logging()
+
+    HousePriceModel(model_path=args.model_path).train(
+        data_path=args.data_path,
+        tune=args.strategy,
+        n_trials=args.n_trials,
+        tune_workers=args.workers,
+        max_bin=args.max_bin,
+    )